@@ -1,12 +1,11 @@
 # api/urls.py - URLs da API REST do SynchroBI
 
-from django.urls import path
+from django.urls import re_path
 from . import views
 
 app_name = 'api'
 
 urlpatterns = [
-    # APIs futuras serão adicionadas aqui
-    # Exemplo:
-    # path('status/', views.status, name='status'),
-]
\ No newline at end of file
+    # Coleta do Prometheus: /api/metrics (com ou sem barra final)
+    re_path(r'^metrics/?$', views.metrics_prometheus, name='metrics'),
+]
@@ -1,3 +1,80 @@
-from django.shortcuts import render
+# api/views.py - Endpoints de máquina do SynchroBI
 
-# Create your views here.
+import hmac
+import logging
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+
+from core.utils.cache_utils import CACHE_ACERTOS, CACHE_FALHAS, taxas_acerto
+from synchrobi import instrumentacao, metrics
+
+logger = logging.getLogger('synchrobi')
+
+CONTENT_TYPE_PROMETHEUS = 'text/plain; version=0.0.4; charset=utf-8'
+
+WORKER_RSS = 'synchrobi_worker_rss_bytes'
+WORKER_ATUALIZADO = 'synchrobi_worker_metricas_timestamp_segundos'
+CACHE_TAXA_ACERTO = 'synchrobi_cache_hit_ratio'
+
+AJUDA = {
+    instrumentacao.REQUISICOES: 'Requisições atendidas por view',
+    instrumentacao.CONSULTAS_DB: 'Consultas ao banco feitas pelas requisições, por view',
+    instrumentacao.ORCAMENTO_EXCEDIDO: 'Requisições acima do orçamento de consultas/tempo',
+    instrumentacao.REQUISICAO_SEGUNDOS: 'Duração das requisições por view',
+    instrumentacao.REQUISICAO_DB_SEGUNDOS: 'Tempo no banco por requisição, por view',
+    instrumentacao.REQUISICAO_CONSULTAS_HISTOGRAMA: 'Consultas ao banco por requisição, por view',
+    instrumentacao.JOBS: 'Importações/exportações concluídas, por status',
+    instrumentacao.JOB_LINHAS: 'Linhas processadas por importações/exportações',
+    instrumentacao.JOB_SEGUNDOS: 'Duração das importações/exportações',
+    instrumentacao.JOB_LINHAS_POR_SEGUNDO: 'Vazão das importações/exportações (linhas/s)',
+    metrics.SESSAO_ESCRITAS: 'Gravações de sessão por view',
+    CACHE_ACERTOS: 'Acertos do cache por namespace',
+    CACHE_FALHAS: 'Falhas do cache por namespace',
+    CACHE_TAXA_ACERTO: 'Taxa de acerto acumulada do cache por namespace',
+    WORKER_RSS: 'Memória residente de cada worker',
+    WORKER_ATUALIZADO: 'Último snapshot de métricas gravado pelo worker',
+}
+
+
+def _autorizado(request):
+    """Bearer METRICS_TOKEN (coletor do Prometheus) ou usuário staff logado"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        cabecalho = request.META.get('HTTP_AUTHORIZATION', '')
+        if cabecalho.startswith('Bearer ') and hmac.compare_digest(cabecalho[len('Bearer '):], token):
+            return True
+    usuario = getattr(request, 'user', None)
+    return bool(usuario and usuario.is_authenticated and usuario.is_staff)
+
+
+@require_GET
+def metrics_prometheus(request):
+    """
+    Métricas da instância no formato texto do Prometheus.
+
+    Soma os snapshots de todos os workers (SYNCHROBI_METRICS_DIR); sem o
+    diretório, só o worker que atendeu a requisição.
+    """
+    if not _autorizado(request):
+        return JsonResponse({'success': False, 'error': 'Acesso negado'}, status=403)
+
+    try:
+        agregado = metrics.agregar()
+
+        medidores = {WORKER_RSS: {}, WORKER_ATUALIZADO: {}, CACHE_TAXA_ACERTO: {}}
+        for processo in agregado['processos']:
+            rotulos = (('pid', str(processo['pid'])),)
+            medidores[WORKER_RSS][rotulos] = processo['rss_bytes'] or 0
+            medidores[WORKER_ATUALIZADO][rotulos] = round(processo['atualizado_em'] or 0, 3)
+        for namespace, taxa in taxas_acerto(agregado['contadores']).items():
+            medidores[CACHE_TAXA_ACERTO][(('namespace', namespace),)] = round(taxa, 4)
+
+        return HttpResponse(
+            metrics.formatar_prometheus(agregado, medidores, AJUDA),
+            content_type=CONTENT_TYPE_PROMETHEUS,
+        )
+    except Exception as e:
+        logger.error(f'Erro ao gerar métricas: {str(e)}')
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
@@ -4,6 +4,7 @@ from django import forms
 from django.core.exceptions import ValidationError
 
 from core.models import ParametroSistema, ContaExterna, ContaContabil, CentroCustoExterno, CentroCusto, Usuario
+from core.signals import invalidar_lookups
 
 class ParametroSistemaForm(forms.ModelForm):
     """Formulário para criar/editar parâmetros do sistema"""
@@ -353,10 +354,12 @@ class ContaExternaBulkForm(forms.Form):
         
         if acao == 'ativar':
             queryset.update(ativa=True)
+            invalidar_lookups(ContaExterna)  # update() não dispara post_save
             return f"{count} conta(s) externa(s) ativada(s) com sucesso."
         
         elif acao == 'desativar':
             queryset.update(ativa=False)
+            invalidar_lookups(ContaExterna)
             return f"{count} conta(s) externa(s) desativada(s) com sucesso."
         
         elif acao == 'sincronizar':
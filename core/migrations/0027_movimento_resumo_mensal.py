@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:13
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_permitir_historico_vazio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimentoResumoMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo_mes_ano', models.CharField(help_text='Formato YYYY-MM', max_length=7, verbose_name='Período')),
+                ('ano', models.IntegerField(verbose_name='Ano')),
+                ('mes', models.IntegerField(verbose_name='Mês')),
+                ('natureza', models.CharField(choices=[('D', 'Débito'), ('C', 'Crédito'), ('A', 'Ambas')], max_length=1, verbose_name='Natureza')),
+                ('soma_valor', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18, verbose_name='Soma do Valor')),
+                ('soma_valor_absoluto', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18, verbose_name='Soma do Valor Absoluto')),
+                ('quantidade', models.IntegerField(default=0, verbose_name='Quantidade de Movimentos')),
+                ('data_atualizacao', models.DateTimeField(auto_now=True)),
+                ('centro_custo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_mensais', to='core.centrocusto', verbose_name='Centro de Custo')),
+                ('conta_contabil', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_mensais', to='core.contacontabil', verbose_name='Conta Contábil')),
+                ('fornecedor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='resumos_mensais', to='core.fornecedor', verbose_name='Fornecedor')),
+                ('unidade', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_mensais', to='core.unidade', verbose_name='Unidade')),
+            ],
+            options={
+                'verbose_name': 'Resumo Mensal de Movimentos',
+                'verbose_name_plural': 'Resumos Mensais de Movimentos',
+                'db_table': 'movimentos_resumo_mensal',
+                'ordering': ['periodo_mes_ano'],
+                'indexes': [models.Index(fields=['periodo_mes_ano'], name='movimentos__periodo_001ae5_idx'), models.Index(fields=['periodo_mes_ano', 'conta_contabil'], name='movimentos__periodo_a8a34f_idx'), models.Index(fields=['periodo_mes_ano', 'unidade'], name='movimentos__periodo_7c8bb8_idx'), models.Index(fields=['periodo_mes_ano', 'centro_custo'], name='movimentos__periodo_80524a_idx'), models.Index(fields=['periodo_mes_ano', 'fornecedor'], name='movimentos__periodo_c47820_idx')],
+            },
+        ),
+    ]
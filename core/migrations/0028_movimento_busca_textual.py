@@ -0,0 +1,67 @@
+# Busca textual em movimentos (histórico e documento)
+#
+# PostgreSQL: coluna tsvector gerada (config portuguese + unaccent) com índice
+# GIN. Por ser GENERATED ... STORED, o banco a mantém em qualquer INSERT/UPDATE,
+# inclusive bulk_create e cargas em massa. A coluna não é declarada no modelo;
+# o serviço de busca só a usa quando existe. Nos demais bancos não há mudança
+# (a busca cai no icontains).
+
+from django.db import migrations, transaction
+
+
+FUNCAO_UNACCENT = """
+CREATE OR REPLACE FUNCTION synchrobi_unaccent(texto text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS $$
+    SELECT {corpo}
+$$
+"""
+
+COLUNA_BUSCA = """
+ALTER TABLE movimentos ADD COLUMN IF NOT EXISTS busca_vetor tsvector
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('portuguese'::regconfig, synchrobi_unaccent(coalesce(documento, ''))), 'A') ||
+    setweight(to_tsvector('portuguese'::regconfig, synchrobi_unaccent(coalesce(historico, ''))), 'B')
+) STORED
+"""
+
+INDICE_BUSCA = "CREATE INDEX IF NOT EXISTS movimentos_busca_vetor_gin ON movimentos USING GIN (busca_vetor)"
+
+
+def criar_busca_textual(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        # unaccent exige permissão para criar extensão; sem ela a busca
+        # continua funcionando, apenas sensível a acentos
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+            corpo = "public.unaccent('public.unaccent'::regdictionary, texto)"
+        except Exception:
+            corpo = "texto"
+
+        cursor.execute(FUNCAO_UNACCENT.format(corpo=corpo))
+        cursor.execute(COLUNA_BUSCA)
+        cursor.execute(INDICE_BUSCA)
+
+
+def remover_busca_textual(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP INDEX IF EXISTS movimentos_busca_vetor_gin")
+        cursor.execute("ALTER TABLE movimentos DROP COLUMN IF EXISTS busca_vetor")
+        cursor.execute("DROP FUNCTION IF EXISTS synchrobi_unaccent(text)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_movimento_resumo_mensal'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_busca_textual, remover_busca_textual),
+    ]
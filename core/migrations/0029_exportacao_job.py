@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:40
+
+import core.models.exportacao
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_movimento_busca_textual'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportacaoJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('formato', models.CharField(choices=[('xlsx', 'Excel'), ('csv', 'CSV'), ('parquet', 'Parquet')], max_length=10, verbose_name='Formato')),
+                ('filtros', models.JSONField(blank=True, default=dict, verbose_name='Filtros')),
+                ('assinatura', models.CharField(max_length=40, verbose_name='Assinatura (formato + filtros)')),
+                ('versao_dados', models.CharField(blank=True, max_length=100, verbose_name='Versão dos Dados')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('concluido', 'Concluído'), ('erro', 'Erro')], default='pendente', max_length=15, verbose_name='Status')),
+                ('progresso', models.IntegerField(default=0, verbose_name='Linhas Exportadas')),
+                ('total_estimado', models.IntegerField(blank=True, null=True, verbose_name='Total Estimado')),
+                ('arquivo', models.FileField(blank=True, max_length=255, storage=core.models.exportacao.storage_exportacoes, upload_to='movimentos/%Y/%m/', verbose_name='Arquivo')),
+                ('mensagem_erro', models.TextField(blank=True, verbose_name='Erro')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True, verbose_name='Iniciado em')),
+                ('concluido_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluído em')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exportacoes', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Exportação',
+                'verbose_name_plural': 'Exportações',
+                'db_table': 'exportacao_jobs',
+                'ordering': ['-criado_em'],
+                'indexes': [models.Index(fields=['assinatura', 'versao_dados', 'status'], name='exportacao__assinat_692823_idx'), models.Index(fields=['usuario', 'criado_em'], name='exportacao__usuario_f97268_idx'), models.Index(fields=['status'], name='exportacao__status_a28788_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Preenche o resumo mensal com os movimentos já existentes
+#
+# A 0027 só criou a tabela: até alguém rodar "reconstruir_resumo_movimentos",
+# totais da listagem, ranking de fornecedores, séries e versões de exportação
+# (que leem o resumo) apareciam zerados. Cada período é apagado e re-agregado
+# com o mesmo GROUP BY de MovimentoResumoMensal.reconstruir_periodos.
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+CAMPOS_CHAVE = (
+    'periodo_mes_ano',
+    'unidade_id',
+    'centro_custo_id',
+    'conta_contabil_id',
+    'fornecedor_id',
+    'natureza',
+)
+
+TAMANHO_LOTE = 2000
+
+
+def preencher_resumo(apps, schema_editor):
+    Movimento = apps.get_model('core', 'Movimento')
+    MovimentoResumoMensal = apps.get_model('core', 'MovimentoResumoMensal')
+
+    periodos = set(
+        Movimento.objects.order_by().values_list('periodo_mes_ano', flat=True).distinct()
+    ) | set(
+        MovimentoResumoMensal.objects.order_by().values_list('periodo_mes_ano', flat=True).distinct()
+    )
+
+    for periodo in sorted(p for p in periodos if p):
+        ano, mes = int(periodo[:4]), int(periodo[5:7])
+        MovimentoResumoMensal.objects.filter(periodo_mes_ano=periodo).delete()
+
+        agregados = (
+            Movimento.objects
+            .filter(periodo_mes_ano=periodo)
+            .order_by()
+            .values(*CAMPOS_CHAVE)
+            .annotate(
+                total_valor=Sum('valor'),
+                total_valor_absoluto=Sum('valor_absoluto'),
+                total_movimentos=Count('id'),
+            )
+        )
+
+        lote = []
+        for linha in agregados.iterator(chunk_size=TAMANHO_LOTE):
+            lote.append(MovimentoResumoMensal(
+                ano=ano,
+                mes=mes,
+                soma_valor=linha['total_valor'] or 0,
+                soma_valor_absoluto=linha['total_valor_absoluto'] or 0,
+                quantidade=linha['total_movimentos'],
+                **{campo: linha[campo] for campo in CAMPOS_CHAVE},
+            ))
+            if len(lote) >= TAMANHO_LOTE:
+                MovimentoResumoMensal.objects.bulk_create(lote)
+                lote = []
+        if lote:
+            MovimentoResumoMensal.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_exportacao_job'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_resumo, migrations.RunPython.noop),
+    ]
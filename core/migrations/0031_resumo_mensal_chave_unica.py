@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-19 07:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_preencher_resumo_mensal'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='movimentoresumomensal',
+            constraint=models.UniqueConstraint(condition=models.Q(('fornecedor__isnull', False)), fields=('periodo_mes_ano', 'unidade', 'centro_custo', 'conta_contabil', 'fornecedor', 'natureza'), name='resumo_mensal_chave_unica'),
+        ),
+        migrations.AddConstraint(
+            model_name='movimentoresumomensal',
+            constraint=models.UniqueConstraint(condition=models.Q(('fornecedor__isnull', True)), fields=('periodo_mes_ano', 'unidade', 'centro_custo', 'conta_contabil', 'natureza'), name='resumo_mensal_chave_unica_sem_fornecedor'),
+        ),
+    ]
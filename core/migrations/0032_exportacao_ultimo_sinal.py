@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 07:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_resumo_mensal_chave_unica'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportacaojob',
+            name='ultimo_sinal_em',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Último sinal de vida'),
+        ),
+    ]
@@ -11,6 +11,8 @@ from .grupocc import GrupoCC
 from .grupo_fornecedor import GrupoFornecedor
 from .fornecedor import Fornecedor
 from .movimento import Movimento
+from .movimento_resumo import MovimentoResumoMensal
+from .exportacao import ExportacaoJob
 
 # Modelos auxiliares e relacionamentos
 from .relacionamentos import (
@@ -36,6 +38,8 @@ __all__ = [
     'GrupoFornecedor',
     'Fornecedor',
     'Movimento',
+    'MovimentoResumoMensal',
+    'ExportacaoJob',
 
     # Auxiliares
     'ParametroSistema',
@@ -0,0 +1,105 @@
+# core/models/exportacao.py - JOBS DE EXPORTAÇÃO EM SEGUNDO PLANO
+
+import logging
+
+from django.conf import settings
+from django.core.files.storage import storages
+from django.db import models
+
+logger = logging.getLogger('synchrobi')
+
+
+def storage_exportacoes():
+    """Storage do alias 'exportacoes' (MinIO/S3 em produção, sistema de arquivos local sem endpoint)"""
+    return storages['exportacoes']
+
+
+class ExportacaoJob(models.Model):
+    """
+    Exportação de movimentos executada fora da requisição.
+
+    O arquivo gerado vai para o storage 'exportacoes'. assinatura identifica
+    formato + filtros e versao_dados o estado do resumo mensal dos períodos
+    cobertos: um pedido igual, sem importação desses períodos desde então,
+    reaproveita o arquivo existente.
+    """
+
+    STATUS_PENDENTE = 'pendente'
+    STATUS_PROCESSANDO = 'processando'
+    STATUS_CONCLUIDO = 'concluido'
+    STATUS_ERRO = 'erro'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDENTE, 'Pendente'),
+        (STATUS_PROCESSANDO, 'Processando'),
+        (STATUS_CONCLUIDO, 'Concluído'),
+        (STATUS_ERRO, 'Erro'),
+    ]
+
+    FORMATO_CHOICES = [
+        ('xlsx', 'Excel'),
+        ('csv', 'CSV'),
+        ('parquet', 'Parquet'),
+    ]
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='exportacoes',
+        verbose_name="Usuário"
+    )
+    formato = models.CharField(max_length=10, choices=FORMATO_CHOICES, verbose_name="Formato")
+    filtros = models.JSONField(default=dict, blank=True, verbose_name="Filtros")
+    assinatura = models.CharField(max_length=40, verbose_name="Assinatura (formato + filtros)")
+    versao_dados = models.CharField(max_length=100, blank=True, verbose_name="Versão dos Dados")
+
+    status = models.CharField(
+        max_length=15,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDENTE,
+        verbose_name="Status"
+    )
+    progresso = models.IntegerField(default=0, verbose_name="Linhas Exportadas")
+    total_estimado = models.IntegerField(null=True, blank=True, verbose_name="Total Estimado")
+    arquivo = models.FileField(
+        storage=storage_exportacoes,
+        upload_to='movimentos/%Y/%m/',
+        max_length=255,
+        blank=True,
+        verbose_name="Arquivo"
+    )
+    mensagem_erro = models.TextField(blank=True, verbose_name="Erro")
+
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
+    iniciado_em = models.DateTimeField(null=True, blank=True, verbose_name="Iniciado em")
+    concluido_em = models.DateTimeField(null=True, blank=True, verbose_name="Concluído em")
+    # Renovado a cada lote de linhas: um job "processando" sem sinal recente
+    # teve o processo interrompido e pode ser reenfileirado
+    ultimo_sinal_em = models.DateTimeField(null=True, blank=True, verbose_name="Último sinal de vida")
+
+    @property
+    def percentual(self):
+        """Progresso em % (None enquanto o total não é conhecido)"""
+        if self.status == self.STATUS_CONCLUIDO:
+            return 100
+        if not self.total_estimado:
+            return None
+        return min(99, int(self.progresso * 100 / self.total_estimado))
+
+    @property
+    def finalizado(self):
+        return self.status in (self.STATUS_CONCLUIDO, self.STATUS_ERRO)
+
+    def __str__(self):
+        return f"Exportação {self.pk} ({self.formato}) - {self.get_status_display()}"
+
+    class Meta:
+        db_table = 'exportacao_jobs'
+        verbose_name = 'Exportação'
+        verbose_name_plural = 'Exportações'
+        ordering = ['-criado_em']
+        indexes = [
+            models.Index(fields=['assinatura', 'versao_dados', 'status']),
+            models.Index(fields=['usuario', 'criado_em']),
+            models.Index(fields=['status']),
+        ]
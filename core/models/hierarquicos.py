@@ -2,11 +2,13 @@
 
 import logging
 import re
-from django.db import models
+from django.db import models, connection
 from django.core.cache import cache
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 
 from .empresa import Empresa
+from core.utils.cache_utils import cached_query
 
 logger = logging.getLogger('synchrobi')
 
@@ -15,6 +17,24 @@ logger = logging.getLogger('synchrobi')
 class HierarchiaDeclaradaMixin:
     """Mixin para modelos com hierarquia declarada (campo pai explícito)"""
     
+    # Campos que, alterados, exigem recalcular os níveis da subárvore
+    CAMPOS_HIERARQUIA = ('codigo', 'codigo_pai', 'nivel')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._hierarquia_carregada = instancia._estado_hierarquia()
+        return instancia
+    
+    def _estado_hierarquia(self):
+        # __dict__ em vez de getattr: campo adiado (only/defer) não dispara query
+        return tuple(self.__dict__.get(campo) for campo in self.CAMPOS_HIERARQUIA)
+    
+    @property
+    def hierarquia_alterada(self):
+        """True se codigo/codigo_pai/nivel mudaram desde a leitura do banco (ou o item não veio do banco)"""
+        return getattr(self, '_hierarquia_carregada', None) != self._estado_hierarquia()
+    
     @property
     def pai(self):
         """Retorna o item pai baseado no campo codigo_pai"""
@@ -65,6 +85,60 @@ class HierarchiaDeclaradaMixin:
         filter_dict = {'codigo_pai': self.codigo, active_field: True}
         return self.__class__.objects.filter(**filter_dict).exists()
     
+    @classmethod
+    def resolver_caminhos(cls, itens):
+        """
+        Equivalente em lote de get_caminho_completo(): retorna {codigo: [raiz, ..., item]}
+        
+        Busca todos os ancestrais de todos os itens com uma query codigo__in
+        (prefixos do código + codigo_pai declarado); só faz nova rodada se algum
+        pai declarado não for prefixo do código do filho.
+        """
+        conhecidos = {item.codigo: item for item in itens}
+        
+        pendentes = set()
+        for item in conhecidos.values():
+            partes = item.codigo.split('.')
+            pendentes.update('.'.join(partes[:i]) for i in range(1, len(partes)))
+            if item.codigo_pai:
+                pendentes.add(item.codigo_pai)
+        pendentes -= set(conhecidos)
+        
+        rodadas = 0
+        while pendentes and rodadas < cls.PROFUNDIDADE_MAXIMA_HIERARQUIA:
+            rodadas += 1
+            encontrados = list(cls.objects.filter(codigo__in=pendentes))
+            conhecidos.update((item.codigo, item) for item in encontrados)
+            pendentes = {
+                item.codigo_pai for item in encontrados
+                if item.codigo_pai and item.codigo_pai not in conhecidos
+            }
+        
+        caminhos = {}
+        for item in itens:
+            caminho = []
+            vistos = set()
+            atual = item
+            while atual is not None and atual.codigo not in vistos:
+                vistos.add(atual.codigo)
+                caminho.insert(0, atual)
+                atual = conhecidos.get(atual.codigo_pai) if atual.codigo_pai else None
+            caminhos[item.codigo] = caminho
+        
+        return caminhos
+    
+    @classmethod
+    def codigos_com_filhos(cls, codigos):
+        """Equivalente em lote de tem_filhos: conjunto dos códigos que têm filhos ativos"""
+        if not codigos:
+            return set()
+        active_field = 'ativo' if hasattr(cls, 'ativo') else 'ativa'
+        return set(
+            cls.objects.filter(codigo_pai__in=list(codigos), **{active_field: True})
+            .values_list('codigo_pai', flat=True)
+            .distinct()
+        )
+    
     def deduzir_pai_automaticamente(self):
         """Deduz pai baseado no código (para preenchimento automático)"""
         if '.' not in self.codigo:
@@ -83,10 +157,161 @@ class HierarchiaDeclaradaMixin:
                 continue
         
         return None
+    
+    # ===== MANUTENÇÃO SET-BASED DA HIERARQUIA =====
+    
+    # Limite de profundidade da CTE recursiva (proteção contra ciclos em codigo_pai)
+    PROFUNDIDADE_MAXIMA_HIERARQUIA = 50
+    
+    @classmethod
+    def _cte_niveis(cls, codigos_raiz=None):
+        """
+        Monta a CTE recursiva que calcula o nível de cada nó a partir das raízes.
+        
+        Sem codigos_raiz parte de todas as raízes (sem pai ou com pai inexistente,
+        que o save() também trata como nível 1); com codigos_raiz parte do nível
+        já gravado desses nós e percorre apenas suas subárvores.
+        """
+        tabela = connection.ops.quote_name(cls._meta.db_table)
+        
+        if codigos_raiz is None:
+            base = (
+                f"SELECT codigo, 1, 0 FROM {tabela} "
+                f"WHERE codigo_pai IS NULL OR codigo_pai = '' "
+                f"OR codigo_pai NOT IN (SELECT codigo FROM {tabela})"
+            )
+            params = []
+        else:
+            placeholders = ', '.join(['%s'] * len(codigos_raiz))
+            base = f"SELECT codigo, nivel, 0 FROM {tabela} WHERE codigo IN ({placeholders})"
+            params = list(codigos_raiz)
+        
+        cte = f"""
+            WITH RECURSIVE arvore (codigo, nivel_calculado, profundidade) AS (
+                {base}
+                UNION ALL
+                SELECT filho.codigo, arvore.nivel_calculado + 1, arvore.profundidade + 1
+                FROM {tabela} filho
+                INNER JOIN arvore ON filho.codigo_pai = arvore.codigo
+                WHERE arvore.profundidade < %s
+            )
+        """
+        params.append(cls.PROFUNDIDADE_MAXIMA_HIERARQUIA)
+        return tabela, cte, params
+    
+    @classmethod
+    def divergencias_nivel(cls, codigos_raiz=None):
+        """Lista (codigo, nivel_gravado, nivel_calculado) dos nós com nível desatualizado"""
+        if codigos_raiz is not None and not codigos_raiz:
+            return []
+        
+        tabela, cte, params = cls._cte_niveis(codigos_raiz)
+        sql = f"""
+            {cte}
+            SELECT t.codigo, t.nivel, MIN(a.nivel_calculado)
+            FROM {tabela} t
+            INNER JOIN arvore a ON a.codigo = t.codigo
+            GROUP BY t.codigo, t.nivel
+            HAVING t.nivel <> MIN(a.nivel_calculado)
+            ORDER BY t.codigo
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+    
+    @classmethod
+    def recalcular_niveis(cls, codigos_raiz=None):
+        """
+        Recalcula o nível de subárvores inteiras (ou da tabela toda) com um único
+        UPDATE baseado em CTE recursiva. Só altera linhas cujo nível mudou.
+        
+        Retorna o número de linhas atualizadas.
+        """
+        if codigos_raiz is not None and not codigos_raiz:
+            return 0
+        
+        tabela, cte, params = cls._cte_niveis(codigos_raiz)
+        nivel_calculado = (
+            f"(SELECT MIN(a.nivel_calculado) FROM arvore a WHERE a.codigo = {tabela}.codigo)"
+        )
+        sql = f"""
+            {cte}
+            UPDATE {tabela}
+            SET nivel = {nivel_calculado}, data_alteracao = %s
+            WHERE codigo IN (SELECT codigo FROM arvore)
+              AND nivel <> {nivel_calculado}
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [timezone.now()])
+            atualizados = cursor.rowcount
+            if atualizados < 0 and connection.vendor == 'sqlite':
+                # sqlite3 não informa rowcount para UPDATE iniciado por WITH
+                cursor.execute('SELECT changes()')
+                atualizados = cursor.fetchone()[0]
+        
+        if atualizados:
+            logger.info(f'{cls._meta.verbose_name_plural}: nível recalculado para {atualizados} item(ns)')
+        
+        return atualizados
+    
+    def adotar_descendentes_orfaos(self):
+        """
+        Ao inserir um nível intermediário (ex.: criar 1.2 quando 1.2.3 já aponta
+        para 1), reaponta para este item os descendentes por código cujo pai
+        declarado está vazio ou é um ancestral acima deste item.
+        """
+        candidatos = dict(
+            self.__class__.objects.filter(codigo__startswith=f'{self.codigo}.')
+            .values_list('codigo', 'codigo_pai')
+        )
+        if not candidatos:
+            return 0
+        
+        codigos_conhecidos = set(candidatos) | {self.codigo}
+        adotados = []
+        
+        for codigo, codigo_pai in candidatos.items():
+            # Só adota quem tem este item como ancestral existente mais próximo
+            partes = codigo.split('.')
+            pai_mais_proximo = None
+            for i in range(len(partes) - 1, 0, -1):
+                candidato = '.'.join(partes[:i])
+                if candidato in codigos_conhecidos:
+                    pai_mais_proximo = candidato
+                    break
+            
+            if pai_mais_proximo != self.codigo or codigo_pai == self.codigo:
+                continue
+            
+            if not codigo_pai or self.codigo.startswith(f'{codigo_pai}.'):
+                adotados.append(codigo)
+        
+        if adotados:
+            self.__class__.objects.filter(codigo__in=adotados).update(
+                codigo_pai=self.codigo, data_alteracao=timezone.now()
+            )
+            logger.info(f'{self.codigo}: {len(adotados)} descendente(s) reapontado(s) para o novo nível')
+        
+        return len(adotados)
+    
+    def propagar_hierarquia(self, criado=False):
+        """
+        Chamado após o save(): adota órfãos (se novo) e recalcula os níveis da
+        subárvore. Saves que não mexem na hierarquia (ex.: renomear) não
+        disparam a CTE.
+        """
+        alterada = criado or self.hierarquia_alterada
+        self._hierarquia_carregada = self._estado_hierarquia()
+        if not alterada:
+            return 0
+        
+        if criado:
+            self.adotar_descendentes_orfaos()
+        return self.__class__.recalcular_niveis([self.codigo])
 
 # ===== MODELO UNIDADE COM HIERARQUIA DECLARADA =====
 
-class Unidade(models.Model, HierarchiaDeclaradaMixin):
+class Unidade(HierarchiaDeclaradaMixin, models.Model):
     """Unidade organizacional com hierarquia declarada"""
 
     TIPO_CHOICES = [
@@ -180,8 +405,12 @@ class Unidade(models.Model, HierarchiaDeclaradaMixin):
         if not self.codigo_allstrategy:
             self.codigo_allstrategy = ''
         
+        criado = self._state.adding
         self.full_clean()
         super().save(*args, **kwargs)
+        
+        # Propagar pai/nível para a subárvore (set-based, sem re-salvar filhos)
+        self.propagar_hierarquia(criado)
     
     @classmethod
     def buscar_por_codigo_allstrategy(cls, codigo_allstrategy, apenas_ativas=True):
@@ -200,7 +429,19 @@ class Unidade(models.Model, HierarchiaDeclaradaMixin):
     
     @classmethod
     def buscar_unidade_para_movimento(cls, codigo_unidade):
-        """Busca unidade para movimentação"""
+        """
+        Busca unidade para movimentação (código All Strategy, depois código).
+
+        Chamado por linha na importação: resultado no cache compartilhado,
+        invalidado a cada alteração de unidade (core/signals.py).
+        """
+        return cached_query(
+            'unidade', ('movimento', str(codigo_unidade)),
+            lambda: cls._buscar_unidade_para_movimento(codigo_unidade)
+        )
+    
+    @classmethod
+    def _buscar_unidade_para_movimento(cls, codigo_unidade):
         unidade = cls.buscar_por_codigo_allstrategy(str(codigo_unidade))
         if unidade:
             return unidade
@@ -257,7 +498,7 @@ class Unidade(models.Model, HierarchiaDeclaradaMixin):
 
 # ===== MODELO CENTRO DE CUSTO COM HIERARQUIA DECLARADA =====
 
-class CentroCusto(models.Model, HierarchiaDeclaradaMixin):
+class CentroCusto(HierarchiaDeclaradaMixin, models.Model):
     """Centro de custo com hierarquia declarada"""
     
     TIPO_CHOICES = [
@@ -332,8 +573,12 @@ class CentroCusto(models.Model, HierarchiaDeclaradaMixin):
         else:
             self.nivel = 1
         
+        criado = self._state.adding
         self.full_clean()
         super().save(*args, **kwargs)
+        
+        # Propagar pai/nível para a subárvore (set-based, sem re-salvar filhos)
+        self.propagar_hierarquia(criado)
     
     # Propriedades baseadas no campo tipo
     @property
@@ -347,6 +592,14 @@ class CentroCusto(models.Model, HierarchiaDeclaradaMixin):
     def get_tipo_display(self):
         return 'Sintético' if self.tipo == 'S' else 'Analítico'
     
+    @classmethod
+    def buscar_ativo(cls, codigo):
+        """Centro de custo ativo pelo código (None se não existir), via cache compartilhado"""
+        return cached_query(
+            'centro_custo', ('ativo', str(codigo)),
+            lambda: cls.objects.filter(codigo=codigo, ativo=True).first()
+        )
+    
     # Propriedades para compatibilidade
     @property
     def centro_pai(self):
@@ -378,7 +631,7 @@ class CentroCusto(models.Model, HierarchiaDeclaradaMixin):
 
 # ===== MODELO CONTA CONTÁBIL COM HIERARQUIA DECLARADA =====
 
-class ContaContabil(models.Model, HierarchiaDeclaradaMixin):
+class ContaContabil(HierarchiaDeclaradaMixin, models.Model):
     """Conta contábil com hierarquia declarada"""
     
     TIPO_CHOICES = [
@@ -454,8 +707,12 @@ class ContaContabil(models.Model, HierarchiaDeclaradaMixin):
         else:
             self.nivel = 1
         
+        criado = self._state.adding
         self.full_clean()
         super().save(*args, **kwargs)
+        
+        # Propagar pai/nível para a subárvore (set-based, sem re-salvar filhos)
+        self.propagar_hierarquia(criado)
     
     # Propriedades baseadas no campo tipo
     @property
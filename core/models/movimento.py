@@ -4,7 +4,9 @@ import logging
 from django.db import models
 from django.core.exceptions import ValidationError
 from decimal import Decimal
+from datetime import date
 
+from ..utils.particionamento import substituir_periodo_datas
 from .hierarquicos import Unidade, CentroCusto, ContaContabil
 from .fornecedor import Fornecedor
 
@@ -161,6 +163,11 @@ class Movimento(models.Model):
 
     def save(self, *args, **kwargs):
         """Save com cálculos automáticos"""
+        self.preparar_gravacao()
+        super().save(*args, **kwargs)
+    
+    def preparar_gravacao(self):
+        """Campos derivados + validação; feito pelo save() e pelas cargas que gravam direto na partição"""
         
         # Se tem data, extrair mês e ano automaticamente
         if self.data:
@@ -175,8 +182,6 @@ class Movimento(models.Model):
         
         # Validar
         self.full_clean()
-        
-        super().save(*args, **kwargs)
     
     # MÉTODOS DE CONSULTA POR PERÍODO DE DATAS
     
@@ -197,15 +202,27 @@ class Movimento(models.Model):
         """
         Remove movimentos de um período de datas antes de nova importação
         """
-        movimentos_periodo = cls.get_movimentos_periodo_datas(data_inicio, data_fim)
-        count = movimentos_periodo.count()
+        from .movimento_resumo import MovimentoResumoMensal
+        
+        count = cls.substituir_periodo_datas(data_inicio, data_fim)
         
         if count > 0:
-            movimentos_periodo.delete()
             logger.info(f'{count} movimentos removidos do período {data_inicio} a {data_fim}')
+            
+            # Resumo mensal dos meses tocados
+            MovimentoResumoMensal.reconstruir_intervalo(data_inicio, data_fim)
         
         return count
     
+    @classmethod
+    def substituir_periodo_datas(cls, data_inicio, data_fim):
+        """
+        Remove os movimentos do período para recarga, sem reconstruir o resumo
+        (quem recarrega reconstrói ao final). Com a tabela particionada no
+        PostgreSQL, meses inteiros são descartados por partição (DETACH/DROP)
+        """
+        return substituir_periodo_datas(data_inicio, data_fim)
+    
     @classmethod
     def get_movimentos_periodo(cls, mes_inicio, ano_inicio, mes_fim=None, ano_fim=None):
         """
@@ -231,12 +248,20 @@ class Movimento(models.Model):
         """
         Remove movimentos de um período antes de nova importação - MÉTODO MANTIDO
         """
+        from .movimento_resumo import MovimentoResumoMensal
+        
         movimentos_periodo = cls.get_movimentos_periodo(mes_inicio, ano_inicio, mes_fim, ano_fim)
         count = movimentos_periodo.count()
         
         if count > 0:
             movimentos_periodo.delete()
             logger.info(f'{count} movimentos removidos do período {ano_inicio}-{mes_inicio:02d} a {ano_fim or ano_inicio}-{(mes_fim or mes_inicio):02d}')
+            
+            # Resumo mensal dos meses removidos
+            MovimentoResumoMensal.reconstruir_intervalo(
+                date(ano_inicio, mes_inicio, 1),
+                date(ano_fim or ano_inicio, mes_fim or mes_inicio, 1)
+            )
         
         return count
     
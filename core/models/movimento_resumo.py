@@ -0,0 +1,282 @@
+# core/models/movimento_resumo.py - RESUMO MENSAL PRÉ-AGREGADO DE MOVIMENTOS
+
+import logging
+from datetime import date
+from decimal import Decimal
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Sum, Count, F
+from django.utils import timezone
+
+from ..utils.relatorio_cache import invalidar_periodos
+from .hierarquicos import Unidade, CentroCusto, ContaContabil
+from .fornecedor import Fornecedor
+from .movimento import Movimento
+
+logger = logging.getLogger('synchrobi')
+
+
+class MovimentoResumoMensal(models.Model):
+    """
+    Tabela fato pré-agregada de movimentos por período.
+
+    Chave: (periodo_mes_ano, unidade, centro_custo, conta_contabil, fornecedor, natureza).
+    Reconstruída por período ao fim de cada importação/limpeza e atualizada
+    incrementalmente nas inclusões, alterações e exclusões manuais.
+    Relatórios leem milhares de linhas daqui em vez de milhões de movimentos.
+    """
+
+    # Campos que identificam uma linha do resumo (attnames)
+    CAMPOS_CHAVE = (
+        'periodo_mes_ano',
+        'unidade_id',
+        'centro_custo_id',
+        'conta_contabil_id',
+        'fornecedor_id',
+        'natureza',
+    )
+
+    periodo_mes_ano = models.CharField(
+        max_length=7,
+        verbose_name="Período",
+        help_text="Formato YYYY-MM"
+    )
+    ano = models.IntegerField(verbose_name="Ano")
+    mes = models.IntegerField(verbose_name="Mês")
+
+    unidade = models.ForeignKey(
+        Unidade,
+        on_delete=models.CASCADE,
+        related_name='resumos_mensais',
+        verbose_name="Unidade"
+    )
+    centro_custo = models.ForeignKey(
+        CentroCusto,
+        on_delete=models.CASCADE,
+        related_name='resumos_mensais',
+        verbose_name="Centro de Custo"
+    )
+    conta_contabil = models.ForeignKey(
+        ContaContabil,
+        on_delete=models.CASCADE,
+        related_name='resumos_mensais',
+        verbose_name="Conta Contábil"
+    )
+    fornecedor = models.ForeignKey(
+        Fornecedor,
+        on_delete=models.CASCADE,
+        related_name='resumos_mensais',
+        verbose_name="Fornecedor",
+        null=True,
+        blank=True
+    )
+    natureza = models.CharField(
+        max_length=1,
+        choices=Movimento.NATUREZA_CHOICES,
+        verbose_name="Natureza"
+    )
+
+    # Agregados
+    soma_valor = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Soma do Valor"
+    )
+    soma_valor_absoluto = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Soma do Valor Absoluto"
+    )
+    quantidade = models.IntegerField(default=0, verbose_name="Quantidade de Movimentos")
+
+    data_atualizacao = models.DateTimeField(auto_now=True)
+
+    # ===== PERÍODOS =====
+
+    @staticmethod
+    def periodos_entre_datas(data_inicio, data_fim):
+        """Lista de períodos YYYY-MM cobertos pelo intervalo de datas (inclusive)"""
+        if not data_inicio or not data_fim or data_inicio > data_fim:
+            return []
+
+        periodos = []
+        ano, mes = data_inicio.year, data_inicio.month
+        while (ano, mes) <= (data_fim.year, data_fim.month):
+            periodos.append(f"{ano}-{mes:02d}")
+            mes += 1
+            if mes > 12:
+                ano, mes = ano + 1, 1
+        return periodos
+
+    # ===== RECONSTRUÇÃO POR PERÍODO =====
+
+    @classmethod
+    def reconstruir_periodos(cls, periodos, batch_size=2000):
+        """
+        Recalcula o resumo exatamente dos períodos informados a partir de movimentos.
+
+        Cada período é apagado e re-agregado (GROUP BY na chave) na mesma transação.
+        Retorna o total de linhas de resumo gravadas.
+        """
+        periodos = sorted({p for p in periodos if p})
+        if not periodos:
+            return 0
+
+        total_linhas = 0
+        for periodo in periodos:
+            ano, mes = int(periodo[:4]), int(periodo[5:7])
+
+            agregados = (
+                Movimento.objects
+                .filter(periodo_mes_ano=periodo)
+                .order_by()
+                .values(*cls.CAMPOS_CHAVE)
+                .annotate(
+                    total_valor=Sum('valor'),
+                    total_valor_absoluto=Sum('valor_absoluto'),
+                    total_movimentos=Count('id'),
+                )
+            )
+
+            with transaction.atomic():
+                cls.objects.filter(periodo_mes_ano=periodo).delete()
+
+                lote = []
+                for linha in agregados.iterator(chunk_size=batch_size):
+                    lote.append(cls(
+                        ano=ano,
+                        mes=mes,
+                        soma_valor=linha['total_valor'] or Decimal('0.00'),
+                        soma_valor_absoluto=linha['total_valor_absoluto'] or Decimal('0.00'),
+                        quantidade=linha['total_movimentos'],
+                        **{campo: linha[campo] for campo in cls.CAMPOS_CHAVE},
+                    ))
+                    if len(lote) >= batch_size:
+                        cls.objects.bulk_create(lote)
+                        total_linhas += len(lote)
+                        lote = []
+
+                if lote:
+                    cls.objects.bulk_create(lote)
+                    total_linhas += len(lote)
+
+        transaction.on_commit(lambda: invalidar_periodos(periodos))
+
+        logger.info(f'Resumo mensal reconstruído para {", ".join(periodos)}: {total_linhas} linhas')
+        return total_linhas
+
+    @classmethod
+    def reconstruir_intervalo(cls, data_inicio, data_fim):
+        """Reconstrói todos os períodos tocados por um intervalo de datas"""
+        return cls.reconstruir_periodos(cls.periodos_entre_datas(data_inicio, data_fim))
+
+    # ===== ATUALIZAÇÃO INCREMENTAL =====
+
+    @classmethod
+    def snapshot(cls, movimento):
+        """Captura chave e valores de um movimento antes de alterá-lo/excluí-lo"""
+        return {
+            'chave': {campo: getattr(movimento, campo) for campo in cls.CAMPOS_CHAVE},
+            'valor': movimento.valor or Decimal('0.00'),
+            'valor_absoluto': movimento.valor_absoluto or Decimal('0.00'),
+        }
+
+    @classmethod
+    def _aplicar_delta(cls, chave, valor, valor_absoluto, quantidade):
+        """Soma um delta na linha do resumo da chave (cria ou remove a linha quando necessário)"""
+        periodo = chave['periodo_mes_ano']
+        if not periodo:
+            return
+
+        with transaction.atomic():
+            transaction.on_commit(lambda: invalidar_periodos([periodo]))
+
+            pk = (
+                cls.objects.select_for_update()
+                .filter(**chave)
+                .values_list('pk', flat=True)
+                .first()
+            )
+
+            if pk is None:
+                if quantidade <= 0:
+                    # Linha inexistente (resumo ainda não construído): reconstruir o período
+                    transaction.on_commit(lambda: cls.reconstruir_periodos([periodo]))
+                    return
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(
+                            ano=int(periodo[:4]),
+                            mes=int(periodo[5:7]),
+                            soma_valor=valor,
+                            soma_valor_absoluto=valor_absoluto,
+                            quantidade=quantidade,
+                            **chave,
+                        )
+                    return
+                except IntegrityError:
+                    # select_for_update não bloqueia linha inexistente: outra transação
+                    # criou a chave entre a leitura e o insert, então soma nela
+                    pk = (
+                        cls.objects.select_for_update()
+                        .filter(**chave)
+                        .values_list('pk', flat=True)
+                        .get()
+                    )
+
+            cls.objects.filter(pk=pk).update(
+                soma_valor=F('soma_valor') + valor,
+                soma_valor_absoluto=F('soma_valor_absoluto') + valor_absoluto,
+                quantidade=F('quantidade') + quantidade,
+                data_atualizacao=timezone.now(),
+            )
+            cls.objects.filter(pk=pk, quantidade__lte=0).delete()
+
+    @classmethod
+    def registrar_inclusao(cls, movimento):
+        dados = cls.snapshot(movimento)
+        cls._aplicar_delta(dados['chave'], dados['valor'], dados['valor_absoluto'], 1)
+
+    @classmethod
+    def registrar_exclusao(cls, snapshot):
+        """Recebe o snapshot() do movimento capturado antes da exclusão"""
+        cls._aplicar_delta(snapshot['chave'], -snapshot['valor'], -snapshot['valor_absoluto'], -1)
+
+    @classmethod
+    def registrar_alteracao(cls, snapshot_anterior, movimento):
+        """Remove a contribuição antiga e aplica a nova (a chave pode ter mudado)"""
+        cls.registrar_exclusao(snapshot_anterior)
+        cls.registrar_inclusao(movimento)
+
+    def __str__(self):
+        return f"{self.periodo_mes_ano} | {self.unidade_id} | {self.centro_custo_id} | {self.conta_contabil_id} | {self.soma_valor}"
+
+    class Meta:
+        db_table = 'movimentos_resumo_mensal'
+        verbose_name = 'Resumo Mensal de Movimentos'
+        verbose_name_plural = 'Resumos Mensais de Movimentos'
+        ordering = ['periodo_mes_ano']
+        indexes = [
+            models.Index(fields=['periodo_mes_ano']),
+            models.Index(fields=['periodo_mes_ano', 'conta_contabil']),
+            models.Index(fields=['periodo_mes_ano', 'unidade']),
+            models.Index(fields=['periodo_mes_ano', 'centro_custo']),
+            models.Index(fields=['periodo_mes_ano', 'fornecedor']),
+        ]
+        # Uma linha por chave. Fornecedor nulo também é chave: em vez de
+        # nulls_distinct=False (só PostgreSQL 15+; nos demais bancos o Django
+        # não cria a constraint), dois índices únicos parciais
+        constraints = [
+            models.UniqueConstraint(
+                fields=['periodo_mes_ano', 'unidade', 'centro_custo', 'conta_contabil', 'fornecedor', 'natureza'],
+                condition=models.Q(fornecedor__isnull=False),
+                name='resumo_mensal_chave_unica',
+            ),
+            models.UniqueConstraint(
+                fields=['periodo_mes_ano', 'unidade', 'centro_custo', 'conta_contabil', 'natureza'],
+                condition=models.Q(fornecedor__isnull=True),
+                name='resumo_mensal_chave_unica_sem_fornecedor',
+            ),
+        ]
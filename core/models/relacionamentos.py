@@ -8,6 +8,7 @@ from .usuario import Usuario
 from .empresa import Empresa
 from .hierarquicos import CentroCusto, ContaContabil
 from .grupocc import GrupoCC
+from core.utils.cache_utils import cached_query
 
 class ParametroSistema(models.Model):
     """Parâmetros globais de configuração do sistema"""
@@ -288,6 +289,22 @@ class ContaExterna(models.Model):
         verbose_name="Última Sincronização"
     )
     
+    @classmethod
+    def buscar_ativa_por_codigo(cls, codigo_externo):
+        """
+        Conta ERP ativa (com a conta contábil) pelo código externo; None se não existir.
+
+        Usado por linha na importação: resultado no cache compartilhado,
+        invalidado a cada alteração de conta externa ou contábil.
+        """
+        def buscar():
+            try:
+                return cls.objects.select_related('conta_contabil').get(codigo_externo=codigo_externo, ativa=True)
+            except cls.DoesNotExist:
+                return None
+        
+        return cached_query('conta_externa', ('ativa', str(codigo_externo)), buscar)
+    
     def clean(self):
         """Validação customizada"""
         super().clean()
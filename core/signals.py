@@ -0,0 +1,44 @@
+# core/signals.py - Invalidação do cache compartilhado de lookups
+
+from django.db.models.signals import post_delete, post_save
+
+from core.models import CentroCusto, ContaContabil, ContaExterna, Fornecedor, Unidade
+from core.utils.cache_utils import invalidar_consulta, invalidar_namespace
+
+# Model alterado -> namespaces de cached_query que dependem dele
+# (conta_externa guarda a conta contábil junto: relatorio_despesa, nome)
+NAMESPACES_POR_MODEL = {
+    Unidade: ('unidade',),
+    CentroCusto: ('centro_custo',),
+    ContaContabil: ('conta_externa',),
+    ContaExterna: ('conta_externa',),
+    Fornecedor: ('fornecedor',),
+}
+
+
+# Inclusões que só tornam obsoleta a própria entrada (ex.: fornecedores criados
+# pela importação linha a linha): rotacionar o namespace inteiro a cada novo
+# fornecedor zeraria o cache de que a importação depende. Outras buscas que
+# davam "não encontrado" se corrigem em TIMEOUT_NAO_ENCONTRADO.
+CONSULTAS_POR_INCLUSAO = {
+    Fornecedor: lambda fornecedor: [('fornecedor', ('existente', fornecedor.razao_social))],
+}
+
+
+def invalidar_lookups(model):
+    """Para gravações em massa (bulk_create/update) que não disparam post_save/post_delete"""
+    invalidar_namespace(*NAMESPACES_POR_MODEL[model])
+
+
+def _invalidar(sender, instance=None, created=False, **kwargs):
+    if created and sender in CONSULTAS_POR_INCLUSAO:
+        for namespace, partes in CONSULTAS_POR_INCLUSAO[sender](instance):
+            invalidar_consulta(namespace, partes)
+        return
+    invalidar_lookups(sender)
+
+
+def conectar():
+    for model in NAMESPACES_POR_MODEL:
+        post_save.connect(_invalidar, sender=model, dispatch_uid=f'cache_{model._meta.label_lower}_save')
+        post_delete.connect(_invalidar, sender=model, dispatch_uid=f'cache_{model._meta.label_lower}_delete')
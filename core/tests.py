@@ -1,3 +1,138 @@
-from django.test import TestCase
+# core/tests.py - Testes dos modelos do core
 
-# Create your tests here.
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from core.models import CentroCusto, ContaContabil, Fornecedor, Movimento, MovimentoResumoMensal, Unidade
+from core.utils.cache_utils import cached_query
+
+
+class PropagacaoHierarquiaTest(TestCase):
+    """save() só recalcula os níveis da subárvore quando a hierarquia muda"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for codigo, tipo in (('1', 'S'), ('1.1', 'S'), ('1.1.1', 'A'), ('2', 'S')):
+            Unidade.objects.create(codigo=codigo, nome=f'Unidade {codigo}', tipo=tipo, nivel=1)
+
+    def test_renomear_nao_recalcula_niveis(self):
+        unidade = Unidade.objects.get(codigo='1.1')
+        unidade.nome = 'Renomeada'
+        with mock.patch.object(Unidade, 'recalcular_niveis', wraps=Unidade.recalcular_niveis) as recalcular:
+            unidade.save()
+            unidade.descricao = 'Outra alteração sem mexer na hierarquia'
+            unidade.save()
+        recalcular.assert_not_called()
+
+    def test_mover_no_recalcula_subarvore(self):
+        unidade = Unidade.objects.get(codigo='1.1')
+        unidade.codigo_pai = '2'
+        unidade.save()
+        self.assertEqual(Unidade.objects.get(codigo='1.1').nivel, 2)
+        self.assertEqual(Unidade.objects.get(codigo='1.1.1').nivel, 3)
+
+    def test_criar_nivel_intermediario_adota_descendentes(self):
+        Unidade.objects.create(codigo='2.5.1', nome='Neto', tipo='A', nivel=1)
+        self.assertEqual(Unidade.objects.get(codigo='2.5.1').codigo_pai, '2')
+
+        Unidade.objects.create(codigo='2.5', nome='Intermediária', tipo='S', nivel=1)
+        neto = Unidade.objects.get(codigo='2.5.1')
+        self.assertEqual(neto.codigo_pai, '2.5')
+        self.assertEqual(neto.nivel, 3)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class InvalidacaoFornecedorTest(TestCase):
+    """Fornecedor novo invalida só a própria busca; alteração invalida o namespace"""
+
+    def _buscar(self, nome, resultado):
+        return cached_query('fornecedor', ('existente', nome), lambda: resultado)
+
+    def test_inclusao_preserva_demais_entradas(self):
+        self._buscar('ALFA LTDA', 'alfa')
+        self._buscar('BETA LTDA', None)
+
+        fornecedor = Fornecedor.objects.create(codigo='BL001', razao_social='BETA LTDA')
+
+        self.assertEqual(self._buscar('ALFA LTDA', 'recalculado'), 'alfa')
+        self.assertEqual(self._buscar('BETA LTDA', 'beta'), 'beta')
+
+        fornecedor.razao_social = 'BETA COMERCIO LTDA'
+        fornecedor.save()
+        self.assertEqual(self._buscar('ALFA LTDA', 'recalculado'), 'recalculado')
+
+
+class ResumoMensalIncrementalTest(TestCase):
+    """Deltas de inclusão/alteração/exclusão deixam o resumo igual a uma reconstrução completa"""
+
+    PERIODOS = ['2025-01', '2025-02']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.unidade_a = Unidade.objects.create(codigo='1', nome='Unidade A', tipo='A', nivel=1)
+        cls.unidade_b = Unidade.objects.create(codigo='2', nome='Unidade B', tipo='A', nivel=1)
+        cls.centro = CentroCusto.objects.create(codigo='1', nome='Centro', tipo='A', nivel=1)
+        cls.conta = ContaContabil.objects.create(codigo='1', nome='Conta', tipo='A', nivel=1)
+        cls.fornecedor = Fornecedor.objects.create(codigo='F001', razao_social='Fornecedor')
+
+        for dia, valor in ((5, '100.00'), (10, '-40.00'), (15, '25.50')):
+            cls._movimento(date(2025, 1, dia), valor)
+        cls._movimento(date(2025, 2, 3), '70.00', unidade=cls.unidade_b)
+        MovimentoResumoMensal.reconstruir_periodos(cls.PERIODOS)
+
+    @classmethod
+    def _movimento(cls, data, valor, unidade=None, fornecedor=True):
+        return Movimento.objects.create(
+            data=data,
+            unidade=unidade or cls.unidade_a,
+            centro_custo=cls.centro,
+            conta_contabil=cls.conta,
+            fornecedor=cls.fornecedor if fornecedor else None,
+            natureza='D',
+            valor=Decimal(valor),
+            historico='Movimento de teste',
+        )
+
+    def _estado(self):
+        return sorted(
+            MovimentoResumoMensal.objects.values_list(
+                *MovimentoResumoMensal.CAMPOS_CHAVE, 'soma_valor', 'soma_valor_absoluto', 'quantidade'
+            ),
+            key=repr,
+        )
+
+    def test_deltas_igualam_reconstrucao(self):
+        # Inclusões, uma delas sem fornecedor (chave com NULL)
+        for movimento in (
+            self._movimento(date(2025, 1, 20), '10.00'),
+            self._movimento(date(2025, 2, 8), '-5.25', fornecedor=False),
+        ):
+            MovimentoResumoMensal.registrar_inclusao(movimento)
+
+        # Alteração que troca período, unidade e valor
+        movimento = Movimento.objects.get(data=date(2025, 1, 5))
+        anterior = MovimentoResumoMensal.snapshot(movimento)
+        movimento.data = date(2025, 2, 14)
+        movimento.unidade = self.unidade_b
+        movimento.valor = Decimal('130.00')
+        movimento.save()
+        MovimentoResumoMensal.registrar_alteracao(anterior, movimento)
+
+        # Exclusão do único movimento da chave: a linha do resumo some
+        movimento = Movimento.objects.get(data=date(2025, 2, 8))
+        chave = {campo: getattr(movimento, campo) for campo in MovimentoResumoMensal.CAMPOS_CHAVE}
+        anterior = MovimentoResumoMensal.snapshot(movimento)
+        movimento.delete()
+        MovimentoResumoMensal.registrar_exclusao(anterior)
+        self.assertFalse(MovimentoResumoMensal.objects.filter(**chave).exists())
+
+        incremental = self._estado()
+        MovimentoResumoMensal.reconstruir_periodos(self.PERIODOS)
+        self.assertEqual(incremental, self._estado())
+
+        self.assertEqual(
+            MovimentoResumoMensal.objects.get(periodo_mes_ano='2025-02', unidade=self.unidade_b).quantidade, 2
+        )
@@ -0,0 +1,140 @@
+# core/utils/cache_utils.py - Chaves, invalidação e contadores do cache compartilhado
+
+"""
+Camada fina sobre django.core.cache usada por tree_cache, relatorio_cache e
+pelas buscas repetitivas da importação (unidade, centro de custo, conta
+externa, fornecedor).
+
+- chave(namespace, *partes): chaves sempre no formato synchrobi:<namespace>:...
+- geração por namespace: invalidar_namespace() troca um token guardado no
+  próprio cache; cached_query() inclui o token na chave, então todas as
+  entradas antigas do namespace deixam de ser lidas de uma vez, em todos os
+  workers (desde que o backend seja compartilhado - Redis/memcached).
+- hits/misses por namespace em synchrobi.metrics (synchrobi_cache_*_total).
+"""
+
+import hashlib
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from synchrobi import metrics
+
+logger = logging.getLogger('synchrobi')
+
+PREFIXO = 'synchrobi'
+
+CACHE_ACERTOS = 'synchrobi_cache_hits_total'
+CACHE_FALHAS = 'synchrobi_cache_misses_total'
+
+# Distingue "não está no cache" de um None guardado (busca sem resultado)
+_AUSENTE = object()
+
+# "Não encontrado" expira rápido: códigos cadastrados por caminhos que não
+# invalidam o cache passam a ser aceitos em pouco tempo
+TIMEOUT_NAO_ENCONTRADO = 60
+
+
+def timeout_padrao():
+    return getattr(settings, 'SYNCHROBI_CONFIG', {}).get('CACHE_TIMEOUT', 1800)
+
+
+def chave(namespace, *partes):
+    """Chave synchrobi:<namespace>:<partes...>"""
+    return ':'.join([PREFIXO, namespace] + [str(parte) for parte in partes])
+
+
+def registrar_acesso(namespace, acerto, quantidade=1):
+    metrics.incrementar(CACHE_ACERTOS if acerto else CACHE_FALHAS, quantidade, namespace=namespace)
+
+
+def obter(namespace, chave_cache, default=None):
+    """cache.get contabilizando hit/miss do namespace"""
+    valor = cache.get(chave_cache, _AUSENTE)
+    registrar_acesso(namespace, valor is not _AUSENTE)
+    return default if valor is _AUSENTE else valor
+
+
+def obter_varios(namespace, chaves):
+    """cache.get_many contabilizando hits/misses do namespace"""
+    chaves = list(chaves)
+    encontrados = cache.get_many(chaves)
+    if encontrados:
+        registrar_acesso(namespace, True, len(encontrados))
+    if len(encontrados) < len(chaves):
+        registrar_acesso(namespace, False, len(chaves) - len(encontrados))
+    return encontrados
+
+
+def geracao(namespace):
+    """Token atual do namespace (criado na primeira leitura, sem expiração)"""
+    chave_geracao = chave(namespace, 'geracao')
+    token = cache.get(chave_geracao)
+    if token is None:
+        token = uuid.uuid4().hex[:12]
+        # add: dois workers criando ao mesmo tempo ficam com o mesmo token
+        if not cache.add(chave_geracao, token, None):
+            token = cache.get(chave_geracao) or token
+    return token
+
+
+def invalidar_namespace(*namespaces):
+    """Descarta (logicamente) todas as entradas de cached_query dos namespaces"""
+    cache.set_many({chave(namespace, 'geracao'): uuid.uuid4().hex[:12] for namespace in namespaces}, None)
+
+
+def _chave_consulta(namespace, partes):
+    if not isinstance(partes, (list, tuple)):
+        partes = (partes,)
+    # Partes podem ser texto livre (ex.: razão social): hash mantém a chave válida no memcached
+    assinatura = hashlib.md5(repr(tuple(partes)).encode('utf-8')).hexdigest()
+    return chave(namespace, geracao(namespace), assinatura)
+
+
+def invalidar_consulta(namespace, partes):
+    """Descarta só a entrada de cached_query para (namespace, partes); o resto do namespace continua valendo"""
+    cache.delete(_chave_consulta(namespace, partes))
+
+
+def cached_query(namespace, partes, construir, timeout=None):
+    """
+    Resultado de construir() para (namespace, partes), do cache quando possível.
+
+    None também é guardado, mas só por TIMEOUT_NAO_ENCONTRADO segundos (a
+    mesma importação não volta ao banco a cada linha). O timeout padrão dos
+    demais resultados é o CACHE_TIMEOUT: rede de segurança para alterações
+    feitas com update()/bulk sem invalidar_namespace().
+    """
+    chave_cache = _chave_consulta(namespace, partes)
+
+    valor = obter(namespace, chave_cache, _AUSENTE)
+    if valor is not _AUSENTE:
+        return valor
+
+    valor = construir()
+    if valor is None:
+        validade = TIMEOUT_NAO_ENCONTRADO
+    else:
+        validade = timeout if timeout is not None else timeout_padrao()
+    cache.set(chave_cache, valor, validade)
+    return valor
+
+
+def taxas_acerto(contadores):
+    """
+    {namespace: acertos / (acertos + falhas)} a partir dos contadores
+    {(nome, rotulos): total} de metrics.contadores() ou metrics.agregar().
+    """
+    totais = {}
+    for (nome, rotulos), total in contadores.items():
+        if nome not in (CACHE_ACERTOS, CACHE_FALHAS):
+            continue
+        namespace = dict(rotulos).get('namespace', '')
+        acertos, falhas = totais.get(namespace, (0, 0))
+        totais[namespace] = (acertos + total, falhas) if nome == CACHE_ACERTOS else (acertos, falhas + total)
+    return {
+        namespace: acertos / (acertos + falhas)
+        for namespace, (acertos, falhas) in totais.items() if acertos + falhas
+    }
@@ -0,0 +1,37 @@
+# core/utils/csv_streaming.py - Respostas CSV geradas linha a linha
+
+"""
+CSV para StreamingHttpResponse: o csv.writer escreve em um pseudo-arquivo
+que só devolve a linha formatada, então cada linha vai para o cliente assim
+que é gerada e nada se acumula em memória.
+"""
+
+import csv
+
+from django.http import StreamingHttpResponse
+
+
+class _Eco:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de gravá-la"""
+
+    def write(self, valor):
+        return valor
+
+
+def gerar_csv(linhas, delimitador=',', bom=False):
+    """Gerador de strings CSV (uma por linha) a partir de um iterável de listas"""
+    escritor = csv.writer(_Eco(), delimiter=delimitador)
+    if bom:
+        yield '\ufeff'  # BOM para UTF-8 (Excel)
+    for linha in linhas:
+        yield escritor.writerow(linha)
+
+
+def resposta_csv(linhas, nome_arquivo, delimitador=',', bom=False):
+    """StreamingHttpResponse com o CSV das linhas (a primeira é o cabeçalho)"""
+    response = StreamingHttpResponse(
+        gerar_csv(linhas, delimitador=delimitador, bom=bom),
+        content_type='text/csv; charset=utf-8'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
+    return response
@@ -0,0 +1,232 @@
+# core/utils/indices.py - Índices secundários em cargas em massa e relatório de uso
+
+"""
+Modo de carga em massa: os índices declarados em Meta.indexes do modelo são
+removidos antes de uma carga grande e recriados de uma vez ao final, em vez
+de serem atualizados linha a linha. PK, índices de campo (db_index) e os
+índices das FKs continuam ativos.
+
+A carga só compensa quando é grande em relação ao que já está na tabela
+(recriar os índices custa a tabela inteira). Com movimentos particionada o
+escopo é a partição de cada mês carregado: ela é destacada, recebe as linhas
+sem índices e é reanexada, e o PostgreSQL indexa só ela.
+
+A remoção/recriação usa o schema_editor do Django (vale para PostgreSQL e
+SQLite) e é idempotente: só remove o que existe e só recria o que falta,
+então restaurar_indices() também repara uma carga interrompida.
+"""
+
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+from .particionamento import (
+    destacar_particao, meses_entre, nome_particao, reanexar_particao, tabela_particionada,
+)
+
+logger = logging.getLogger('synchrobi')
+
+
+def _limite_carga_massa():
+    return getattr(settings, 'SYNCHROBI_CONFIG', {}).get('CARGA_MASSA_MIN_LINHAS', 50000)
+
+
+def _proporcao_carga_massa():
+    return getattr(settings, 'SYNCHROBI_CONFIG', {}).get('CARGA_MASSA_PROPORCAO_MINIMA', 0.2)
+
+
+def estimar_linhas(tabela):
+    """Linhas da tabela: reltuples no PostgreSQL (sem varrer), COUNT nos demais ou sem estatística"""
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)", [tabela])
+            linha = cursor.fetchone()
+            if linha is None:
+                return 0
+            if linha[0] >= 0:
+                return int(linha[0])
+            # -1: nunca analisada
+        cursor.execute(f"SELECT COUNT(*) FROM {qn(tabela)}")
+        return cursor.fetchone()[0]
+
+
+def compensa_carga_em_massa(linhas, tabelas):
+    """
+    True quando a carga é grande o bastante para valer remover e recriar os
+    índices das tabelas: pelo menos CARGA_MASSA_MIN_LINHAS e pelo menos
+    CARGA_MASSA_PROPORCAO_MINIMA das linhas que elas já têm (SYNCHROBI_CONFIG).
+    """
+    if linhas is None:
+        return True
+    if linhas < _limite_carga_massa():
+        return False
+    existentes = sum(estimar_linhas(tabela) for tabela in tabelas)
+    return linhas >= existentes * _proporcao_carga_massa()
+
+
+def _inserir_em_tabela(obj, tabela):
+    """INSERT do objeto (já preparado) direto na tabela informada, sem passar pela tabela-mãe"""
+    qn = connection.ops.quote_name
+    opts = obj._meta
+    campos = [campo for campo in opts.local_concrete_fields if not campo.primary_key]
+    valores = [campo.get_db_prep_save(campo.pre_save(obj, True), connection) for campo in campos]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {qn(tabela)} ({', '.join(qn(campo.column) for campo in campos)}) "
+            f"VALUES ({', '.join(['%s'] * len(campos))}) RETURNING {qn(opts.pk.column)}",
+            valores
+        )
+        obj.pk = cursor.fetchone()[0]
+    obj._state.adding = False
+    obj._state.db = connection.alias
+    return obj
+
+
+class CargaEmMassa:
+    """
+    Estado de uma carga_em_massa. ativa indica que os índices estão adiados;
+    salvar(movimento) grava na partição destacada do mês quando houver,
+    senão pelo save() normal.
+    """
+
+    def __init__(self, ativa=False, particoes=None):
+        self.ativa = ativa
+        self.particoes = particoes or set()
+
+    def __bool__(self):
+        return self.ativa
+
+    def salvar(self, obj):
+        tabela = nome_particao(obj.data.year, obj.data.month) if obj.data else None
+        if tabela not in self.particoes:
+            obj.save()
+            return obj
+        obj.preparar_gravacao()
+        return _inserir_em_tabela(obj, tabela)
+
+
+def _indices_existentes(model):
+    with connection.cursor() as cursor:
+        restricoes = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return {nome for nome, info in restricoes.items() if info.get('index')}
+
+
+def indices_adiaveis(model):
+    """Índices de Meta.indexes (os únicos removidos no modo de carga em massa)"""
+    return [indice for indice in model._meta.indexes if indice.name]
+
+
+def adiar_indices(model):
+    """Remove os índices adiáveis existentes; retorna os nomes removidos"""
+    existentes = _indices_existentes(model)
+    removidos = []
+
+    with connection.schema_editor(atomic=False) as schema_editor:
+        for indice in indices_adiaveis(model):
+            if indice.name in existentes:
+                schema_editor.remove_index(model, indice)
+                removidos.append(indice.name)
+
+    if removidos:
+        logger.info(f'Carga em massa: {len(removidos)} índices de {model._meta.db_table} removidos')
+    return removidos
+
+
+def restaurar_indices(model):
+    """Recria os índices adiáveis que estiverem faltando; retorna os nomes criados"""
+    existentes = _indices_existentes(model)
+    criados = []
+
+    with connection.schema_editor(atomic=False) as schema_editor:
+        for indice in indices_adiaveis(model):
+            if indice.name not in existentes:
+                schema_editor.add_index(model, indice)
+                criados.append(indice.name)
+
+    if criados:
+        logger.info(f'Carga em massa: {len(criados)} índices de {model._meta.db_table} recriados')
+    return criados
+
+
+@contextmanager
+def carga_em_massa(model, linhas=None, data_inicio=None, data_fim=None):
+    """
+    Executa o bloco com os índices adiáveis do modelo removidos; entrega um
+    CargaEmMassa, cujo salvar() o bloco usa para gravar as linhas.
+
+    Só entra em modo de carga quando compensa_carga_em_massa(linhas, ...).
+    Em tabela particionada o índice pertence à tabela-mãe e removê-lo
+    reconstruiria todos os meses: com o intervalo de datas da carga, as
+    partições dos meses são destacadas, carregadas e reanexadas (a proporção
+    é medida contra elas); sem o intervalo, a carga segue sem o modo.
+    Os índices são recriados mesmo se o bloco falhar.
+    """
+    tabela = model._meta.db_table
+
+    if connection.in_atomic_block:
+        # DDL dentro da transação da carga seguraria locks até o fim
+        logger.info(f'Carga em massa ignorada para {tabela} (dentro de transação)')
+        yield CargaEmMassa()
+        return
+
+    if tabela_particionada(tabela):
+        if data_inicio is None or data_fim is None:
+            logger.info(f'Carga em massa ignorada para {tabela} (particionada, sem intervalo de datas)')
+            yield CargaEmMassa()
+            return
+
+        meses = list(meses_entre(data_inicio, data_fim))
+        if not compensa_carga_em_massa(linhas, [nome_particao(ano, mes) for ano, mes in meses]):
+            yield CargaEmMassa()
+            return
+
+        indices = [indice.name for indice in indices_adiaveis(model)]
+        destacados = []
+        try:
+            for ano, mes in meses:
+                destacar_particao(ano, mes, indices)
+                destacados.append((ano, mes))
+            yield CargaEmMassa(True, {nome_particao(ano, mes) for ano, mes in destacados})
+        finally:
+            for ano, mes in destacados:
+                reanexar_particao(ano, mes)
+        return
+
+    if not compensa_carga_em_massa(linhas, [tabela]):
+        yield CargaEmMassa()
+        return
+
+    adiar_indices(model)
+    try:
+        yield CargaEmMassa(True)
+    finally:
+        restaurar_indices(model)
+
+
+def estatisticas_uso_indices(prefixo_tabela):
+    """
+    Uso dos índices das tabelas com o prefixo informado (pg_stat_user_indexes).
+
+    Retorna dicts com tabela, indice, varreduras, tuplas_lidas, tamanho (bytes),
+    unico e primario, dos menos usados para os mais usados. Fora do PostgreSQL
+    não há estatísticas e a lista vem vazia.
+    """
+    if connection.vendor != 'postgresql':
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT s.relname, s.indexrelname, s.idx_scan, s.idx_tup_read, "
+            "pg_relation_size(s.indexrelid), i.indisunique, i.indisprimary "
+            "FROM pg_stat_user_indexes s "
+            "JOIN pg_index i ON i.indexrelid = s.indexrelid "
+            "WHERE s.relname = %s OR s.relname LIKE %s "
+            "ORDER BY s.idx_scan ASC, pg_relation_size(s.indexrelid) DESC",
+            [prefixo_tabela, f'{prefixo_tabela}\\_%']
+        )
+        colunas = ['tabela', 'indice', 'varreduras', 'tuplas_lidas', 'tamanho', 'unico', 'primario']
+        return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
@@ -0,0 +1,131 @@
+# core/utils/paginacao.py - Paginação por cursor (keyset)
+
+"""
+Paginação keyset: em vez de OFFSET, cada página continua a partir da chave
+de ordenação da última (ou primeira) linha da página anterior, então o custo
+de qualquer página é o de ler tamanho+1 linhas pelo índice.
+
+O cursor é opaco e assinado (django.core.signing): o cliente não consegue
+forjar posições nem injetar valores nos filtros.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+
+SALT_CURSOR = 'synchrobi.paginacao.cursor'
+
+
+@dataclass
+class PaginaCursor:
+    """Página de resultados com cursores para a próxima e a anterior"""
+    itens: List = field(default_factory=list)
+    cursor_proximo: Optional[str] = None
+    cursor_anterior: Optional[str] = None
+    primeira: bool = True
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+    @property
+    def has_next(self):
+        return self.cursor_proximo is not None
+
+    @property
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def _valor_ordenacao(obj, campo):
+    valor = getattr(obj, campo)
+    return valor.isoformat() if hasattr(valor, 'isoformat') else valor
+
+
+def _converter(model, campo, valor):
+    try:
+        return model._meta.get_field(campo).to_python(valor)
+    except FieldDoesNotExist:
+        # Anotação (ex.: relevância da busca)
+        return valor
+
+
+def _filtro_apos(model, ordenacao, valores, inverter):
+    """
+    Condição lexicográfica "linha vem depois da chave" para a ordenação dada.
+
+    (a, b, c) depois de (x, y, z) = a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z),
+    com > trocado por < nos campos decrescentes (e tudo invertido ao voltar).
+    """
+    condicao = Q()
+    iguais = Q()
+    for campo_ordem, valor in zip(ordenacao, valores):
+        decrescente = campo_ordem.startswith('-')
+        campo = campo_ordem.lstrip('-')
+        valor = _converter(model, campo, valor)
+        operador = 'lt' if decrescente != inverter else 'gt'
+        condicao |= iguais & Q(**{f'{campo}__{operador}': valor})
+        iguais &= Q(**{campo: valor})
+    return condicao
+
+
+def paginar_por_cursor(queryset, cursor: Optional[str] = None, tamanho: int = 20,
+                       ordenacao: Sequence[str] = ('-data', '-id')) -> PaginaCursor:
+    """
+    Retorna a página do queryset indicada pelo cursor (None = primeira página).
+
+    A ordenação precisa terminar em um campo único (id) para ser total.
+    Cursor inválido ou adulterado volta para a primeira página.
+    """
+    ordenacao = list(ordenacao)
+    model = queryset.model
+
+    posicao = None
+    if cursor:
+        try:
+            posicao = signing.loads(cursor, salt=SALT_CURSOR)
+            if len(posicao.get('v', [])) != len(ordenacao):
+                posicao = None
+        except signing.BadSignature:
+            posicao = None
+
+    voltando = bool(posicao and posicao.get('d') == 'anterior')
+
+    if posicao:
+        queryset = queryset.filter(_filtro_apos(model, ordenacao, posicao['v'], inverter=voltando))
+
+    if voltando:
+        invertida = [campo[1:] if campo.startswith('-') else f'-{campo}' for campo in ordenacao]
+        itens = list(queryset.order_by(*invertida)[:tamanho + 1])
+        ha_mais = len(itens) > tamanho
+        itens = list(reversed(itens[:tamanho]))
+        tem_anterior, tem_proxima = ha_mais, True
+    else:
+        itens = list(queryset.order_by(*ordenacao)[:tamanho + 1])
+        ha_mais = len(itens) > tamanho
+        itens = itens[:tamanho]
+        tem_anterior, tem_proxima = posicao is not None, ha_mais
+
+    campos = [campo.lstrip('-') for campo in ordenacao]
+
+    def gerar(obj, direcao):
+        return signing.dumps(
+            {'v': [_valor_ordenacao(obj, campo) for campo in campos], 'd': direcao},
+            salt=SALT_CURSOR, compress=True
+        )
+
+    return PaginaCursor(
+        itens=itens,
+        cursor_proximo=gerar(itens[-1], 'proximo') if itens and tem_proxima else None,
+        cursor_anterior=gerar(itens[0], 'anterior') if itens and tem_anterior else None,
+        primeira=not tem_anterior,
+    )
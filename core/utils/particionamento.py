@@ -0,0 +1,251 @@
+# core/utils/particionamento.py - Particionamento mensal da tabela movimentos (PostgreSQL)
+
+"""
+Particionamento declarativo opcional de movimentos por RANGE (data), uma
+partição por mês (movimentos_pAAAA_MM) mais a partição default.
+
+Com a tabela particionada, substituir um mês inteiro vira DETACH + DROP da
+partição e criação de uma partição vazia, em vez de um DELETE gigante com
+atualização de todos os índices. Fora do PostgreSQL (ou com a tabela ainda
+não convertida) tudo continua como DELETE comum.
+
+A conversão da tabela existente é feita pelo comando particionar_movimentos.
+"""
+
+import logging
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+
+logger = logging.getLogger('synchrobi')
+
+TABELA = 'movimentos'
+PARTICAO_DEFAULT = f'{TABELA}_default'
+
+
+def primeiro_dia_mes_seguinte(ano, mes):
+    return date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+
+
+def meses_entre(data_inicio, data_fim):
+    ano, mes = data_inicio.year, data_inicio.month
+    while (ano, mes) <= (data_fim.year, data_fim.month):
+        yield ano, mes
+        mes += 1
+        if mes > 12:
+            ano, mes = ano + 1, 1
+
+
+def nome_particao(ano, mes):
+    return f'{TABELA}_p{ano}_{mes:02d}'
+
+
+def tabela_particionada(tabela=TABELA):
+    """True quando a tabela é particionada (sempre False fora do PostgreSQL)"""
+    if connection.vendor != 'postgresql':
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [tabela]
+        )
+        return cursor.fetchone() is not None
+
+
+def listar_particoes():
+    """[(nome, limites), ...] das partições de movimentos"""
+    if not tabela_particionada():
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s ORDER BY c.relname",
+            [TABELA]
+        )
+        return cursor.fetchall()
+
+
+def colunas_copiaveis(cursor, tabela):
+    """Colunas que aceitam INSERT (exclui colunas geradas, como busca_vetor)"""
+    cursor.execute(
+        "SELECT attname FROM pg_attribute "
+        "WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped AND attgenerated = '' "
+        "ORDER BY attnum",
+        [tabela]
+    )
+    return ', '.join(connection.ops.quote_name(linha[0]) for linha in cursor.fetchall())
+
+
+def _particao_existe(cursor, nome):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [nome])
+    return cursor.fetchone()[0]
+
+
+def garantir_particao(ano, mes):
+    """
+    Cria a partição do mês se ainda não existir.
+
+    Linhas do mês que tenham caído na partição default são movidas para a
+    nova partição antes do ATTACH (senão o ATTACH falharia).
+    Retorna True quando a partição foi criada.
+    """
+    nome = nome_particao(ano, mes)
+    inicio = date(ano, mes, 1)
+    fim = primeiro_dia_mes_seguinte(ano, mes)
+    qn = connection.ops.quote_name
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if _particao_existe(cursor, nome):
+            return False
+
+        cursor.execute(
+            f"CREATE TABLE {qn(nome)} (LIKE {qn(TABELA)} INCLUDING DEFAULTS "
+            f"INCLUDING CONSTRAINTS INCLUDING GENERATED)"
+        )
+        _anexar_particao(cursor, nome, inicio, fim)
+
+    logger.info(f'Partição {nome} criada')
+    return True
+
+
+def _anexar_particao(cursor, nome, inicio, fim):
+    """ATTACH da tabela como partição do intervalo, trazendo antes as linhas do intervalo que estejam na default"""
+    qn = connection.ops.quote_name
+
+    if _particao_existe(cursor, PARTICAO_DEFAULT):
+        colunas = colunas_copiaveis(cursor, nome)
+        cursor.execute(
+            f"WITH movidos AS (DELETE FROM {qn(PARTICAO_DEFAULT)} "
+            f"WHERE data >= %s AND data < %s RETURNING *) "
+            f"INSERT INTO {qn(nome)} ({colunas}) SELECT {colunas} FROM movidos",
+            [inicio, fim]
+        )
+    cursor.execute(
+        f"ALTER TABLE {qn(TABELA)} ATTACH PARTITION {qn(nome)} "
+        f"FOR VALUES FROM (%s) TO (%s)",
+        [inicio, fim]
+    )
+
+
+def destacar_particao(ano, mes, indices_mae=()):
+    """
+    DETACH da partição do mês para uma carga isolada da tabela-mãe.
+
+    Os índices da partição que pertencem a indices_mae (nomes dos índices da
+    tabela-mãe) são removidos; reanexar_particao() os recria só nela.
+    Enquanto destacada, consultas em movimentos não enxergam o mês.
+    Retorna o nome da partição.
+    """
+    nome = nome_particao(ano, mes)
+    qn = connection.ops.quote_name
+    garantir_particao(ano, mes)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT filho.relname FROM pg_inherits i "
+            "JOIN pg_class filho ON filho.oid = i.inhrelid "
+            "JOIN pg_class mae ON mae.oid = i.inhparent "
+            "JOIN pg_index x ON x.indexrelid = filho.oid "
+            "WHERE mae.relname = ANY(%s) AND x.indrelid = %s::regclass",
+            [list(indices_mae), nome]
+        )
+        indices = [linha[0] for linha in cursor.fetchall()]
+
+        cursor.execute(f"ALTER TABLE {qn(TABELA)} DETACH PARTITION {qn(nome)}")
+        for indice in indices:
+            cursor.execute(f"DROP INDEX {qn(indice)}")
+
+    logger.info(f'Partição {nome} destacada para carga ({len(indices)} índices removidos)')
+    return nome
+
+
+def reanexar_particao(ano, mes):
+    """ATTACH da partição destacada; o PostgreSQL recria nela os índices da tabela-mãe que faltam"""
+    nome = nome_particao(ano, mes)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        _anexar_particao(cursor, nome, date(ano, mes, 1), primeiro_dia_mes_seguinte(ano, mes))
+
+    logger.info(f'Partição {nome} reanexada')
+
+
+def garantir_particoes_intervalo(data_inicio, data_fim):
+    """Garante uma partição para cada mês do intervalo (no-op sem particionamento)"""
+    if not tabela_particionada():
+        return 0
+    return sum(1 for ano, mes in meses_entre(data_inicio, data_fim) if garantir_particao(ano, mes))
+
+
+def descartar_particao(ano, mes):
+    """
+    DETACH + DROP da partição do mês e criação de uma partição vazia no lugar.
+
+    Retorna quantos movimentos a partição tinha.
+    """
+    nome = nome_particao(ano, mes)
+    qn = connection.ops.quote_name
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            if _particao_existe(cursor, nome):
+                # reltuples seria aproximado; o COUNT de uma partição isolada é barato
+                cursor.execute(f"SELECT COUNT(*) FROM {qn(nome)}")
+                removidos = cursor.fetchone()[0]
+                cursor.execute(f"ALTER TABLE {qn(TABELA)} DETACH PARTITION {qn(nome)}")
+                cursor.execute(f"DROP TABLE {qn(nome)}")
+            elif _particao_existe(cursor, PARTICAO_DEFAULT):
+                # Mês ainda sem partição própria: as linhas estão na default
+                cursor.execute(
+                    f"DELETE FROM {qn(PARTICAO_DEFAULT)} WHERE data >= %s AND data < %s",
+                    [date(ano, mes, 1), primeiro_dia_mes_seguinte(ano, mes)]
+                )
+                removidos = cursor.rowcount
+            else:
+                removidos = 0
+
+        garantir_particao(ano, mes)
+
+    logger.info(f'Partição {nome} substituída ({removidos} movimentos descartados)')
+    return removidos
+
+
+def substituir_periodo_datas(data_inicio, data_fim):
+    """
+    Remove os movimentos do intervalo de datas para nova carga.
+
+    Meses inteiramente cobertos pelo intervalo são descartados por partição;
+    meses parciais (e bancos sem particionamento) usam DELETE.
+    Retorna o total de movimentos removidos.
+    """
+    from core.models import Movimento
+
+    if not tabela_particionada():
+        movimentos = Movimento.objects.filter(data__gte=data_inicio, data__lte=data_fim)
+        removidos = movimentos.count()
+        if removidos:
+            movimentos.delete()
+        return removidos
+
+    removidos = 0
+    with transaction.atomic():
+        for ano, mes in meses_entre(data_inicio, data_fim):
+            inicio_mes = date(ano, mes, 1)
+            ultimo_dia = primeiro_dia_mes_seguinte(ano, mes) - timedelta(days=1)
+
+            if data_inicio <= inicio_mes and data_fim >= ultimo_dia:
+                removidos += descartar_particao(ano, mes)
+            else:
+                garantir_particao(ano, mes)
+                removidos += Movimento.objects.filter(
+                    data__gte=max(data_inicio, inicio_mes),
+                    data__lte=min(data_fim, ultimo_dia),
+                ).delete()[0]
+
+    return removidos
@@ -0,0 +1,175 @@
+# core/utils/relatorio_cache.py - Cache de resultados de relatórios por período
+
+"""
+Resultados de relatórios ficam no cache configurado, com chave derivada da
+assinatura normalizada dos filtros. Cada entrada é marcada com os períodos
+(YYYY-MM) que cobre: para cada período existe um token de versão no cache e
+a entrada guarda os tokens vigentes quando foi montada.
+
+Invalidar um período = descartar o seu token. Só as entradas que cobrem o
+período deixam de bater com os tokens atuais; meses fechados que não foram
+reimportados continuam quentes (sem expiração).
+"""
+
+import hashlib
+import json
+import logging
+import uuid
+from datetime import date
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.utils.cache_utils import chave as chave_cache, obter, obter_varios, timeout_padrao
+
+logger = logging.getLogger('synchrobi')
+
+CACHE_NAMESPACE = 'relatorio'
+CACHE_PREFIX = chave_cache(CACHE_NAMESPACE)
+
+# Tag invalidada junto com qualquer período (entradas sem intervalo definido)
+TAG_QUALQUER_PERIODO = '*'
+
+
+def _chave_tag(periodo):
+    return f"{CACHE_PREFIX}:tag:{periodo}"
+
+
+def periodos_intervalo(periodo_inicio, periodo_fim):
+    """Lista de períodos YYYY-MM entre dois períodos (inclusive)"""
+    ano, mes = int(periodo_inicio[:4]), int(periodo_inicio[5:7])
+    ano_fim, mes_fim = int(periodo_fim[:4]), int(periodo_fim[5:7])
+
+    periodos = []
+    while (ano, mes) <= (ano_fim, mes_fim):
+        periodos.append(f"{ano}-{mes:02d}")
+        mes += 1
+        if mes > 12:
+            ano, mes = ano + 1, 1
+    return periodos
+
+
+def deslocar_periodo(periodo, meses):
+    """Período YYYY-MM deslocado de n meses (negativo = para trás)"""
+    indice = int(periodo[:4]) * 12 + int(periodo[5:7]) - 1 + meses
+    return f"{indice // 12}-{indice % 12 + 1:02d}"
+
+
+def periodo_fechado(periodo, hoje=None):
+    """Períodos anteriores ao mês corrente são considerados fechados"""
+    if periodo == TAG_QUALQUER_PERIODO:
+        # Invalidada a cada mudança: pode ficar sem expiração
+        return True
+    hoje = hoje or date.today()
+    return periodo < f"{hoje.year}-{hoje.month:02d}"
+
+
+def assinatura_relatorio(filtros):
+    """Hash estável do conjunto de filtros (ordem das chaves não importa; vazios descartados)"""
+    normalizados = {
+        chave: valor for chave, valor in filtros.items()
+        if valor not in (None, '', [], (), {})
+    }
+    conteudo = json.dumps(normalizados, sort_keys=True, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()
+
+
+def _tokens_atuais(periodos, criar=False):
+    chaves = {_chave_tag(periodo): periodo for periodo in periodos}
+    existentes = cache.get_many(list(chaves))
+    tokens = {chaves[chave]: token for chave, token in existentes.items()}
+
+    if criar:
+        novos = {
+            _chave_tag(periodo): uuid.uuid4().hex
+            for periodo in periodos if periodo not in tokens
+        }
+        if novos:
+            # Tags não expiram: só mudam quando o período é invalidado
+            cache.set_many(novos, None)
+            tokens.update({chaves[chave]: token for chave, token in novos.items()})
+
+    return tokens
+
+
+def relatorio_cacheado(namespace, filtros, periodos, construir, timeout=None):
+    """
+    Retorna o resultado de construir() reaproveitando o cache enquanto nenhum
+    dos períodos cobertos for invalidado.
+
+    Relatórios que só cobrem meses fechados ficam no cache sem expiração;
+    os que incluem o mês corrente usam o CACHE_TIMEOUT padrão.
+    """
+    periodos = sorted(set(periodos))
+    chave = f"{CACHE_PREFIX}:{namespace}:{assinatura_relatorio(filtros)}"
+
+    entrada = obter(CACHE_NAMESPACE, chave)
+    if entrada is not None:
+        tokens = _tokens_atuais(periodos)
+        if tokens == entrada['tokens']:
+            logger.debug(f'Relatório {namespace} servido do cache ({chave})')
+            return entrada['resultado']
+
+    # Tokens lidos antes de montar: uma invalidação concorrente durante a
+    # montagem troca o token e a entrada nasce já vencida
+    tokens = _tokens_atuais(periodos, criar=True)
+    resultado = construir()
+
+    if timeout is None and not all(periodo_fechado(periodo) for periodo in periodos):
+        timeout = timeout_padrao()
+
+    cache.set(chave, {'tokens': tokens, 'resultado': resultado}, timeout)
+    return resultado
+
+
+def relatorio_por_periodo(namespace, filtros, periodos, construir_faltantes):
+    """
+    Variante de relatorio_cacheado com uma entrada por período.
+
+    Útil para séries mensais: cada mês é guardado separado (fechados sem
+    expiração) e construir_faltantes(periodos) monta de uma vez, em uma única
+    consulta, só os meses sem entrada válida, devolvendo {periodo: resultado}.
+    """
+    periodos = sorted(set(periodos))
+    assinatura = assinatura_relatorio(filtros)
+    chaves = {periodo: f"{CACHE_PREFIX}:{namespace}:{assinatura}:{periodo}" for periodo in periodos}
+
+    entradas = obter_varios(CACHE_NAMESPACE, chaves.values())
+    tokens = _tokens_atuais(periodos)
+
+    resultados = {}
+    for periodo, chave in chaves.items():
+        entrada = entradas.get(chave)
+        if entrada is not None and tokens.get(periodo) == entrada['token']:
+            resultados[periodo] = entrada['resultado']
+
+    faltantes = [periodo for periodo in periodos if periodo not in resultados]
+    if not faltantes:
+        logger.debug(f'Relatório {namespace} servido do cache ({len(periodos)} períodos)')
+        return resultados
+
+    tokens = _tokens_atuais(faltantes, criar=True)
+    novos = construir_faltantes(faltantes)
+
+    fechados, abertos = {}, {}
+    for periodo in faltantes:
+        entrada = {'token': tokens[periodo], 'resultado': novos.get(periodo)}
+        (fechados if periodo_fechado(periodo) else abertos)[chaves[periodo]] = entrada
+        resultados[periodo] = entrada['resultado']
+
+    if fechados:
+        cache.set_many(fechados, None)
+    if abertos:
+        cache.set_many(abertos, timeout_padrao())
+
+    return resultados
+
+
+def invalidar_periodos(periodos):
+    """Descarta os tokens dos períodos; entradas que os cobrem deixam de ser válidas"""
+    periodos = sorted({periodo for periodo in periodos if periodo})
+    if not periodos:
+        return
+
+    cache.delete_many([_chave_tag(periodo) for periodo in periodos + [TAG_QUALQUER_PERIODO]])
+    logger.debug(f'Cache de relatórios invalidado para {", ".join(periodos)}')
@@ -0,0 +1,139 @@
+# core/utils/tree_cache.py - Cache e respostas condicionais das árvores hierárquicas
+
+"""
+Versionamento barato das tabelas hierárquicas (Unidade, CentroCusto, ContaContabil)
+para responder GETs condicionais (ETag) e reaproveitar o JSON serializado da
+árvore entre requisições com os mesmos filtros.
+
+A versão de um conjunto de modelos é derivada de COUNT + MAX(data_alteracao):
+qualquer inclusão, alteração ou exclusão muda o par e invalida naturalmente
+tanto o ETag quanto as entradas de cache (a versão faz parte da chave).
+
+Last-Modified não é emitido: viria só de MAX(data_alteracao), que não muda
+quando se exclui um registro que não é o mais recente, e um cliente que
+mandasse apenas If-Modified-Since receberia 304 com a árvore antiga.
+"""
+
+import hashlib
+import json
+import logging
+from functools import wraps
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from core.utils.cache_utils import chave as chave_cache, obter, timeout_padrao
+
+logger = logging.getLogger('synchrobi')
+
+CACHE_NAMESPACE = 'tree'
+CACHE_PREFIX = chave_cache(CACHE_NAMESPACE)
+
+
+def calcular_versao(*models):
+    """
+    Retorna a versão (hash de COUNT + MAX(data_alteracao)) do conjunto de modelos.
+
+    Uma única agregação por modelo; todos precisam ter o campo data_alteracao.
+    """
+    partes = []
+
+    for model in models:
+        dados = model.objects.aggregate(total=Count('pk'), ultima=Max('data_alteracao'))
+        ultima = dados['ultima']
+        partes.append(
+            f"{model._meta.label_lower}:{dados['total']}:{ultima.timestamp() if ultima else 0}"
+        )
+
+    return hashlib.md5('|'.join(partes).encode('utf-8')).hexdigest()
+
+
+def assinatura_filtros(params):
+    """Assinatura estável dos parâmetros GET (ordem dos parâmetros não importa)"""
+    itens = sorted((chave, tuple(params.getlist(chave))) for chave in params.keys())
+    return hashlib.md5(repr(itens).encode('utf-8')).hexdigest()[:16]
+
+
+def resposta_condicional_arvore(*models):
+    """
+    Decorator para APIs de árvore: responde 304 quando o cliente já possui a
+    versão atual (If-None-Match) sem montar a árvore.
+
+    A versão calculada fica disponível em request.versao_arvore para que
+    resposta_arvore_cacheada monte a resposta com os cabeçalhos de validação.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+
+            versao = calcular_versao(*models)
+            etag = f'"{versao}-{assinatura_filtros(request.GET)}"'
+
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                patch_cache_control(response, private=True, no_cache=True)
+                return response
+
+            request.versao_arvore = {
+                'versao': versao,
+                'etag': etag,
+            }
+            return view_func(request, *args, **kwargs)
+
+        return _wrapped_view
+    return decorator
+
+
+def resposta_arvore_cacheada(request, namespace, construir_payload, timeout=None):
+    """
+    Retorna HttpResponse JSON da árvore, reaproveitando o payload serializado
+    em cache para a mesma versão + filtros.
+
+    construir_payload() só é chamado em caso de cache miss. Apenas respostas
+    montadas por aqui recebem ETag; respostas de erro das views
+    continuam sem validadores e nunca são cacheadas.
+    """
+    info = getattr(request, 'versao_arvore', None)
+    if info is None:
+        # View chamada sem o decorator: sem versão, sem cache
+        return HttpResponse(
+            json.dumps(construir_payload(), cls=DjangoJSONEncoder, ensure_ascii=False),
+            content_type='application/json'
+        )
+
+    chave = f"{CACHE_PREFIX}:{namespace}:{info['versao']}:{assinatura_filtros(request.GET)}"
+    conteudo = obter(CACHE_NAMESPACE, chave)
+
+    if conteudo is None:
+        conteudo = json.dumps(construir_payload(), cls=DjangoJSONEncoder, ensure_ascii=False)
+        cache.set(chave, conteudo, timeout if timeout is not None else timeout_padrao())
+    else:
+        logger.debug(f'Árvore {namespace} servida do cache ({chave})')
+
+    response = HttpResponse(conteudo, content_type='application/json')
+    response['ETag'] = info['etag']
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def snapshot_arvore_cacheado(namespace, models, construir, timeout=None):
+    """
+    Retorna o snapshot (árvore + estatísticas) montado por construir(),
+    reaproveitando o cache enquanto a versão dos modelos não mudar.
+
+    Usado pelas páginas HTML das árvores, que não passam pelo decorator.
+    """
+    versao = calcular_versao(*models)
+    chave = f"{CACHE_PREFIX}:{namespace}:snapshot:{versao}"
+
+    snapshot = obter(CACHE_NAMESPACE, chave)
+    if snapshot is None:
+        snapshot = construir()
+        cache.set(chave, snapshot, timeout if timeout is not None else timeout_padrao())
+
+    return snapshot
@@ -1,9 +1,91 @@
 # core/utils/tree_utils.py - Utilitários genéricos para árvores hierárquicas
 
-from django.db.models import Q
+from django.db.models import Q, Count, Exists, OuterRef, F, Value
+from django.db.models.functions import Length, Replace
 from django.http import JsonResponse
 import json
 
+
+def calcular_estatisticas_arvore(queryset, nivel=None, campo_tipo='tipo',
+                                 tipo_por_filhos=False, por_empresa=False):
+    """
+    Estatísticas de árvore calculadas no banco, compartilhadas por
+    Unidade, CentroCusto, ContaContabil e TreeViewMixin.
+    
+    - uma query values(nivel, tipo).annotate(Count) para totais/níveis/tipos
+    - uma agregação com Exists para contar nós com filhos ativos (se houver codigo_pai)
+    - opcionalmente uma query agrupada por empresa
+    
+    nivel: expressão do nível (padrão: campo nivel). tipo_por_filhos=True conta
+    como sintético quem tem filhos (regra histórica das unidades).
+    """
+    model = queryset.model
+    base = queryset.order_by()
+    expressao_nivel = nivel if nivel is not None else F('nivel')
+    tem_tipo = campo_tipo and any(f.name == campo_tipo for f in model._meta.concrete_fields)
+    
+    campos_grupo = ['_nivel'] + ([campo_tipo] if tem_tipo else [])
+    linhas = (
+        base.annotate(_nivel=expressao_nivel)
+        .values(*campos_grupo)
+        .annotate(_total=Count('pk'))
+    )
+    
+    total = 0
+    por_nivel = {}
+    por_tipo = {}
+    for linha in linhas:
+        quantidade = linha['_total']
+        total += quantidade
+        por_nivel[linha['_nivel']] = por_nivel.get(linha['_nivel'], 0) + quantidade
+        if tem_tipo and linha[campo_tipo]:
+            por_tipo[linha[campo_tipo]] = por_tipo.get(linha[campo_tipo], 0) + quantidade
+    
+    if total == 0:
+        return {
+            'total': 0,
+            'tipo_s': 0,
+            'tipo_a': 0,
+            'nivel_max': 0,
+            'contas_por_nivel': {}
+        }
+    
+    nivel_min = min(por_nivel)
+    nivel_max = max(por_nivel)
+    
+    stats = {
+        'total': total,
+        'tipo_s': por_tipo.get('S', 0),
+        'tipo_a': por_tipo.get('A', 0),
+        'nivel_max': nivel_max,
+        'nivel_min': nivel_min,
+        'contas_por_nivel': {
+            str(n): por_nivel.get(n, 0) for n in range(nivel_min, nivel_max + 1)
+        },
+        'niveis_existentes': sorted(por_nivel),
+        'por_tipo': por_tipo,
+    }
+    
+    # Existência de filhos (ativos) em uma única agregação
+    if any(f.name == 'codigo_pai' for f in model._meta.concrete_fields):
+        active_field = 'ativo' if hasattr(model, 'ativo') else 'ativa'
+        filhos = model.objects.filter(codigo_pai=OuterRef('codigo'), **{active_field: True})
+        stats['com_filhos'] = base.filter(Exists(filhos)).count()
+        
+        if tipo_por_filhos:
+            stats['tipo_s'] = stats['com_filhos']
+            stats['tipo_a'] = total - stats['com_filhos']
+    
+    if por_empresa:
+        stats['empresas_stats'] = dict(
+            base.filter(empresa__isnull=False)
+            .values_list('empresa__sigla')
+            .annotate(total=Count('pk'))
+        )
+    
+    return stats
+
+
 class TreeViewMixin:
     """
     Mixin genérico para criar visualizações hierárquicas
@@ -104,34 +186,26 @@ class TreeViewMixin:
         if queryset is None:
             queryset = self.get_tree_queryset()
         
-        total = queryset.count()
+        # Nível derivado do código (quantidade de pontos + 1), calculado no banco
+        nivel = (
+            Length(self.codigo_field)
+            - Length(Replace(self.codigo_field, Value('.'), Value('')))
+            + 1
+        )
+        dados = calcular_estatisticas_arvore(queryset, nivel=nivel, campo_tipo=self.tipo_field)
         
         stats = {
-            'total': total,
-            'nivel_max': 0,
-            'contas_por_nivel': {}
+            'total': dados['total'],
+            'nivel_max': dados['nivel_max'],
+            'contas_por_nivel': {
+                n: dados['contas_por_nivel'].get(str(n), 0)
+                for n in range(1, dados['nivel_max'] + 1)
+            }
         }
         
-        # Calcular níveis
-        if total > 0:
-            codigos = queryset.values_list(self.codigo_field, flat=True)
-            niveis = [self.calculate_level(codigo) for codigo in codigos]
-            stats['nivel_max'] = max(niveis) if niveis else 0
-            
-            # Contar por nível
-            for nivel in range(1, stats['nivel_max'] + 1):
-                count = sum(1 for n in niveis if n == nivel)
-                stats['contas_por_nivel'][nivel] = count
-        
         # Estatísticas por tipo (se aplicável)
-        if hasattr(self.model, self.tipo_field):
-            try:
-                tipos = queryset.values_list(self.tipo_field, flat=True).distinct()
-                for tipo in tipos:
-                    if tipo:
-                        stats[f'tipo_{tipo.lower()}'] = queryset.filter(**{self.tipo_field: tipo}).count()
-            except:
-                pass
+        for tipo, quantidade in dados.get('por_tipo', {}).items():
+            stats[f'tipo_{tipo.lower()}'] = quantidade
         
         return stats
     
@@ -0,0 +1,111 @@
+# gestor/management/commands/medir_inicializacao.py
+# Mede o boot de um worker (python -X importtime + RSS) e falha em regressões
+
+import json
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Só podem ser carregados dentro das rotinas de importação/exportação/relatórios
+MODULOS_PESADOS = ('pandas', 'numpy', 'openpyxl', 'pyarrow', 'PIL')
+
+# O que um worker do gunicorn faz antes da primeira requisição
+SCRIPT_BOOT = '''
+import json, sys, time
+inicio = time.perf_counter()
+import django
+django.setup()
+from django.conf import settings
+from django.urls import get_resolver
+from synchrobi.wsgi import application
+get_resolver(settings.ROOT_URLCONF).url_patterns
+segundos = time.perf_counter() - inicio
+from synchrobi import metrics
+print(json.dumps({
+    'segundos': segundos,
+    'rss_bytes': metrics.rss_bytes(),
+    'modulos': len(sys.modules),
+    'pesados': [nome for nome in %r if nome in sys.modules],
+}))
+'''
+
+LINHA_IMPORTTIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+class Command(BaseCommand):
+    help = 'Mede o tempo de import e a memória de um worker recém-iniciado e falha acima do orçamento'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=15,
+            help='Quantos pacotes mostrar no resumo do importtime (padrão: 15)'
+        )
+        parser.add_argument(
+            '--max-ms',
+            type=int,
+            help='Tempo máximo de boot. Padrão: SYNCHROBI_ORCAMENTO_INICIALIZACAO'
+        )
+        parser.add_argument(
+            '--max-rss-mb',
+            type=int,
+            help='RSS máximo após o boot. Padrão: SYNCHROBI_ORCAMENTO_INICIALIZACAO'
+        )
+
+    def _executar(self, *argumentos):
+        # manage.py já definiu DJANGO_SETTINGS_MODULE no ambiente herdado
+        resultado = subprocess.run(
+            [sys.executable, *argumentos, '-c', SCRIPT_BOOT % (MODULOS_PESADOS,)],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if resultado.returncode != 0:
+            raise CommandError(f'Boot falhou:\n{resultado.stderr[-2000:]}')
+        return json.loads(resultado.stdout.strip().splitlines()[-1]), resultado.stderr
+
+    @staticmethod
+    def _resumo_importtime(saida):
+        """Tempo próprio (µs) somado por pacote de primeiro nível"""
+        por_pacote = defaultdict(int)
+        for linha in saida.splitlines():
+            encontrado = LINHA_IMPORTTIME.match(linha)
+            if encontrado:
+                por_pacote[encontrado.group(4).split('.')[0]] += int(encontrado.group(1))
+        return sorted(por_pacote.items(), key=lambda item: item[1], reverse=True)
+
+    def handle(self, *args, **options):
+        orcamento = dict(getattr(settings, 'SYNCHROBI_ORCAMENTO_INICIALIZACAO', {}))
+        if options.get('max_ms') is not None:
+            orcamento['ms'] = options['max_ms']
+        if options.get('max_rss_mb') is not None:
+            orcamento['rss_mb'] = options['max_rss_mb']
+
+        # Tempo e memória sem a sobrecarga do -X importtime; o resumo vem de uma segunda execução
+        boot, _ = self._executar()
+        _, saida_importtime = self._executar('-X', 'importtime')
+
+        self.stdout.write('Tempo próprio de import por pacote (-X importtime):')
+        for pacote, microssegundos in self._resumo_importtime(saida_importtime)[:options['top']]:
+            self.stdout.write(f'  {microssegundos / 1000:8.1f} ms  {pacote}')
+
+        duracao_ms = boot['segundos'] * 1000
+        rss_mb = boot['rss_bytes'] / (1024 * 1024)
+        self.stdout.write(f'Boot: {duracao_ms:.0f} ms, RSS {rss_mb:.1f} MB, {boot["modulos"]} módulos')
+
+        falhas = []
+        if boot['pesados']:
+            falhas.append(f'módulos pesados carregados no boot: {", ".join(boot["pesados"])}')
+        if orcamento.get('ms') is not None and duracao_ms > orcamento['ms']:
+            falhas.append(f'boot de {duracao_ms:.0f} ms (orçamento: {orcamento["ms"]} ms)')
+        if orcamento.get('rss_mb') is not None and rss_mb > orcamento['rss_mb']:
+            falhas.append(f'RSS de {rss_mb:.1f} MB (orçamento: {orcamento["rss_mb"]} MB)')
+
+        if falhas:
+            for falha in falhas:
+                self.stdout.write(self.style.ERROR(f'  ✗ {falha}'))
+            raise CommandError(f'{len(falhas)} regressão(ões) no boot')
+        self.stdout.write(self.style.SUCCESS('Boot dentro do orçamento'))
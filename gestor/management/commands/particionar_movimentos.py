@@ -0,0 +1,202 @@
+# gestor/management/commands/particionar_movimentos.py
+# Converte a tabela movimentos em tabela particionada por mês (PostgreSQL)
+# e mantém as partições dos próximos meses
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.utils.particionamento import (
+    TABELA, PARTICAO_DEFAULT, nome_particao, tabela_particionada,
+    listar_particoes, garantir_particao, meses_entre, primeiro_dia_mes_seguinte,
+    colunas_copiaveis,
+)
+
+LEGADO = f'{TABELA}_legado'
+
+
+class Command(BaseCommand):
+    help = (
+        'Particiona movimentos por RANGE(data), uma partição por mês (somente PostgreSQL). '
+        'Em tabelas já particionadas, apenas cria as partições dos próximos meses.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses-futuros',
+            type=int,
+            default=3,
+            help='Quantidade de meses à frente com partição pré-criada (padrão: 3)'
+        )
+        parser.add_argument(
+            '--manter-legado',
+            action='store_true',
+            help=f'Mantém a tabela original como {LEGADO} após a cópia'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas mostra os comandos SQL da conversão'
+        )
+        parser.add_argument(
+            '--listar',
+            action='store_true',
+            help='Lista as partições existentes'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Particionamento disponível apenas no PostgreSQL')
+
+        if options['listar']:
+            particoes = listar_particoes()
+            if not particoes:
+                self.stdout.write(self.style.WARNING('Tabela movimentos não é particionada.'))
+            for nome, limites in particoes:
+                self.stdout.write(f'  {nome}: {limites}')
+            return
+
+        hoje = date.today()
+        fim_futuro = self._somar_meses(hoje, options['meses_futuros'])
+
+        if tabela_particionada():
+            criadas = sum(
+                1 for ano, mes in meses_entre(hoje.replace(day=1), fim_futuro)
+                if not options['dry_run'] and garantir_particao(ano, mes)
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'Tabela já particionada. {criadas} partição(ões) futura(s) criada(s).'
+            ))
+            return
+
+        comandos = self._sql_conversao(fim_futuro, options['manter_legado'])
+
+        if options['dry_run']:
+            for sql, params in comandos:
+                self.stdout.write(f'{sql};' + (f'  -- {params}' if params else ''))
+            return
+
+        self.stdout.write(f'Convertendo {TABELA} ({len(comandos)} comandos, transação única)...')
+        with transaction.atomic(), connection.cursor() as cursor:
+            for sql, params in comandos:
+                cursor.execute(sql, params)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Tabela {TABELA} particionada: {len(listar_particoes())} partição(ões).'
+        ))
+
+    @staticmethod
+    def _somar_meses(data, meses):
+        ano, mes = data.year, data.month + meses
+        ano += (mes - 1) // 12
+        mes = (mes - 1) % 12 + 1
+        return date(ano, mes, 1)
+
+    def _sql_conversao(self, fim_futuro, manter_legado):
+        """
+        Lista de (sql, params) da conversão, montada a partir do catálogo.
+
+        A tabela original é renomeada (com PK e índices) e os dados são copiados
+        para a nova tabela particionada antes de recriar índices e FKs, para que
+        a carga não pague a manutenção de índice linha a linha.
+        """
+        qn = connection.ops.quote_name
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'",
+                [TABELA]
+            )
+            linha = cursor.fetchone()
+            pk = linha[0] if linha else None
+
+            cursor.execute(
+                "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+                [TABELA, pk or '']
+            )
+            indices = cursor.fetchall()
+
+            cursor.execute(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = %s::regclass AND contype = 'f'",
+                [TABELA]
+            )
+            fks = cursor.fetchall()
+
+            cursor.execute(
+                "SELECT COUNT(*) FROM pg_constraint WHERE confrelid = %s::regclass",
+                [TABELA]
+            )
+            if cursor.fetchone()[0]:
+                raise CommandError(
+                    f'Existem FKs apontando para {TABELA}; a PK particionada passa a ser (id, data).'
+                )
+
+            cursor.execute(
+                "SELECT attidentity FROM pg_attribute WHERE attrelid = %s::regclass AND attname = 'id'",
+                [TABELA]
+            )
+            identidade = cursor.fetchone()[0]
+
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABELA])
+            sequencia = cursor.fetchone()[0]
+
+            cursor.execute(f"SELECT MIN(data), MAX(data) FROM {qn(TABELA)}")
+            data_min, data_max = cursor.fetchone()
+
+            # Colunas geradas (busca_vetor) são recalculadas pelo banco na cópia
+            colunas = colunas_copiaveis(cursor, TABELA)
+
+        comandos = [(f"ALTER TABLE {qn(TABELA)} RENAME TO {qn(LEGADO)}", None)]
+        if pk:
+            comandos.append((
+                f"ALTER TABLE {qn(LEGADO)} RENAME CONSTRAINT {qn(pk)} TO {qn(f'{LEGADO}_pkey')}", None
+            ))
+        for nome, _ in indices:
+            comandos.append((f"ALTER INDEX {qn(nome)} RENAME TO {qn(f'{nome[:55]}_legado')}", None))
+
+        incluir_identidade = ' INCLUDING IDENTITY' if identidade else ''
+        comandos += [
+            (
+                f"CREATE TABLE {qn(TABELA)} (LIKE {qn(LEGADO)} INCLUDING DEFAULTS"
+                f"{incluir_identidade} INCLUDING CONSTRAINTS INCLUDING GENERATED) PARTITION BY RANGE (data)",
+                None
+            ),
+            (f"ALTER TABLE {qn(TABELA)} ADD PRIMARY KEY (id, data)", None),
+            (f"CREATE TABLE {qn(PARTICAO_DEFAULT)} PARTITION OF {qn(TABELA)} DEFAULT", None),
+        ]
+
+        inicio = (data_min or date.today()).replace(day=1)
+        fim = max(data_max or fim_futuro, fim_futuro)
+        for ano, mes in meses_entre(inicio, fim):
+            comandos.append((
+                f"CREATE TABLE {qn(nome_particao(ano, mes))} PARTITION OF {qn(TABELA)} "
+                f"FOR VALUES FROM (%s) TO (%s)",
+                [date(ano, mes, 1), primeiro_dia_mes_seguinte(ano, mes)]
+            ))
+
+        sobrescrever = ' OVERRIDING SYSTEM VALUE' if identidade == 'a' else ''
+        comandos.append((f"INSERT INTO {qn(TABELA)} ({colunas}){sobrescrever} SELECT {colunas} FROM {qn(LEGADO)}", None))
+
+        if identidade:
+            comandos.append((
+                f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {qn(TABELA)}), 1))",
+                [TABELA]
+            ))
+        elif sequencia:
+            # serial: a sequência continua a mesma, só troca de dono
+            comandos.append((f"ALTER SEQUENCE {sequencia} OWNED BY {qn(TABELA)}.id", None))
+
+        # Índices criados na tabela particionada se propagam para as partições
+        for _, definicao in indices:
+            comandos.append((definicao, None))
+        for nome, definicao in fks:
+            comandos.append((f"ALTER TABLE {qn(TABELA)} ADD CONSTRAINT {qn(nome)} {definicao}", None))
+
+        if not manter_legado:
+            comandos.append((f"DROP TABLE {qn(LEGADO)}", None))
+        comandos.append((f"ANALYZE {qn(TABELA)}", None))
+
+        return comandos
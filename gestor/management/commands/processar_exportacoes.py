@@ -0,0 +1,52 @@
+# gestor/management/commands/processar_exportacoes.py
+# Executa exportações de movimentos pendentes (jobs que ficaram para trás ou
+# processo dedicado com --loop, no lugar das threads dos workers web)
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from gestor.services.exportacao_job_service import ExportacaoJobService
+
+
+class Command(BaseCommand):
+    help = 'Processa as exportações de movimentos pendentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Continua rodando e verificando novos pedidos'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=10,
+            help='Segundos entre verificações no modo --loop. Padrão: 10'
+        )
+        parser.add_argument(
+            '--limite',
+            type=int,
+            default=None,
+            help='Máximo de exportações por verificação'
+        )
+        parser.add_argument(
+            '--reabrir-minutos',
+            type=int,
+            default=15,
+            help='Reenfileira exportações "processando" sem sinal de vida há mais de N minutos. Padrão: 15'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            reabertos = ExportacaoJobService.reabrir_interrompidos(options['reabrir_minutos'])
+            if reabertos:
+                self.stdout.write(self.style.WARNING(f'{reabertos} exportação(ões) interrompida(s) reenfileirada(s)'))
+
+            concluidos = ExportacaoJobService.processar_pendentes(limite=options['limite'])
+            if concluidos or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'{concluidos} exportação(ões) concluída(s)'))
+
+            if not options['loop']:
+                return
+            time.sleep(options['intervalo'])
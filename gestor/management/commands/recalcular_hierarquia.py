@@ -0,0 +1,75 @@
+# gestor/management/commands/recalcular_hierarquia.py
+# Reparo completo dos níveis das hierarquias declaradas (set-based)
+
+from django.core.management.base import BaseCommand
+
+from gestor.services.hierarquia_service import HierarquiaService
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o campo nivel de toda a hierarquia com uma CTE recursiva (sem re-salvar item a item)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--modelo',
+            type=str,
+            choices=['unidade', 'centro', 'conta', 'todos'],
+            default='todos',
+            help='Modelo a processar'
+        )
+
+        parser.add_argument(
+            '--codigo',
+            type=str,
+            action='append',
+            help='Recalcular apenas a subárvore deste código (pode repetir)'
+        )
+
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas lista os níveis divergentes sem alterar o banco'
+        )
+
+    def handle(self, *args, **options):
+        modelo = options['modelo']
+        codigos = options.get('codigo')
+        dry_run = options['dry_run']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('=== MODO SIMULAÇÃO (DRY RUN) ==='))
+        else:
+            self.stdout.write(self.style.SUCCESS('=== RECALCULANDO HIERARQUIA ==='))
+
+        modelos = HierarquiaService.MODELOS
+        selecionados = list(modelos) if modelo == 'todos' else [modelo]
+
+        total = 0
+        for chave in selecionados:
+            model = modelos[chave]
+            self.stdout.write(f'\n{model._meta.verbose_name_plural}...')
+
+            divergencias = HierarquiaService.recalcular_hierarquia(model, codigos, dry_run=dry_run)
+            total += len(divergencias)
+
+            for codigo, nivel_atual, nivel_calculado in divergencias[:50]:
+                self.stdout.write(f'  {codigo}: nível {nivel_atual} → {nivel_calculado}')
+            if len(divergencias) > 50:
+                self.stdout.write(f'  ... e mais {len(divergencias) - 50}')
+
+            acao = 'divergente(s)' if dry_run else 'corrigido(s)'
+            self.stdout.write(f'  {len(divergencias)} item(ns) {acao}')
+
+            if not codigos:
+                inalcancaveis = HierarquiaService.nos_inalcancaveis(model)
+                if inalcancaveis:
+                    self.stdout.write(self.style.ERROR(
+                        f'  {len(inalcancaveis)} item(ns) em ciclo de codigo_pai (não recalculados): '
+                        f'{", ".join(inalcancaveis[:20])}'
+                    ))
+
+        self.stdout.write(self.style.SUCCESS('\n=== RESUMO ==='))
+        self.stdout.write(f'Total de níveis {"divergentes" if dry_run else "corrigidos"}: {total}')
+
+        if dry_run and total:
+            self.stdout.write(self.style.WARNING('Execute novamente sem --dry-run para aplicar as mudanças'))
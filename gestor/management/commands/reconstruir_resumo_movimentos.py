@@ -0,0 +1,52 @@
+# gestor/management/commands/reconstruir_resumo_movimentos.py
+# Reconstrói a tabela de resumo mensal de movimentos (carga inicial ou reparo)
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Movimento, MovimentoResumoMensal
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o resumo mensal pré-agregado de movimentos por período'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--periodo',
+            type=str,
+            action='append',
+            help='Período YYYY-MM a reconstruir (pode repetir). Padrão: todos os períodos com movimentos'
+        )
+
+    def handle(self, *args, **options):
+        periodos = options.get('periodo')
+
+        if periodos:
+            for periodo in periodos:
+                if len(periodo) != 7 or periodo[4] != '-' or not (periodo[:4] + periodo[5:]).isdigit():
+                    raise CommandError(f'Período inválido: {periodo} (use YYYY-MM)')
+        else:
+            periodos = list(
+                Movimento.objects.order_by('periodo_mes_ano')
+                .values_list('periodo_mes_ano', flat=True)
+                .distinct()
+            )
+            # Também limpar períodos que só existem no resumo
+            periodos += list(
+                MovimentoResumoMensal.objects.exclude(periodo_mes_ano__in=periodos)
+                .values_list('periodo_mes_ano', flat=True)
+                .distinct()
+            )
+
+        if not periodos:
+            self.stdout.write(self.style.WARNING('Nenhum período para reconstruir.'))
+            return
+
+        self.stdout.write(f'Reconstruindo {len(periodos)} período(s)...')
+
+        total = 0
+        for periodo in sorted(set(periodos)):
+            linhas = MovimentoResumoMensal.reconstruir_periodos([periodo])
+            total += linhas
+            self.stdout.write(f'  {periodo}: {linhas} linha(s)')
+
+        self.stdout.write(self.style.SUCCESS(f'\nResumo reconstruído: {total} linha(s) no total'))
@@ -0,0 +1,72 @@
+# gestor/management/commands/relatorio_indices.py
+# Relatório de uso dos índices (pg_stat_user_indexes) e reparo dos índices
+# adiados pelo modo de carga em massa
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.models import Movimento
+from core.utils.indices import estatisticas_uso_indices, restaurar_indices
+
+
+class Command(BaseCommand):
+    help = 'Mostra quais índices de movimentos são realmente usados pelas consultas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tabela',
+            type=str,
+            default=Movimento._meta.db_table,
+            help='Tabela (ou prefixo das partições) a analisar. Padrão: movimentos'
+        )
+        parser.add_argument(
+            '--sem-uso',
+            action='store_true',
+            help='Lista apenas índices nunca usados (exceto PK/únicos)'
+        )
+        parser.add_argument(
+            '--restaurar',
+            action='store_true',
+            help='Recria índices de movimentos que ficaram faltando após uma carga em massa interrompida'
+        )
+
+    def handle(self, *args, **options):
+        if options['restaurar']:
+            criados = restaurar_indices(Movimento)
+            if criados:
+                self.stdout.write(self.style.SUCCESS(f'{len(criados)} índice(s) recriado(s): {", ".join(criados)}'))
+            else:
+                self.stdout.write('Nenhum índice faltando.')
+            return
+
+        if connection.vendor != 'postgresql':
+            raise CommandError('Estatísticas de uso de índices disponíveis apenas no PostgreSQL')
+
+        indices = estatisticas_uso_indices(options['tabela'])
+
+        if options['sem_uso']:
+            indices = [
+                i for i in indices
+                if not i['varreduras'] and not i['unico'] and not i['primario']
+            ]
+
+        if not indices:
+            self.stdout.write(self.style.WARNING('Nenhum índice encontrado.'))
+            return
+
+        self.stdout.write(f'{"Tabela":<28} {"Índice":<40} {"Varreduras":>12} {"Tuplas lidas":>14} {"Tamanho":>10}')
+        tamanho_sem_uso = 0
+        for i in indices:
+            sem_uso = not i['varreduras'] and not i['unico'] and not i['primario']
+            if sem_uso:
+                tamanho_sem_uso += i['tamanho']
+            linha = (
+                f'{i["tabela"]:<28} {i["indice"]:<40} {i["varreduras"]:>12} '
+                f'{i["tuplas_lidas"]:>14} {i["tamanho"] / 1024 / 1024:>8.1f}MB'
+            )
+            self.stdout.write(self.style.WARNING(linha) if sem_uso else linha)
+
+        self.stdout.write(
+            f'\n{len(indices)} índice(s); sem uso desde o último reset das estatísticas: '
+            f'{tamanho_sem_uso / 1024 / 1024:.1f}MB'
+        )
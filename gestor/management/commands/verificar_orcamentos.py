@@ -0,0 +1,88 @@
+# gestor/management/commands/verificar_orcamentos.py
+# Confere o orçamento de consultas dos endpoints quentes contra o banco configurado
+# (os mesmos endpoints são cobertos com dados de teste em gestor/tests.py)
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from synchrobi.instrumentacao import orcamento_consultas, orcamento_da_view
+
+
+# (nome da URL, parâmetros GET); o orçamento vem de SYNCHROBI_ORCAMENTOS_VIEWS
+ENDPOINTS_QUENTES = [
+    ('gestor:unidade_tree', {}),
+    ('gestor:api_unidade_tree_data', {}),
+    ('gestor:centrocusto_tree', {}),
+    ('gestor:api_centrocusto_tree_data', {}),
+    ('gestor:contacontabil_tree', {}),
+    ('gestor:api_contacontabil_tree_data', {}),
+    ('gestor:movimento_list', {}),
+    ('gestor:movimento_list', {'search': 'a'}),
+    ('gestor:movimento_importar', {}),
+]
+
+
+class Command(BaseCommand):
+    help = 'Executa os endpoints quentes e falha se algum passar do orçamento de consultas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--usuario',
+            type=str,
+            help='Username usado nas requisições. Padrão: primeiro superusuário ativo'
+        )
+        parser.add_argument(
+            '--limpar-cache',
+            action='store_true',
+            help='Limpa TODO o cache configurado antes (primeira rodada fria). '
+                 'Só em ambiente local: com Redis/memcached compartilhado apaga o cache de produção'
+        )
+
+    def handle(self, *args, **options):
+        Usuario = get_user_model()
+        if options.get('usuario'):
+            usuario = Usuario.objects.filter(username=options['usuario']).first()
+        else:
+            usuario = Usuario.objects.filter(is_superuser=True, is_active=True).order_by('pk').first()
+        if usuario is None:
+            raise CommandError('Usuário não encontrado (use --usuario)')
+
+        if options['limpar_cache']:
+            cache.clear()
+            rodadas = ('frio', 'quente')
+        else:
+            rodadas = ('1ª', '2ª')
+
+        host = next((h for h in settings.ALLOWED_HOSTS if h and '*' not in h and not h.startswith('.')), 'localhost')
+        client = Client(HTTP_HOST=host)
+        client.force_login(usuario)
+
+        falhas = 0
+        for nome_url, parametros in ENDPOINTS_QUENTES:
+            url = reverse(nome_url)
+            maximo = orcamento_da_view(nome_url)['consultas']
+            rotulo = f'{nome_url} {parametros or ""}'.strip()
+
+            # Duas chamadas (com --limpar-cache, a primeira é fria): as duas contam
+            for rodada in rodadas:
+                try:
+                    with orcamento_consultas(maximo, rotulo) as medidor:
+                        response = client.get(url, parametros)
+                except AssertionError as e:
+                    falhas += 1
+                    self.stdout.write(self.style.ERROR(f'  ✗ [{rodada}] {e}'))
+                    continue
+
+                if response.status_code >= 400:
+                    falhas += 1
+                    self.stdout.write(self.style.ERROR(f'  ✗ [{rodada}] {rotulo}: HTTP {response.status_code}'))
+                else:
+                    self.stdout.write(f'  ✓ [{rodada}] {rotulo}: {medidor.consultas}/{maximo} consultas')
+
+        if falhas:
+            raise CommandError(f'{falhas} verificação(ões) acima do orçamento ou com erro')
+        self.stdout.write(self.style.SUCCESS('Todos os endpoints dentro do orçamento'))
@@ -0,0 +1,153 @@
+# gestor/services/exportacao_excel_service.py
+# Exportação Excel em modo write-only (memória constante)
+
+import logging
+import tempfile
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional, Sequence
+
+from django.http import FileResponse
+
+# openpyxl (e o numpy/PIL que ele carrega junto) é importado só quando uma
+# exportação acontece: este módulo entra na carga das URLs e os workers não
+# devem pagar por isso no boot.
+
+logger = logging.getLogger('synchrobi')
+
+CONTENT_TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+@dataclass
+class ColunaExcel:
+    """Coluna exportada: título, largura e estilo nomeado das células de dados"""
+    titulo: str
+    largura: int = 15
+    estilo: str = 'synchrobi_celula'
+
+
+def _borda_fina():
+    from openpyxl.styles import Border, Side
+
+    lado = Side(style='thin')
+    return Border(left=lado, right=lado, top=lado, bottom=lado)
+
+
+def _estilos_nomeados():
+    """Estilos registrados uma vez no workbook; as células só referenciam o nome"""
+    from openpyxl.styles import Alignment, Font, NamedStyle, PatternFill
+
+    cabecalho = NamedStyle(name='synchrobi_cabecalho')
+    cabecalho.font = Font(bold=True, color='FFFFFF')
+    cabecalho.fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+    cabecalho.alignment = Alignment(horizontal='center', vertical='center')
+    cabecalho.border = _borda_fina()
+
+    celula = NamedStyle(name='synchrobi_celula')
+    celula.border = _borda_fina()
+
+    # Negativos em vermelho pelo próprio formato numérico, sem fonte por célula
+    monetario = NamedStyle(name='synchrobi_monetario')
+    monetario.border = _borda_fina()
+    monetario.number_format = '#,##0.00;[Red]-#,##0.00'
+
+    rotulo = NamedStyle(name='synchrobi_rotulo')
+    rotulo.font = Font(bold=True)
+
+    return [cabecalho, celula, monetario, rotulo]
+
+
+class ExportadorExcelStreaming:
+    """
+    Workbook write-only: as linhas vão direto para o XML da planilha à medida
+    que são geradas e não ficam em memória. Estilos são NamedStyles
+    compartilhados (WriteOnlyCell só com o nome do estilo).
+
+    Uso:
+        exportador = ExportadorExcelStreaming()
+        exportador.adicionar_aba('Movimentos', colunas, linhas)
+        return exportador.resposta('movimentos.xlsx')
+    """
+
+    def __init__(self):
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+
+        self.workbook = Workbook(write_only=True)
+        self._classe_celula = WriteOnlyCell
+        for estilo in _estilos_nomeados():
+            self.workbook.add_named_style(estilo)
+
+    def registrar_estilo(self, nome: str, cor_fundo: str):
+        """Estilo de célula com borda e fundo (ex.: linhas coloridas por tipo), registrado uma única vez"""
+        from openpyxl.styles import NamedStyle, PatternFill
+
+        estilo = NamedStyle(name=nome)
+        estilo.border = _borda_fina()
+        estilo.fill = PatternFill(start_color=cor_fundo, end_color=cor_fundo, fill_type='solid')
+        self.workbook.add_named_style(estilo)
+
+    def adicionar_aba(
+        self,
+        titulo: str,
+        colunas: Sequence[ColunaExcel],
+        linhas: Iterable[Sequence],
+        estilo_linha: Optional[Callable[[Sequence], Optional[str]]] = None,
+    ) -> int:
+        """
+        Escreve cabeçalho + linhas (consumidas uma a uma); retorna quantas linhas de dados.
+
+        estilo_linha(linha), se informado, devolve o estilo nomeado da linha
+        inteira (None mantém o estilo de cada coluna).
+        """
+        from openpyxl.utils import get_column_letter
+
+        ws = self.workbook.create_sheet(title=titulo)
+
+        # Larguras precisam ser definidas antes da primeira linha
+        for indice, coluna in enumerate(colunas, 1):
+            ws.column_dimensions[get_column_letter(indice)].width = coluna.largura
+        ws.freeze_panes = 'A2'
+
+        ws.append([self._celula(ws, coluna.titulo, 'synchrobi_cabecalho') for coluna in colunas])
+
+        estilos = [coluna.estilo for coluna in colunas]
+        total = 0
+        for linha in linhas:
+            estilo_unico = estilo_linha(linha) if estilo_linha else None
+            if estilo_unico:
+                ws.append([self._celula(ws, valor, estilo_unico) for valor in linha])
+            else:
+                ws.append([self._celula(ws, valor, estilo) for valor, estilo in zip(linha, estilos)])
+            total += 1
+        return total
+
+    def adicionar_pares(self, titulo: str, pares: Iterable[Sequence], larguras: Sequence[int] = (30, 25)):
+        """Aba simples rótulo/valor (ex.: resumo da exportação)"""
+        from openpyxl.utils import get_column_letter
+
+        ws = self.workbook.create_sheet(title=titulo)
+        for indice, largura in enumerate(larguras, 1):
+            ws.column_dimensions[get_column_letter(indice)].width = largura
+        for rotulo, valor in pares:
+            ws.append([self._celula(ws, rotulo, 'synchrobi_rotulo'), valor])
+
+    def _celula(self, ws, valor, estilo):
+        celula = self._classe_celula(ws, value=valor)
+        celula.style = estilo
+        return celula
+
+    def salvar(self, destino=None):
+        """Grava em destino (arquivo aberto) ou em um arquivo temporário; retorna o arquivo posicionado no início"""
+        destino = destino if destino is not None else tempfile.TemporaryFile(suffix='.xlsx')
+        self.workbook.save(destino)
+        destino.seek(0)
+        return destino
+
+    def resposta(self, nome_arquivo: str, destino: Optional[object] = None) -> FileResponse:
+        """FileResponse servindo o arquivo temporário (removido ao fechar a resposta)"""
+        return FileResponse(
+            self.salvar(destino),
+            as_attachment=True,
+            filename=nome_arquivo,
+            content_type=CONTENT_TYPE_XLSX,
+        )
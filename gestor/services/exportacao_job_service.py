@@ -0,0 +1,283 @@
+# gestor/services/exportacao_job_service.py
+# Exportações de movimentos em segundo plano (thread local, sem broker)
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.core.files import File
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from core.models import ExportacaoJob, MovimentoResumoMensal
+from core.utils.relatorio_cache import assinatura_relatorio
+from gestor.services.movimento_exportacao_service import MovimentoExportacaoService
+from synchrobi.instrumentacao import registrar_job
+
+logger = logging.getLogger('synchrobi')
+
+
+class ExportacaoJobService:
+    """
+    Fila de exportações na própria tabela exportacao_jobs.
+
+    solicitar() registra o pedido (ou reaproveita um arquivo igual ainda
+    válido) e dispara uma thread daemon após o commit; o comando
+    processar_exportacoes executa pendentes que ficaram para trás e pode
+    rodar como processo dedicado com --loop.
+
+    As threads morrem junto com o worker (reciclo por max_requests, restart):
+    o hook worker_exit do gunicorn devolve para pendente os jobs do processo
+    e o post_worker_init do worker seguinte os retoma. Se o processo for
+    morto sem chance de rodar o hook, o job fica sem sinal de vida
+    (ultimo_sinal_em) e é reenfileirado por reabrir_interrompidos.
+    """
+
+    # Jobs executados por threads deste processo (para reenfileirar no worker_exit)
+    _em_execucao = set()
+    _lock_execucao = threading.Lock()
+
+    @staticmethod
+    def normalizar_filtros(filtros):
+        """Só os filtros conhecidos e não vazios, como texto"""
+        return {
+            chave: str(filtros.get(chave)).strip()
+            for chave in MovimentoExportacaoService.FILTROS
+            if str(filtros.get(chave) or '').strip()
+        }
+
+    @staticmethod
+    def periodos_filtros(filtros):
+        """Períodos YYYY-MM cobertos pelos filtros (None = todos)"""
+        ano, mes = filtros.get('ano'), filtros.get('mes')
+        if ano and mes:
+            return [f"{int(ano)}-{int(mes):02d}"]
+        if ano:
+            return [f"{int(ano)}-{m:02d}" for m in range(1, 13)]
+        return None
+
+    @classmethod
+    def versao_dados(cls, filtros):
+        """
+        Estado do resumo mensal nos períodos do filtro.
+
+        Toda importação/limpeza reconstrói o resumo dos períodos afetados e
+        edições manuais atualizam as linhas, então COUNT + SUM(quantidade) +
+        MAX(data_atualizacao) muda sempre que os movimentos desses períodos mudam.
+        """
+        resumo = MovimentoResumoMensal.objects.all()
+        periodos = cls.periodos_filtros(filtros)
+        if periodos is not None:
+            resumo = resumo.filter(periodo_mes_ano__in=periodos)
+
+        dados = resumo.aggregate(linhas=Count('id'), quantidade=Sum('quantidade'), ultima=Max('data_atualizacao'))
+        ultima = dados['ultima']
+        return f"{dados['linhas']}:{dados['quantidade'] or 0}:{ultima.timestamp() if ultima else 0}"
+
+    @classmethod
+    def solicitar(cls, usuario, formato, filtros):
+        """
+        Registra uma exportação; retorna (job, reaproveitado).
+
+        Se o mesmo formato + filtros já foi exportado com sucesso e os
+        períodos não mudaram desde então, o novo job já nasce concluído
+        apontando para o arquivo existente.
+        """
+        if formato not in dict(ExportacaoJob.FORMATO_CHOICES):
+            raise ValueError(f'Formato inválido: {formato}')
+
+        filtros = cls.normalizar_filtros(filtros)
+        # Valida os filtros antes de enfileirar (ano/mês inválidos)
+        MovimentoExportacaoService.filtrar(filtros)
+
+        assinatura = assinatura_relatorio({'formato': formato, **filtros})
+        versao = cls.versao_dados(filtros)
+
+        existente = ExportacaoJob.objects.filter(
+            assinatura=assinatura,
+            versao_dados=versao,
+            status=ExportacaoJob.STATUS_CONCLUIDO,
+        ).exclude(arquivo='').order_by('-concluido_em').first()
+
+        if existente and existente.arquivo.storage.exists(existente.arquivo.name):
+            agora = timezone.now()
+            job = ExportacaoJob.objects.create(
+                usuario=usuario,
+                formato=formato,
+                filtros=filtros,
+                assinatura=assinatura,
+                versao_dados=versao,
+                status=ExportacaoJob.STATUS_CONCLUIDO,
+                progresso=existente.progresso,
+                total_estimado=existente.progresso,
+                arquivo=existente.arquivo.name,
+                iniciado_em=agora,
+                concluido_em=agora,
+            )
+            logger.info(f'Exportação {job.pk} reaproveitou o arquivo da exportação {existente.pk}')
+            return job, True
+
+        job = ExportacaoJob.objects.create(
+            usuario=usuario,
+            formato=formato,
+            filtros=filtros,
+            assinatura=assinatura,
+            versao_dados=versao,
+        )
+        transaction.on_commit(lambda: cls.iniciar_em_thread(job.pk))
+        return job, False
+
+    @classmethod
+    def iniciar_em_thread(cls, job_id):
+        thread = threading.Thread(
+            target=cls.executar,
+            args=(job_id,),
+            kwargs={'fechar_conexao': True},
+            name=f'exportacao-{job_id}',
+            daemon=True,
+        )
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _execucao(job):
+        """
+        Queryset do job nesta execução: iniciado_em identifica quem o assumiu,
+        então uma execução reenfileirada e assumida de novo não é sobrescrita
+        pela anterior, caso esta ainda esteja viva.
+        """
+        return ExportacaoJob.objects.filter(pk=job.pk, iniciado_em=job.iniciado_em)
+
+    @classmethod
+    def executar(cls, job_id, fechar_conexao=False):
+        """Processa um job pendente (no-op se outro processo já o assumiu)"""
+        try:
+            agora = timezone.now()
+            assumido = ExportacaoJob.objects.filter(
+                pk=job_id, status=ExportacaoJob.STATUS_PENDENTE
+            ).update(status=ExportacaoJob.STATUS_PROCESSANDO, iniciado_em=agora, ultimo_sinal_em=agora)
+            if not assumido:
+                return False
+
+            with cls._lock_execucao:
+                cls._em_execucao.add(job_id)
+
+            job = ExportacaoJob.objects.select_related('usuario').get(pk=job_id)
+            inicio = time.perf_counter()
+            try:
+                total = cls._gerar_arquivo(job)
+            except Exception as e:
+                logger.error(f'Erro na exportação {job_id}: {str(e)}')
+                registrar_job('exportacao', job.formato, 0, time.perf_counter() - inicio, status='erro')
+                cls._execucao(job).update(
+                    status=ExportacaoJob.STATUS_ERRO,
+                    mensagem_erro=str(e)[:2000],
+                    concluido_em=timezone.now(),
+                )
+                return False
+            registrar_job('exportacao', job.formato, total, time.perf_counter() - inicio)
+            return True
+        finally:
+            with cls._lock_execucao:
+                cls._em_execucao.discard(job_id)
+            if fechar_conexao:
+                connection.close()
+            else:
+                close_old_connections()
+
+    @classmethod
+    def _gerar_arquivo(cls, job):
+        execucao = cls._execucao(job)
+        movimentos = MovimentoExportacaoService.filtrar(job.filtros)
+        total_estimado = movimentos.order_by().count()
+        execucao.update(total_estimado=total_estimado, ultimo_sinal_em=timezone.now())
+
+        def progresso(linhas):
+            execucao.update(progresso=linhas, ultimo_sinal_em=timezone.now())
+
+        if job.formato == 'xlsx':
+            exportador, total = MovimentoExportacaoService.exportar_excel(movimentos, job.usuario, progresso)
+            arquivo = exportador.salvar()
+        elif job.formato == 'csv':
+            arquivo, total = MovimentoExportacaoService.exportar_csv(movimentos, progresso=progresso)
+        else:
+            arquivo, total = MovimentoExportacaoService.exportar_parquet(movimentos, progresso=progresso)
+
+        # Envio ao storage pode demorar em arquivos grandes
+        execucao.update(progresso=total, ultimo_sinal_em=timezone.now())
+
+        nome = f"movimentos_{job.pk}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{job.formato}"
+        with arquivo:
+            job.arquivo.save(nome, File(arquivo), save=False)
+
+        concluido = execucao.update(
+            arquivo=job.arquivo.name,
+            progresso=total,
+            status=ExportacaoJob.STATUS_CONCLUIDO,
+            concluido_em=timezone.now(),
+        )
+        if not concluido:
+            logger.warning(f'Exportação {job.pk} foi reenfileirada durante a execução; resultado descartado')
+            job.arquivo.delete(save=False)
+            return total
+
+        logger.info(f'Exportação {job.pk} concluída: {total} movimentos ({job.formato}) em {job.arquivo.name}')
+        return total
+
+    @classmethod
+    def processar_pendentes(cls, limite=None):
+        """Executa jobs pendentes no processo atual, mais antigos primeiro; retorna quantos concluíram"""
+        pendentes = ExportacaoJob.objects.filter(
+            status=ExportacaoJob.STATUS_PENDENTE
+        ).order_by('criado_em').values_list('pk', flat=True)
+        if limite:
+            pendentes = pendentes[:limite]
+        return sum(1 for job_id in list(pendentes) if cls.executar(job_id))
+
+    @staticmethod
+    def reabrir_interrompidos(minutos=15):
+        """
+        Volta para pendente jobs 'processando' sem sinal de vida há mais de N
+        minutos (processo morreu no meio). O sinal é renovado a cada lote de
+        linhas, então exportações longas, mas vivas, não são reabertas.
+        """
+        limite = timezone.now() - timedelta(minutes=minutos)
+        return ExportacaoJob.objects.filter(status=ExportacaoJob.STATUS_PROCESSANDO).filter(
+            Q(ultimo_sinal_em__lt=limite) | Q(ultimo_sinal_em__isnull=True, iniciado_em__lt=limite)
+        ).update(status=ExportacaoJob.STATUS_PENDENTE, progresso=0, ultimo_sinal_em=None)
+
+    @classmethod
+    def reenfileirar_do_processo(cls):
+        """
+        Volta para pendente os jobs que threads deste processo estão
+        executando. Chamado no encerramento do worker (worker_exit), quando
+        as threads daemon vão morrer junto com ele.
+        """
+        with cls._lock_execucao:
+            em_execucao = list(cls._em_execucao)
+        if not em_execucao:
+            return 0
+
+        reabertos = ExportacaoJob.objects.filter(
+            pk__in=em_execucao, status=ExportacaoJob.STATUS_PROCESSANDO
+        ).update(status=ExportacaoJob.STATUS_PENDENTE, progresso=0, ultimo_sinal_em=None)
+        logger.warning(f'{reabertos} exportação(ões) reenfileirada(s) no encerramento do processo')
+        return reabertos
+
+    @classmethod
+    def retomar_em_thread(cls):
+        """Reabre interrompidos e processa pendentes numa thread daemon (post_worker_init)"""
+        def retomar():
+            try:
+                cls.reabrir_interrompidos()
+                cls.processar_pendentes()
+            except Exception as e:
+                logger.error(f'Erro ao retomar exportações pendentes: {str(e)}')
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=retomar, name='exportacao-retomada', daemon=True)
+        thread.start()
+        return thread
@@ -11,6 +11,7 @@ from datetime import datetime
 from decimal import Decimal
 
 from core.models import Fornecedor
+from core.utils.cache_utils import cached_query
 
 logger = logging.getLogger('synchrobi')
 
@@ -728,12 +729,23 @@ class FornecedorExtractorService:
     
     @classmethod
     def _buscar_fornecedor_existente(cls, nome_limpo: str) -> Optional[Fornecedor]:
-        """Busca fornecedor existente por similaridade"""
+        """
+        Busca fornecedor existente (exata, depois por similaridade).
+
+        Os mesmos nomes se repetem ao longo da importação: o resultado (inclusive
+        "não encontrado") fica no cache compartilhado até algum fornecedor mudar.
+        """
+        return cached_query(
+            'fornecedor', ('existente', nome_limpo),
+            lambda: cls._buscar_fornecedor_no_banco(nome_limpo)
+        )
+    
+    @classmethod
+    def _buscar_fornecedor_no_banco(cls, nome_limpo: str) -> Optional[Fornecedor]:
         # Busca exata
-        try:
-            return Fornecedor.objects.get(razao_social=nome_limpo, ativo=True)
-        except Fornecedor.DoesNotExist:
-            pass
+        fornecedor = Fornecedor.objects.filter(razao_social=nome_limpo, ativo=True).first()
+        if fornecedor:
+            return fornecedor
         
         # Busca por similaridade
         palavras_chave = nome_limpo.split()[:3]
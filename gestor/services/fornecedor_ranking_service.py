@@ -0,0 +1,200 @@
+# gestor/services/fornecedor_ranking_service.py
+# Ranking de gastos por fornecedor e por grupo de fornecedores
+
+import logging
+from typing import Dict, Iterator, List, Optional
+
+from django.db.models import Sum
+
+from core.models import Unidade, ContaContabil, MovimentoResumoMensal
+from core.utils.relatorio_cache import relatorio_cacheado, periodos_intervalo, deslocar_periodo
+from core.utils.tree_cache import calcular_versao
+from gestor.services.relatorio_rollup_service import IndiceHierarquia, RelatorioRollupService
+
+logger = logging.getLogger('synchrobi')
+
+
+class FornecedorRankingService:
+    """
+    Ranking de despesas por fornecedor (ou grupo) em um intervalo de períodos,
+    com variação contra o intervalo imediatamente anterior de mesmo tamanho.
+
+    Lê só o resumo mensal: uma agregação por intervalo, já com o nome do
+    fornecedor/grupo no GROUP BY. Unidade e conta contábil filtram a subárvore
+    inteira do código informado. O ranking completo fica em cache até algum
+    dos períodos cobertos (atual ou anterior) ser reimportado; top-N e CSV
+    são fatias do mesmo resultado.
+    """
+
+    AGRUPAMENTOS = {
+        'fornecedor': ('fornecedor_id', 'fornecedor__razao_social'),
+        'grupo': ('fornecedor__grupo_id', 'fornecedor__grupo__nome'),
+    }
+
+    COLUNAS_CSV = [
+        ('posicao', 'Posição'),
+        ('codigo', 'Código'),
+        ('nome', 'Nome'),
+        ('total', 'Total'),
+        ('quantidade', 'Movimentos'),
+        ('participacao', 'Participação (%)'),
+        ('total_anterior', 'Total Período Anterior'),
+        ('variacao', 'Variação'),
+        ('variacao_percentual', 'Variação (%)'),
+    ]
+
+    @staticmethod
+    def intervalo_anterior(periodo_inicio: str, periodo_fim: str):
+        """Intervalo de mesmo número de meses que termina no mês anterior a periodo_inicio"""
+        meses = len(periodos_intervalo(periodo_inicio, periodo_fim))
+        return deslocar_periodo(periodo_inicio, -meses), deslocar_periodo(periodo_inicio, -1)
+
+    @staticmethod
+    def _filtros_subarvore(unidade: Optional[str], conta_contabil: Optional[str]) -> Dict:
+        filtros = {}
+        for campo, codigo, model in (
+            ('unidade_id', unidade, Unidade),
+            ('conta_contabil_id', conta_contabil, ContaContabil),
+        ):
+            if not codigo:
+                continue
+            chaves = IndiceHierarquia.construir(campo[:-3], model).chaves_subarvore(codigo)
+            if not chaves:
+                raise ValueError(f'{model._meta.verbose_name} não encontrada: {codigo}')
+            filtros[f'{campo}__in'] = chaves
+        return filtros
+
+    @classmethod
+    def _totais(cls, agrupamento, periodo_inicio, periodo_fim, filtros, campo_valor):
+        """{chave: (nome, centavos, quantidade)} agregados do resumo no intervalo"""
+        campo_chave, campo_nome = cls.AGRUPAMENTOS[agrupamento]
+        campo_soma = RelatorioRollupService.CAMPOS_VALOR[campo_valor]
+
+        linhas = (
+            MovimentoResumoMensal.objects
+            .filter(
+                periodo_mes_ano__gte=periodo_inicio,
+                periodo_mes_ano__lte=periodo_fim,
+                fornecedor__isnull=False,
+                conta_contabil__relatorio_despesa=True,
+                **filtros,
+            )
+            .values_list(campo_chave, campo_nome)
+            .annotate(total=Sum(campo_soma), quantidade=Sum('quantidade'))
+            .order_by()
+        )
+
+        linhas = list(linhas)
+        centavos = RelatorioRollupService._centavos([linha[2] for linha in linhas])
+        return {
+            chave: (nome, int(valor), quantidade or 0)
+            for (chave, nome, _, quantidade), valor in zip(linhas, centavos)
+        }
+
+    @classmethod
+    def gerar(cls, periodo_inicio: str, periodo_fim: str, agrupamento: str = 'fornecedor',
+              unidade: Optional[str] = None, conta_contabil: Optional[str] = None,
+              natureza: Optional[str] = None, campo_valor: str = 'valor') -> Dict:
+        """Ranking completo (maior total primeiro) com deltas contra o intervalo anterior"""
+        periodo_inicio = RelatorioRollupService.validar_periodo(periodo_inicio)
+        periodo_fim = RelatorioRollupService.validar_periodo(periodo_fim)
+        if periodo_inicio > periodo_fim:
+            raise ValueError('Período inicial maior que o período final')
+        if agrupamento not in cls.AGRUPAMENTOS:
+            raise ValueError(f'Agrupamento inválido: {agrupamento}')
+        if campo_valor not in RelatorioRollupService.CAMPOS_VALOR:
+            raise ValueError(f'Campo de valor inválido: {campo_valor}')
+
+        anterior_inicio, anterior_fim = cls.intervalo_anterior(periodo_inicio, periodo_fim)
+        filtros = cls._filtros_subarvore(unidade, conta_contabil)
+        if natureza:
+            filtros['natureza'] = natureza
+
+        atual = cls._totais(agrupamento, periodo_inicio, periodo_fim, filtros, campo_valor)
+        anterior = cls._totais(agrupamento, anterior_inicio, anterior_fim, filtros, campo_valor)
+
+        total_geral = sum(valor for _, valor, _ in atual.values())
+        total_anterior_geral = sum(valor for _, valor, _ in anterior.values())
+
+        def percentual(parte, todo):
+            return round(parte * 100 / todo, 2) if todo else None
+
+        ordenados = sorted(atual.items(), key=lambda item: (-item[1][1], str(item[0])))
+        ranking = []
+        for posicao, (chave, (nome, valor, quantidade)) in enumerate(ordenados, start=1):
+            valor_anterior = anterior.get(chave, (None, 0, 0))[1]
+            ranking.append({
+                'posicao': posicao,
+                'codigo': chave,
+                'nome': nome or ('Sem grupo' if chave is None else chave),
+                'total': valor / 100,
+                'quantidade': quantidade,
+                'participacao': percentual(valor, total_geral),
+                'total_anterior': valor_anterior / 100,
+                'variacao': (valor - valor_anterior) / 100,
+                'variacao_percentual': percentual(valor - valor_anterior, abs(valor_anterior)),
+            })
+
+        return {
+            'agrupamento': agrupamento,
+            'periodo_inicio': periodo_inicio,
+            'periodo_fim': periodo_fim,
+            'periodo_anterior_inicio': anterior_inicio,
+            'periodo_anterior_fim': anterior_fim,
+            'total_geral': total_geral / 100,
+            'total_anterior_geral': total_anterior_geral / 100,
+            'total_itens': len(ranking),
+            'ranking': ranking,
+        }
+
+    @staticmethod
+    def validar_limite(limite, padrao: int) -> int:
+        """Limite do top-N vindo da requisição: vazio = padrão, 0 = ranking completo"""
+        if limite is None or str(limite).strip() == '':
+            return padrao
+        try:
+            limite = int(str(limite).strip())
+        except ValueError:
+            raise ValueError(f'Limite inválido: "{limite}" (informe um número inteiro)')
+        if limite < 0:
+            raise ValueError(f'Limite inválido: {limite} (use 0 para o ranking completo)')
+        return limite
+
+    @classmethod
+    def ranking(cls, limite: Optional[int] = None, **parametros) -> Dict:
+        """
+        Ranking com cache por período; limite corta o top-N sem refazer a
+        agregação (os totais gerais continuam sendo do ranking completo).
+        None ou 0 devolvem o ranking completo.
+        """
+        if limite is not None and limite < 0:
+            raise ValueError(f'Limite inválido: {limite} (use 0 para o ranking completo)')
+
+        periodo_inicio = RelatorioRollupService.validar_periodo(parametros['periodo_inicio'])
+        periodo_fim = RelatorioRollupService.validar_periodo(parametros['periodo_fim'])
+        if periodo_inicio > periodo_fim:
+            raise ValueError('Período inicial maior que o período final')
+
+        anterior_inicio, _ = cls.intervalo_anterior(periodo_inicio, periodo_fim)
+
+        # Subárvores dependem da hierarquia atual, não só dos períodos
+        versao_arvores = calcular_versao(Unidade, ContaContabil)
+
+        resultado = relatorio_cacheado(
+            'fornecedor_ranking',
+            {**parametros, 'versao_arvores': versao_arvores},
+            periodos_intervalo(anterior_inicio, periodo_fim),
+            lambda: cls.gerar(**parametros),
+        )
+
+        if limite:
+            resultado = {**resultado, 'ranking': resultado['ranking'][:limite]}
+        return resultado
+
+    @classmethod
+    def linhas_csv(cls, **parametros) -> Iterator[List]:
+        """Cabeçalho + ranking completo, linha a linha"""
+        resultado = cls.ranking(**parametros)
+        yield [titulo for _, titulo in cls.COLUNAS_CSV]
+        for item in resultado['ranking']:
+            yield ['' if item[campo] is None else item[campo] for campo, _ in cls.COLUNAS_CSV]
@@ -0,0 +1,184 @@
+# gestor/services/hierarquia_exportacao_service.py
+# Exportação Excel das hierarquias (contas contábeis, centros de custo e unidades)
+
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.utils import timezone
+
+from core.models import ContaContabil, CentroCusto, Unidade
+from gestor.services.exportacao_excel_service import ColunaExcel, ExportadorExcelStreaming
+
+logger = logging.getLogger('synchrobi')
+
+
+class MapaHierarquia:
+    """
+    {codigo: (nome, codigo_pai)} da tabela inteira, carregado com uma query.
+
+    Nome do pai e caminho completo saem do mapa (sem .pai por linha); caminhos
+    são memorizados, então cada ancestral é resolvido uma única vez.
+    """
+
+    SEPARADOR = ' > '
+
+    def __init__(self, model):
+        self.itens: Dict[str, Tuple[str, Optional[str]]] = {
+            codigo: (nome, codigo_pai)
+            for codigo, nome, codigo_pai in model.objects.values_list('codigo', 'nome', 'codigo_pai')
+        }
+        self._caminhos: Dict[str, str] = {}
+
+    def nome(self, codigo: Optional[str]) -> str:
+        item = self.itens.get(codigo) if codigo else None
+        return item[0] if item else ''
+
+    def caminho(self, codigo: str) -> str:
+        """Nomes da raiz até o item (pai ausente encerra o caminho; ciclos são interrompidos)"""
+        if codigo in self._caminhos:
+            return self._caminhos[codigo]
+
+        # Sobe até um ancestral já resolvido (ou a raiz) e desce preenchendo
+        pendentes: List[str] = []
+        vistos = set()
+        atual = codigo
+        while atual in self.itens and atual not in self._caminhos and atual not in vistos:
+            vistos.add(atual)
+            pendentes.append(atual)
+            atual = self.itens[atual][1]
+
+        prefixo = self._caminhos.get(atual, '')
+        for item in reversed(pendentes):
+            nome = self.itens[item][0]
+            prefixo = f"{prefixo}{self.SEPARADOR}{nome}" if prefixo else nome
+            self._caminhos[item] = prefixo
+
+        return self._caminhos.get(codigo, '')
+
+
+class HierarquiaExportacaoService:
+    """
+    Planilhas das hierarquias em streaming (ExportadorExcelStreaming).
+
+    Linhas vêm de values_list (sem instanciar models), o nome do pai e o
+    caminho do MapaHierarquia, e a cor de fundo por tipo é um estilo nomeado
+    registrado uma vez por workbook.
+    """
+
+    TIPOS = {'S': 'Sintético', 'A': 'Analítico'}
+
+    # Por hierarquia: model, aba, campo ativo, rótulo, cores (sintético, analítico)
+    ESTRUTURAS = {
+        'conta_contabil': (ContaContabil, 'Contas Contábeis', 'ativa', 'Ativa', ('D4EDDA', 'D1ECF1')),
+        'centro_custo': (CentroCusto, 'Centros de Custo', 'ativo', 'Ativo', ('FFF3CD', 'E8F5E8')),
+    }
+
+    CORES_UNIDADE = ('DDEBF7', 'F2F2F2')
+
+    @staticmethod
+    def _data(valor) -> str:
+        return timezone.localtime(valor).strftime('%d/%m/%Y %H:%M') if valor else ''
+
+    @classmethod
+    def _exportador(cls, cores: Tuple[str, str]) -> ExportadorExcelStreaming:
+        exportador = ExportadorExcelStreaming()
+        exportador.registrar_estilo('synchrobi_sintetico', cores[0])
+        exportador.registrar_estilo('synchrobi_analitico', cores[1])
+        return exportador
+
+    @classmethod
+    def _estilo_tipo(cls, indice_tipo: int):
+        estilos = {cls.TIPOS['S']: 'synchrobi_sintetico', cls.TIPOS['A']: 'synchrobi_analitico'}
+        return lambda linha: estilos.get(linha[indice_tipo])
+
+    @classmethod
+    def _linhas(cls, model, campo_ativo: str) -> Iterator[list]:
+        mapa = MapaHierarquia(model)
+        registros = model.objects.order_by('nivel', 'codigo').values_list(
+            'nivel', 'codigo', 'nome', 'tipo', 'codigo_pai', 'descricao',
+            campo_ativo, 'data_criacao', 'data_alteracao',
+        )
+        for nivel, codigo, nome, tipo, codigo_pai, descricao, ativo, criacao, alteracao in registros.iterator():
+            yield [
+                nivel,
+                codigo,
+                f"{'  ' * (nivel - 1)}{nome}",
+                cls.TIPOS.get(tipo, tipo),
+                codigo_pai or '',
+                mapa.nome(codigo_pai),
+                mapa.caminho(codigo),
+                descricao or '',
+                'Sim' if ativo else 'Não',
+                cls._data(criacao),
+                cls._data(alteracao),
+            ]
+
+    @classmethod
+    def exportar(cls, estrutura: str) -> ExportadorExcelStreaming:
+        """Contas contábeis ou centros de custo, ordenados por nível e código"""
+        model, aba, campo_ativo, rotulo_ativo, cores = cls.ESTRUTURAS[estrutura]
+        colunas = [
+            ColunaExcel('Nível', 8),
+            ColunaExcel('Código', 15),
+            ColunaExcel('Nome', 50),
+            ColunaExcel('Tipo', 12),
+            ColunaExcel('Código Pai', 15),
+            ColunaExcel('Nome Pai', 35),
+            ColunaExcel('Caminho', 60),
+            ColunaExcel('Descrição', 40),
+            ColunaExcel(rotulo_ativo, 8),
+            ColunaExcel('Data Criação', 18),
+            ColunaExcel('Data Alteração', 18),
+        ]
+
+        exportador = cls._exportador(cores)
+        total = exportador.adicionar_aba(aba, colunas, cls._linhas(model, campo_ativo), cls._estilo_tipo(3))
+        logger.debug(f'Exportação {estrutura}: {total} linhas')
+        return exportador
+
+    @classmethod
+    def exportar_unidades(cls, apenas_ativas: bool = True) -> ExportadorExcelStreaming:
+        """Unidades em ordem de código (árvore), com a mesma base de colunas do CSV plano"""
+        colunas = [
+            ColunaExcel('Código', 15),
+            ColunaExcel('Código All Strategy', 18),
+            ColunaExcel('Nome', 50),
+            ColunaExcel('Tipo', 12),
+            ColunaExcel('Nível', 8),
+            ColunaExcel('Ativa', 8),
+            ColunaExcel('Empresa', 12),
+            ColunaExcel('Descrição', 40),
+            ColunaExcel('Código Pai', 15),
+            ColunaExcel('Nome Pai', 35),
+            ColunaExcel('Caminho', 60),
+        ]
+
+        # Mapa da tabela inteira: pai inativo ainda aparece no nome/caminho
+        mapa = MapaHierarquia(Unidade)
+        registros = Unidade.objects.order_by('codigo')
+        if apenas_ativas:
+            registros = registros.filter(ativa=True)
+        registros = registros.values_list(
+            'codigo', 'codigo_allstrategy', 'nome', 'tipo', 'nivel',
+            'ativa', 'empresa_id', 'descricao', 'codigo_pai',
+        )
+
+        def linhas():
+            for codigo, codigo_allstrategy, nome, tipo, nivel, ativa, empresa, descricao, codigo_pai in registros.iterator():
+                yield [
+                    codigo,
+                    codigo_allstrategy or '',
+                    f"{'  ' * (nivel - 1)}{nome}",
+                    cls.TIPOS.get(tipo, tipo),
+                    nivel,
+                    'Sim' if ativa else 'Não',
+                    empresa or '',
+                    descricao or '',
+                    codigo_pai or '',
+                    mapa.nome(codigo_pai),
+                    mapa.caminho(codigo),
+                ]
+
+        exportador = cls._exportador(cls.CORES_UNIDADE)
+        exportador.adicionar_aba('Unidades', colunas, linhas(), cls._estilo_tipo(3))
+        return exportador
@@ -0,0 +1,315 @@
+# gestor/services/hierarquia_service.py
+# Serviço de manutenção em lote das hierarquias declaradas
+# (Unidade, CentroCusto, ContaContabil)
+
+import re
+import logging
+from typing import Dict, List, Optional, Iterable
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Unidade, CentroCusto, ContaContabil
+from core.signals import invalidar_lookups
+
+logger = logging.getLogger('synchrobi')
+
+
+@dataclass
+class ResultadoUpsertHierarquia:
+    """Resultado de uma carga em lote de hierarquia"""
+    criados: int = 0
+    atualizados: int = 0
+    ignorados: int = 0
+    niveis_propagados: int = 0
+    erros: List[Dict[str, str]] = field(default_factory=list)
+
+    @property
+    def total_gravados(self) -> int:
+        return self.criados + self.atualizados
+
+    def adicionar_erro(self, codigo: str, motivo: str):
+        self.erros.append({'codigo': codigo, 'erro': motivo})
+
+
+class HierarquiaService:
+    """
+    Carga e manutenção de hierarquias declaradas sem passar pelo save()
+    de cada instância.
+
+    O save() dos modelos hierárquicos deduz o pai, busca o pai para calcular
+    o nível e ainda roda full_clean() (que busca o pai de novo): 5-10 queries
+    por nó. Aqui tudo é resolvido em memória a partir de uma única leitura da
+    tabela e gravado com bulk_create(update_conflicts=True).
+    """
+
+    MODELOS = {
+        'unidade': Unidade,
+        'centro': CentroCusto,
+        'conta': ContaContabil,
+    }
+
+    # Mesmas regras de formato aplicadas em clean() de cada modelo
+    PADROES_CODIGO = {
+        Unidade: (r'^[\d\.]+$', 'Código deve conter apenas números e pontos'),
+        CentroCusto: (r'^[\w\.-]+$', 'Código deve conter apenas letras, números, pontos e hífens'),
+        ContaContabil: (r'^[\d\.]+$', 'Código deve conter apenas números e pontos'),
+    }
+
+    # Campos nunca sobrescritos em registros já existentes
+    CAMPOS_PROTEGIDOS = {'codigo', 'data_criacao'}
+
+    @classmethod
+    def _campos_gravaveis(cls, model) -> List[str]:
+        """Campos concretos atualizados no conflito (exceto PK surrogate e protegidos)"""
+        return [
+            f.name for f in model._meta.concrete_fields
+            if not f.primary_key and f.name not in cls.CAMPOS_PROTEGIDOS
+        ]
+
+    @staticmethod
+    def deduzir_pai_em_memoria(codigo: str, codigos_existentes) -> Optional[str]:
+        """Equivalente a deduzir_pai_automaticamente(), consultando um conjunto em memória"""
+        if '.' not in codigo:
+            return None
+
+        partes = codigo.split('.')
+        for i in range(len(partes) - 1, 0, -1):
+            candidato = '.'.join(partes[:i])
+            if candidato in codigos_existentes:
+                return candidato
+        return None
+
+    @classmethod
+    def upsert_em_lote(cls, model, registros: Iterable[dict],
+                       atualizar_existentes: bool = True,
+                       batch_size: int = 1000) -> ResultadoUpsertHierarquia:
+        """
+        Insere/atualiza nós de uma hierarquia em uma única transação.
+
+        Cada registro é um dict com 'codigo', 'nome', 'tipo' e opcionalmente
+        'codigo_pai' e demais campos do modelo (descricao, ativo/ativa,
+        empresa_id, codigo_allstrategy, relatorio_despesa...). Sem codigo_pai,
+        o pai é deduzido pelo maior prefixo existente no banco ou no próprio lote.
+        """
+        resultado = ResultadoUpsertHierarquia()
+        campos_modelo = {f.attname for f in model._meta.concrete_fields} | \
+                        {f.name for f in model._meta.concrete_fields}
+        padrao_codigo, msg_codigo = cls.PADROES_CODIGO[model]
+
+        # 1. Normalizar registros (último registro de um código prevalece)
+        lote: Dict[str, dict] = {}
+        for registro in registros:
+            codigo = str(registro.get('codigo') or '').strip()
+            if not codigo:
+                resultado.adicionar_erro('', 'Registro sem código')
+                continue
+
+            desconhecidos = set(registro) - campos_modelo
+            if desconhecidos:
+                resultado.adicionar_erro(codigo, f'Campos desconhecidos: {", ".join(sorted(desconhecidos))}')
+                continue
+
+            dados = dict(registro)
+            dados['codigo'] = codigo
+            dados['codigo_pai'] = str(dados.get('codigo_pai') or '').strip() or None
+            lote[codigo] = dados
+
+        # 2. Uma única leitura do estado atual da tabela
+        existentes = {obj.codigo: obj for obj in model.objects.all()}
+
+        if not atualizar_existentes:
+            for codigo in [c for c in lote if c in existentes]:
+                del lote[codigo]
+                resultado.ignorados += 1
+
+        tipos = {codigo: obj.tipo for codigo, obj in existentes.items()}
+        tipos.update({codigo: dados.get('tipo') or 'A' for codigo, dados in lote.items()})
+        todos_codigos = set(tipos)
+
+        # 3. Resolver pais
+        pais: Dict[str, Optional[str]] = {}
+        for codigo, dados in lote.items():
+            pais[codigo] = dados['codigo_pai'] or cls.deduzir_pai_em_memoria(codigo, todos_codigos)
+
+        # 4. Calcular níveis em ordem topológica (pais antes dos filhos)
+        niveis: Dict[str, int] = {}
+        invalidos: Dict[str, str] = {}
+
+        def resolver(codigo: str) -> Optional[int]:
+            if codigo in niveis:
+                return niveis[codigo]
+            if codigo in invalidos:
+                return None
+
+            caminho = []
+            atual = codigo
+            # Subir até um nó já resolvido, um nó fora do lote ou a raiz
+            while atual is not None and atual in lote and atual not in niveis and atual not in invalidos:
+                if atual in caminho:
+                    for item in caminho[caminho.index(atual):]:
+                        invalidos[item] = 'Referência circular na hierarquia'
+                    break
+                caminho.append(atual)
+                atual = pais[atual]
+
+            # Descer resolvendo a partir do ancestral mais alto
+            for item in reversed(caminho):
+                if item in invalidos:
+                    continue
+
+                pai = pais[item]
+                dados = lote[item]
+                erro = None
+
+                if not re.match(padrao_codigo, item):
+                    erro = msg_codigo
+                elif tipos[item] not in ('S', 'A'):
+                    erro = f'Tipo inválido: {tipos[item]}'
+                elif not str(dados.get('nome') or getattr(existentes.get(item), 'nome', '') or '').strip():
+                    erro = 'Nome é obrigatório'
+                elif pai == item:
+                    erro = 'Item não pode ser pai de si mesmo'
+                elif pai is not None:
+                    if pai not in todos_codigos:
+                        erro = f'Pai com código "{pai}" não existe'
+                    elif pai in invalidos:
+                        erro = f'Pai "{pai}" é inválido: {invalidos[pai]}'
+                    elif tipos[pai] == 'A':
+                        erro = f'O pai "{pai}" é analítico e não pode ter filhos'
+
+                if erro:
+                    invalidos[item] = erro
+                    continue
+
+                if pai is None:
+                    niveis[item] = 1
+                elif pai in niveis:
+                    niveis[item] = niveis[pai] + 1
+                else:
+                    # Pai fora do lote: usa o nível já gravado
+                    niveis[item] = existentes[pai].nivel + 1
+
+            return niveis.get(codigo)
+
+        for codigo in sorted(lote, key=lambda c: (c.count('.'), c)):
+            resolver(codigo)
+
+        for codigo, motivo in invalidos.items():
+            resultado.adicionar_erro(codigo, motivo)
+
+        # 5. Montar instâncias
+        campos_gravaveis = cls._campos_gravaveis(model)
+        pk_surrogate = model._meta.pk.name != 'codigo'
+        objetos = []
+
+        for codigo in sorted(niveis, key=lambda c: (niveis[c], c)):
+            dados = lote[codigo]
+            atual = existentes.get(codigo)
+
+            if atual is not None:
+                # Partir do registro atual para não zerar campos omitidos no lote
+                valores = {
+                    f.attname: getattr(atual, f.attname)
+                    for f in model._meta.concrete_fields
+                    if not (pk_surrogate and f.primary_key)
+                }
+                resultado.atualizados += 1
+            else:
+                valores = {}
+                resultado.criados += 1
+
+            valores.update({k: v for k, v in dados.items() if k != 'codigo_pai'})
+            valores['codigo_pai'] = pais[codigo]
+            valores['nivel'] = niveis[codigo]
+
+            if model is Unidade and not valores.get('codigo_allstrategy'):
+                valores['codigo_allstrategy'] = ''
+
+            objetos.append(model(**valores))
+
+        # 6. Nós já gravados (fora do lote) que passam a ter um pai novo mais próximo
+        criados = {codigo for codigo in niveis if codigo not in existentes}
+        adocoes: Dict[str, List[str]] = {}
+        if criados:
+            for codigo, obj in existentes.items():
+                if codigo in lote:
+                    continue
+                novo_pai = cls.deduzir_pai_em_memoria(codigo, todos_codigos - set(invalidos))
+                if novo_pai in criados and (
+                    not obj.codigo_pai or novo_pai.startswith(f'{obj.codigo_pai}.')
+                ):
+                    adocoes.setdefault(novo_pai, []).append(codigo)
+
+        # 7. Gravar tudo em uma transação e propagar níveis às subárvores
+        if objetos:
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    objetos,
+                    batch_size=batch_size,
+                    update_conflicts=True,
+                    unique_fields=['codigo'],
+                    update_fields=campos_gravaveis,
+                )
+
+                agora = timezone.now()
+                for novo_pai, codigos in adocoes.items():
+                    model.objects.filter(codigo__in=codigos).update(
+                        codigo_pai=novo_pai, data_alteracao=agora
+                    )
+
+                resultado.niveis_propagados = model.recalcular_niveis()
+
+                # bulk_create/update não disparam os sinais: buscas da importação
+                # guardadas como "não encontrado" precisam ver os novos códigos
+                transaction.on_commit(lambda: invalidar_lookups(model))
+
+        logger.info(
+            f'Upsert em lote de {model._meta.verbose_name_plural}: '
+            f'{resultado.criados} criados, {resultado.atualizados} atualizados, '
+            f'{resultado.ignorados} ignorados, {len(resultado.erros)} erros'
+        )
+
+        return resultado
+
+    @classmethod
+    def recalcular_hierarquia(cls, model, codigos_raiz: Optional[List[str]] = None,
+                              dry_run: bool = False):
+        """
+        Recalcula níveis de subárvores (ou da tabela inteira) com CTE recursiva.
+
+        Em dry_run apenas retorna as divergências encontradas
+        [(codigo, nivel_gravado, nivel_calculado), ...].
+        """
+        divergencias = model.divergencias_nivel(codigos_raiz)
+        if dry_run or not divergencias:
+            return divergencias
+
+        with transaction.atomic():
+            model.recalcular_niveis(codigos_raiz)
+
+        return divergencias
+
+    @classmethod
+    def nos_inalcancaveis(cls, model) -> List[str]:
+        """Códigos que não são alcançados a partir de nenhuma raiz (ciclos em codigo_pai)"""
+        pais = dict(model.objects.values_list('codigo', 'codigo_pai'))
+        alcancaveis = set()
+        filhos: Dict[str, List[str]] = {}
+        pendentes = []
+
+        for codigo, codigo_pai in pais.items():
+            if not codigo_pai or codigo_pai not in pais:
+                pendentes.append(codigo)
+            else:
+                filhos.setdefault(codigo_pai, []).append(codigo)
+
+        while pendentes:
+            codigo = pendentes.pop()
+            if codigo in alcancaveis:
+                continue
+            alcancaveis.add(codigo)
+            pendentes.extend(filhos.get(codigo, []))
+
+        return sorted(set(pais) - alcancaveis)
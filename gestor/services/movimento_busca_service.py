@@ -0,0 +1,98 @@
+# gestor/services/movimento_busca_service.py
+# Busca textual em movimentos (histórico, documento e fornecedor)
+
+import re
+import logging
+
+from django.db import connection
+from django.db.models import Q, BooleanField, FloatField, Value
+from django.db.models.expressions import RawSQL
+
+from core.models import Fornecedor
+
+logger = logging.getLogger('synchrobi')
+
+
+class MovimentoBuscaService:
+    """
+    Filtro de busca livre da listagem/exportação de movimentos.
+
+    No PostgreSQL usa a coluna gerada movimentos.busca_vetor (tsvector em
+    português, sem acentos, índice GIN) com ranking por ts_rank_cd; nos demais
+    bancos cai no icontains. Fornecedores são resolvidos antes na tabela de
+    fornecedores (pequena) e entram como fornecedor_id IN (...), sem JOIN
+    sobre a tabela de fatos.
+    """
+
+    COLUNA_VETOR = 'busca_vetor'
+    CONFIGURACAO = 'portuguese'
+
+    # Disponibilidade da coluna por alias de conexão (consultada uma vez por processo)
+    _disponibilidade = {}
+
+    @classmethod
+    def busca_textual_disponivel(cls) -> bool:
+        if connection.vendor != 'postgresql':
+            return False
+
+        if connection.alias not in cls._disponibilidade:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM information_schema.columns "
+                    "WHERE table_name = 'movimentos' AND column_name = %s",
+                    [cls.COLUNA_VETOR]
+                )
+                cls._disponibilidade[connection.alias] = cursor.fetchone() is not None
+
+        return cls._disponibilidade[connection.alias]
+
+    @staticmethod
+    def montar_tsquery(termo: str) -> str:
+        """'manut predial' -> 'manut:* & predial:*' (prefixos, todos os termos)"""
+        palavras = re.findall(r'\w+', termo or '')
+        return ' & '.join(f'{palavra}:*' for palavra in palavras)
+
+    @staticmethod
+    def fornecedores_correspondentes(termo: str):
+        """Subconsulta com os códigos de fornecedores cujo nome/código contém o termo"""
+        return Fornecedor.objects.filter(
+            Q(razao_social__icontains=termo) | Q(codigo__icontains=termo)
+        ).values('codigo')
+
+    @classmethod
+    def aplicar(cls, queryset, termo: str, ordenar_por_relevancia: bool = True):
+        """
+        Filtra o queryset de movimentos pelo termo e anota 'relevancia'.
+
+        Com ordenar_por_relevancia, os resultados mais relevantes vêm primeiro
+        (desempate por data/id decrescentes, como na listagem).
+        """
+        termo = (termo or '').strip()
+        if not termo:
+            return queryset
+
+        fornecedores = Q(fornecedor_id__in=cls.fornecedores_correspondentes(termo))
+        tsquery = cls.montar_tsquery(termo)
+
+        if tsquery and cls.busca_textual_disponivel():
+            consulta = f"to_tsquery('{cls.CONFIGURACAO}', synchrobi_unaccent(%s))"
+            corresponde = RawSQL(
+                f"movimentos.{cls.COLUNA_VETOR} @@ {consulta}", [tsquery], output_field=BooleanField()
+            )
+            # ts_rank_cd devolve real (float4); o cursor da paginação guarda a
+            # relevância como float do Python e compara relevancia = %s, o que
+            # só bate com empates se a expressão já sair em float8
+            relevancia = RawSQL(
+                f"ts_rank_cd(movimentos.{cls.COLUNA_VETOR}, {consulta})::float8", [tsquery],
+                output_field=FloatField()
+            )
+            queryset = queryset.filter(Q(corresponde) | fornecedores).annotate(relevancia=relevancia)
+        else:
+            queryset = queryset.filter(
+                Q(historico__icontains=termo) | Q(documento__icontains=termo) | fornecedores
+            ).annotate(relevancia=Value(0.0, output_field=FloatField()))
+
+        if ordenar_por_relevancia:
+            queryset = queryset.order_by('-relevancia', '-data', '-id')
+
+        return queryset
@@ -0,0 +1,314 @@
+# gestor/services/movimento_exportacao_service.py
+# Exportação de movimentos (colunas, linhas e resumo) sobre o exportador streaming
+
+import csv
+import io
+import logging
+import tempfile
+from decimal import Decimal
+
+from django.utils import timezone
+
+from core.models import ContaExterna, Movimento
+from gestor.services.exportacao_excel_service import ColunaExcel, ExportadorExcelStreaming
+from gestor.services.movimento_busca_service import MovimentoBuscaService
+
+logger = logging.getLogger('synchrobi')
+
+
+class ResumoExportacao:
+    """Totais da aba Resumo acumulados enquanto as linhas são escritas (sem consultas extras)"""
+
+    def __init__(self):
+        self.total = 0
+        self.soma = Decimal('0')
+        self.debitos = 0
+        self.creditos = 0
+        self.fornecedores = set()
+        self.unidades = set()
+
+    def adicionar(self, valor, natureza, fornecedor_id, unidade_id):
+        self.total += 1
+        self.soma += valor or 0
+        if natureza == 'D':
+            self.debitos += 1
+        elif natureza == 'C':
+            self.creditos += 1
+        if fornecedor_id is not None:
+            self.fornecedores.add(fornecedor_id)
+        self.unidades.add(unidade_id)
+
+    def pares(self, usuario):
+        """Pares rótulo/valor da aba Resumo"""
+        return [
+            ('Total de Movimentos', self.total),
+            ('Soma de Valores', float(self.soma)),
+            ('Movimentos Débito', self.debitos),
+            ('Movimentos Crédito', self.creditos),
+            ('Fornecedores Únicos', len(self.fornecedores)),
+            ('Unidades Únicas', len(self.unidades)),
+            ('Data de Exportação', timezone.now().strftime('%d/%m/%Y %H:%M:%S')),
+            ('Exportado por', usuario.get_full_name() or usuario.username),
+        ]
+
+
+class MovimentoExportacaoService:
+    """
+    Exporta movimentos linha a linha a partir de
+    values_list(...).iterator(chunk_size=...): nem o queryset nem o arquivo
+    gerado (Excel, CSV ou Parquet) ficam inteiros em memória, então não há
+    limite de linhas. Os três formatos têm o mesmo conjunto de colunas.
+    """
+
+    TAMANHO_LOTE = 2000
+
+    COLUNAS = [
+        ColunaExcel('Data', 12),
+        ColunaExcel('Mês', 8),
+        ColunaExcel('Ano', 8),
+        ColunaExcel('Período', 10),
+        ColunaExcel('Empresa', 25),
+        ColunaExcel('Cod Unidade', 15),
+        ColunaExcel('Nome Unidade', 30),
+        ColunaExcel('Cod C.Custo', 15),
+        ColunaExcel('Nome Centro Custo', 30),
+        ColunaExcel('Cod Linha DRE', 15),
+        ColunaExcel('Nome Linha DRE', 30),
+        ColunaExcel('Cod C.Contabil', 15),
+        ColunaExcel('Nome C.Contabil', 30),
+        ColunaExcel('Código Fornecedor', 15),
+        ColunaExcel('Razão Social Fornecedor', 40),
+        ColunaExcel('Documento', 15),
+        ColunaExcel('Natureza', 8),
+        ColunaExcel('Valor', 15, 'synchrobi_monetario'),
+        ColunaExcel('Histórico', 50),
+        ColunaExcel('Código Projeto', 15),
+        ColunaExcel('Gerador', 15),
+        ColunaExcel('Rateio', 8),
+        ColunaExcel('Data Importação', 20),
+        ColunaExcel('Arquivo Origem', 25),
+        ColunaExcel('Linha Origem', 8),
+    ]
+
+    # Campos lidos por values_list, na ordem usada por linhas()
+    CAMPOS = (
+        'data', 'mes', 'ano',
+        'unidade__empresa_id', 'unidade__codigo_allstrategy', 'unidade__nome',
+        'centro_custo_id', 'centro_custo__nome',
+        'conta_contabil_id', 'conta_contabil__nome',
+        'fornecedor_id', 'fornecedor__razao_social',
+        'documento', 'natureza', 'valor', 'historico',
+        'codigo_projeto', 'gerador', 'rateio',
+        'data_importacao', 'arquivo_origem', 'linha_origem',
+        'unidade_id',
+    )
+
+    # Parâmetros de filtro aceitos (os mesmos da listagem)
+    FILTROS = ('search', 'ano', 'mes', 'unidade', 'centro_custo')
+
+    @classmethod
+    def filtrar(cls, filtros):
+        """Movimentos com os filtros da listagem (dict ou QueryDict com as chaves de FILTROS)"""
+        search = filtros.get('search', '')
+        ano = filtros.get('ano', '')
+        mes = filtros.get('mes', '')
+        unidade = filtros.get('unidade', '')
+        centro_custo = filtros.get('centro_custo', '')
+
+        movimentos = Movimento.objects.order_by('-data', '-id')
+
+        if search:
+            movimentos = MovimentoBuscaService.aplicar(movimentos, search)
+
+        if ano:
+            movimentos = movimentos.filter(ano=int(ano))
+
+        if mes:
+            movimentos = movimentos.filter(mes=int(mes))
+
+        if unidade:
+            movimentos = movimentos.filter(unidade_id=unidade)
+
+        if centro_custo:
+            movimentos = movimentos.filter(centro_custo__codigo__icontains=centro_custo)
+
+        return movimentos
+
+    @staticmethod
+    def mapa_contas_erp():
+        """conta_contabil_id -> (codigo_externo, nome_externo) do primeiro código ERP ativo"""
+        mapa = {}
+        contas = ContaExterna.objects.filter(ativa=True).order_by('conta_contabil_id', 'codigo_externo')
+        for conta_id, codigo, nome in contas.values_list('conta_contabil_id', 'codigo_externo', 'nome_externo'):
+            mapa.setdefault(conta_id, (codigo, nome))
+        return mapa
+
+    # Nomes de coluna das exportações para máquinas (CSV/Parquet), na ordem de COLUNAS
+    NOMES_CAMPOS = [
+        'data', 'mes', 'ano', 'periodo', 'empresa',
+        'unidade_codigo', 'unidade_nome',
+        'centro_custo_codigo', 'centro_custo_nome',
+        'conta_contabil_codigo', 'conta_contabil_nome',
+        'conta_erp_codigo', 'conta_erp_nome',
+        'fornecedor_codigo', 'fornecedor_razao_social',
+        'documento', 'natureza', 'valor', 'historico',
+        'codigo_projeto', 'gerador', 'rateio',
+        'data_importacao', 'arquivo_origem', 'linha_origem',
+    ]
+
+    # Posições com tipos nativos em registros() (formatados só no Excel)
+    _DATA, _VALOR, _DATA_IMPORTACAO = 0, 17, 22
+
+    @classmethod
+    def registros(cls, movimentos, resumo=None, progresso=None):
+        """
+        Uma lista de valores por movimento, na ordem de COLUNAS, com tipos
+        nativos (date, Decimal, datetime).
+
+        Lê tuplas (values_list) em lotes; os códigos ERP vêm de um mapa
+        carregado uma vez. Com resumo (ResumoExportacao), os totais da aba
+        Resumo são acumulados nesta mesma passada. progresso(n) é chamado a
+        cada lote com o número de linhas já geradas.
+        """
+        contas_erp = cls.mapa_contas_erp()
+        sem_erp = ('', '')
+
+        tuplas = movimentos.values_list(*cls.CAMPOS).iterator(chunk_size=cls.TAMANHO_LOTE)
+        gerados = 0
+        for (data, mes, ano, empresa, unidade_codigo, unidade_nome, centro_codigo, centro_nome,
+             conta_codigo, conta_nome, fornecedor_codigo, fornecedor_nome, documento, natureza,
+             valor, historico, codigo_projeto, gerador, rateio, data_importacao, arquivo_origem,
+             linha_origem, unidade_id) in tuplas:
+
+            if resumo is not None:
+                resumo.adicionar(valor, natureza, fornecedor_codigo, unidade_id)
+
+            gerados += 1
+            if progresso is not None and gerados % cls.TAMANHO_LOTE == 0:
+                progresso(gerados)
+
+            codigo_erp, nome_erp = contas_erp.get(conta_codigo, sem_erp)
+
+            yield [
+                data,
+                mes,
+                ano,
+                f"{mes:02d}/{ano}",
+                empresa or '',
+                unidade_codigo or '',
+                unidade_nome or '',
+                centro_codigo or '',
+                centro_nome or '',
+                conta_codigo or '',
+                conta_nome or '',
+                codigo_erp,
+                nome_erp,
+                fornecedor_codigo or '',
+                fornecedor_nome or '',
+                documento,
+                natureza,
+                valor,
+                historico,
+                codigo_projeto,
+                gerador,
+                rateio,
+                data_importacao,
+                arquivo_origem,
+                linha_origem,
+            ]
+
+    @classmethod
+    def linhas(cls, movimentos, resumo=None, progresso=None):
+        """registros() formatados para a planilha (datas dd/mm/aaaa, valor float)"""
+        for registro in cls.registros(movimentos, resumo, progresso):
+            data, valor, data_importacao = (
+                registro[cls._DATA], registro[cls._VALOR], registro[cls._DATA_IMPORTACAO]
+            )
+            registro[cls._DATA] = data.strftime('%d/%m/%Y') if data else ''
+            registro[cls._VALOR] = float(valor) if valor else 0
+            registro[cls._DATA_IMPORTACAO] = data_importacao.strftime('%d/%m/%Y %H:%M') if data_importacao else ''
+            yield registro
+
+    @classmethod
+    def linhas_csv(cls, movimentos, progresso=None):
+        """Cabeçalho + registros para CSV (datas ISO, valor com ponto decimal)"""
+        yield cls.NOMES_CAMPOS
+        for registro in cls.registros(movimentos, progresso=progresso):
+            data, data_importacao = registro[cls._DATA], registro[cls._DATA_IMPORTACAO]
+            registro[cls._DATA] = data.isoformat() if data else ''
+            registro[cls._DATA_IMPORTACAO] = data_importacao.isoformat() if data_importacao else ''
+            yield registro
+
+    @classmethod
+    def exportar_parquet(cls, movimentos, destino=None, linhas_por_grupo=50000, progresso=None):
+        """
+        Grava os registros em Parquet, um row group a cada linhas_por_grupo
+        linhas (só um grupo em memória por vez). Retorna (arquivo posicionado
+        no início, total de movimentos).
+        """
+        # pyarrow só é carregado por quem exporta Parquet
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        texto = pa.string()
+        tipos = {
+            'data': pa.date32(),
+            'mes': pa.int16(),
+            'ano': pa.int16(),
+            'valor': pa.decimal128(18, 2),
+            'data_importacao': pa.timestamp('us', tz='UTC'),
+            'linha_origem': pa.int32(),
+        }
+        schema = pa.schema([(nome, tipos.get(nome, texto)) for nome in cls.NOMES_CAMPOS])
+
+        destino = destino if destino is not None else tempfile.TemporaryFile(suffix='.parquet')
+        total = 0
+        with pq.ParquetWriter(destino, schema, compression='snappy') as writer:
+            colunas = [[] for _ in cls.NOMES_CAMPOS]
+
+            def gravar_grupo():
+                writer.write_table(
+                    pa.Table.from_arrays(
+                        [pa.array(valores, type=campo.type) for valores, campo in zip(colunas, schema)],
+                        schema=schema,
+                    )
+                )
+                for valores in colunas:
+                    valores.clear()
+
+            for registro in cls.registros(movimentos, progresso=progresso):
+                for valores, valor in zip(colunas, registro):
+                    valores.append(valor)
+                total += 1
+                if total % linhas_por_grupo == 0:
+                    gravar_grupo()
+
+            if colunas[0] or not total:
+                gravar_grupo()
+
+        destino.seek(0)
+        return destino, total
+
+    @classmethod
+    def exportar_csv(cls, movimentos, destino=None, progresso=None):
+        """Grava o CSV em destino (binário) ou em arquivo temporário; retorna (arquivo no início, total)"""
+        destino = destino if destino is not None else tempfile.TemporaryFile(suffix='.csv')
+        texto = io.TextIOWrapper(destino, encoding='utf-8', newline='')
+        escritor = csv.writer(texto)
+        total = -1  # cabeçalho
+        for linha in cls.linhas_csv(movimentos, progresso):
+            escritor.writerow(linha)
+            total += 1
+        texto.flush()
+        texto.detach()
+        destino.seek(0)
+        return destino, total
+
+    @classmethod
+    def exportar_excel(cls, movimentos, usuario, progresso=None):
+        """Monta o workbook write-only; retorna (exportador, total de movimentos exportados)"""
+        exportador = ExportadorExcelStreaming()
+        resumo = ResumoExportacao()
+        exportador.adicionar_aba('Movimentos', cls.COLUNAS, cls.linhas(movimentos, resumo, progresso))
+        exportador.adicionar_pares('Resumo', resumo.pares(usuario))
+        return exportador, resumo.total
@@ -0,0 +1,319 @@
+# gestor/services/movimento_snapshot_service.py
+# Snapshot colunar (NumPy) dos movimentos para análises ad-hoc
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from django.db.models import BigIntegerField, F
+from django.db.models.functions import Cast, ExtractDay, Round
+
+from core.models import Movimento, Unidade, CentroCusto, ContaContabil, Fornecedor
+from core.utils.relatorio_cache import relatorio_cacheado, periodos_intervalo
+
+logger = logging.getLogger('synchrobi')
+
+
+DIMENSOES_CATEGORICAS = ('unidade', 'centro_custo', 'conta_contabil', 'fornecedor')
+NATUREZAS = np.array(['D', 'C', 'A'], dtype=object)
+
+
+@dataclass
+class SnapshotMovimentos:
+    """
+    Fatos de movimento em colunas compactas.
+
+    data é int32 no formato AAAAMMDD, natureza int8 (índice em NATUREZAS),
+    valor int64 em centavos. Cada dimensão categórica guarda códigos int32
+    (-1 = vazio) que apontam para o array ordenado de chaves em categorias
+    (id da unidade, código do centro/conta/fornecedor).
+    """
+    data: np.ndarray
+    natureza: np.ndarray
+    valor: np.ndarray
+    codigos: Dict[str, np.ndarray] = field(default_factory=dict)
+    categorias: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    def __len__(self):
+        return len(self.valor)
+
+    @property
+    def total(self) -> int:
+        return int(self.valor.sum())
+
+    @classmethod
+    def vazio(cls) -> 'SnapshotMovimentos':
+        return cls(
+            data=np.zeros(0, dtype=np.int32),
+            natureza=np.zeros(0, dtype=np.int8),
+            valor=np.zeros(0, dtype=np.int64),
+            codigos={dim: np.zeros(0, dtype=np.int32) for dim in DIMENSOES_CATEGORICAS},
+            categorias={dim: np.zeros(0, dtype=object) for dim in DIMENSOES_CATEGORICAS},
+        )
+
+    @classmethod
+    def concatenar(cls, partes: Sequence['SnapshotMovimentos']) -> 'SnapshotMovimentos':
+        """Une snapshots (ex.: um por período) recodificando as categorias"""
+        partes = [parte for parte in partes if len(parte)]
+        if not partes:
+            return cls.vazio()
+        if len(partes) == 1:
+            return partes[0]
+
+        codigos, categorias = {}, {}
+        for dim in DIMENSOES_CATEGORICAS:
+            uniao = np.unique(np.concatenate([parte.categorias[dim] for parte in partes]))
+            recodificados = []
+            for parte in partes:
+                # -1 continua -1: o remapeamento recebe uma posição extra no fim
+                mapa = np.append(np.searchsorted(uniao, parte.categorias[dim]), -1).astype(np.int32)
+                recodificados.append(mapa[parte.codigos[dim]])
+            codigos[dim] = np.concatenate(recodificados)
+            categorias[dim] = uniao
+
+        return cls(
+            data=np.concatenate([parte.data for parte in partes]),
+            natureza=np.concatenate([parte.natureza for parte in partes]),
+            valor=np.concatenate([parte.valor for parte in partes]),
+            codigos=codigos,
+            categorias=categorias,
+        )
+
+    # ===== OPERAÇÕES =====
+
+    def filtrar(self, natureza: Optional[Sequence[str]] = None,
+                data_inicio: Optional[int] = None, data_fim: Optional[int] = None,
+                **chaves) -> 'SnapshotMovimentos':
+        """
+        Novo snapshot só com as linhas que atendem aos filtros.
+
+        chaves: unidade, centro_custo, conta_contabil, fornecedor -> lista de chaves.
+        Datas no formato AAAAMMDD (int).
+        """
+        mascara = np.ones(len(self), dtype=bool)
+
+        for dim, valores in chaves.items():
+            if dim not in DIMENSOES_CATEGORICAS:
+                raise ValueError(f'Dimensão inválida para filtro: {dim}')
+            if not valores:
+                continue
+            categorias = self.categorias[dim]
+            if categorias.dtype.kind in 'iu':
+                try:
+                    valores = [int(valor) for valor in valores]
+                except (TypeError, ValueError):
+                    raise ValueError(f'Filtro de {dim} espera ids numéricos: {", ".join(map(str, valores))}')
+            desejados = np.flatnonzero(np.isin(categorias, np.asarray(valores, dtype=categorias.dtype)))
+            mascara &= np.isin(self.codigos[dim], desejados)
+
+        if natureza:
+            desejadas = np.flatnonzero(np.isin(NATUREZAS, list(natureza)))
+            mascara &= np.isin(self.natureza, desejadas)
+        if data_inicio:
+            mascara &= self.data >= data_inicio
+        if data_fim:
+            mascara &= self.data <= data_fim
+
+        return SnapshotMovimentos(
+            data=self.data[mascara],
+            natureza=self.natureza[mascara],
+            valor=self.valor[mascara],
+            codigos={dim: codigos[mascara] for dim, codigos in self.codigos.items()},
+            categorias=self.categorias,
+        )
+
+    def _codificar(self, dim: str):
+        """(índices compactos por linha, rótulos) para uma dimensão de agrupamento"""
+        if dim in DIMENSOES_CATEGORICAS:
+            presentes, inversos = np.unique(self.codigos[dim], return_inverse=True)
+            categorias = self.categorias[dim].tolist()
+            rotulos = [categorias[c] if c >= 0 else None for c in presentes.tolist()]
+            return inversos, rotulos
+
+        if dim == 'natureza':
+            presentes, inversos = np.unique(self.natureza, return_inverse=True)
+            return inversos, [NATUREZAS[c] if c >= 0 else None for c in presentes.tolist()]
+
+        if dim == 'data':
+            valores = self.data
+        elif dim == 'periodo':
+            valores = self.data // 100
+        elif dim == 'ano':
+            valores = self.data // 10000
+        elif dim == 'mes':
+            valores = self.data // 100 % 100
+        else:
+            raise ValueError(f'Dimensão inválida para agrupamento: {dim}')
+
+        presentes, inversos = np.unique(valores, return_inverse=True)
+        if dim == 'periodo':
+            rotulos = [f'{p // 100}-{p % 100:02d}' for p in presentes.tolist()]
+        elif dim == 'data':
+            rotulos = [f'{d // 10000}-{d // 100 % 100:02d}-{d % 100:02d}' for d in presentes.tolist()]
+        else:
+            rotulos = presentes.tolist()
+        return inversos, rotulos
+
+    def _somar(self, dims: Sequence[str]):
+        """Soma valor e contagem por combinação das dimensões (um bincount)"""
+        codificados = [self._codificar(dim) for dim in dims]
+        forma = tuple(max(len(rotulos), 1) for _, rotulos in codificados)
+        chaves = np.ravel_multi_index(tuple(inversos for inversos, _ in codificados), forma)
+
+        grupos, inversos = np.unique(chaves, return_inverse=True)
+        # float64 é exato para somas de centavos até 2^53
+        totais = np.rint(np.bincount(inversos, weights=self.valor, minlength=len(grupos))).astype(np.int64)
+        quantidades = np.bincount(inversos, minlength=len(grupos))
+        coordenadas = np.unravel_index(grupos, forma)
+        return codificados, coordenadas, totais, quantidades
+
+    def agrupar(self, por: Sequence[str], ordenar: str = 'total', limite: Optional[int] = None) -> List[dict]:
+        """
+        Group-by: [{<dim>: chave, ..., 'total': reais, 'quantidade': n}, ...].
+
+        ordenar='total' (maiores valores absolutos primeiro) ou 'chave'.
+        """
+        if not len(self):
+            return []
+
+        codificados, coordenadas, totais, quantidades = self._somar(por)
+
+        if ordenar == 'total':
+            ordem = np.argsort(-np.abs(totais), kind='stable')
+        else:
+            ordem = np.arange(len(totais))
+        if limite:
+            ordem = ordem[:limite]
+
+        resultado = []
+        for i in ordem.tolist():
+            item = {
+                dim: rotulos[coordenadas[d][i]]
+                for d, (dim, (_, rotulos)) in enumerate(zip(por, codificados))
+            }
+            item['total'] = int(totais[i]) / 100
+            item['quantidade'] = int(quantidades[i])
+            resultado.append(item)
+        return resultado
+
+    def pivot(self, linhas: str, colunas: str) -> dict:
+        """Tabela dinâmica linhas x colunas com totais em reais"""
+        if not len(self):
+            return {'linhas': [], 'colunas': [], 'valores': [], 'total_linhas': [], 'total_colunas': []}
+
+        codificados, (coord_linhas, coord_colunas), totais, _ = self._somar([linhas, colunas])
+        rotulos_linhas = codificados[0][1]
+        rotulos_colunas = codificados[1][1]
+
+        matriz = np.zeros((len(rotulos_linhas), len(rotulos_colunas)), dtype=np.int64)
+        matriz[coord_linhas, coord_colunas] = totais
+
+        return {
+            'linhas': rotulos_linhas,
+            'colunas': rotulos_colunas,
+            'valores': (matriz / 100).tolist(),
+            'total_linhas': (matriz.sum(axis=1) / 100).tolist(),
+            'total_colunas': (matriz.sum(axis=0) / 100).tolist(),
+        }
+
+
+class MovimentoSnapshotService:
+    """
+    Carrega e mantém em cache snapshots colunares dos movimentos por período.
+
+    Cada período é lido uma vez do banco (valores já em centavos, sem criar
+    Decimal por linha) e fica no cache de relatórios marcado com o próprio
+    período: importações, limpezas e edições manuais invalidam só ele.
+    """
+
+    NAMESPACE = 'snapshot_movimentos'
+
+    MODELOS_DIMENSAO = {
+        'unidade': (Unidade, 'id', 'nome'),
+        'centro_custo': (CentroCusto, 'codigo', 'nome'),
+        'conta_contabil': (ContaContabil, 'codigo', 'nome'),
+        'fornecedor': (Fornecedor, 'codigo', 'razao_social'),
+    }
+
+    @classmethod
+    def carregar_periodo(cls, periodo: str) -> SnapshotMovimentos:
+        """Lê os movimentos de um período (YYYY-MM) direto do banco"""
+        linhas = list(
+            Movimento.objects
+            .filter(periodo_mes_ano=periodo)
+            .order_by()
+            .annotate(
+                dia=ExtractDay('data'),
+                centavos=Cast(Round(F('valor') * 100), BigIntegerField()),
+            )
+            .values_list(
+                'ano', 'mes', 'dia', 'natureza', 'centavos',
+                'unidade_id', 'centro_custo_id', 'conta_contabil_id', 'fornecedor_id',
+            )
+        )
+        if not linhas:
+            return SnapshotMovimentos.vazio()
+
+        colunas = list(zip(*linhas))
+        ano = np.asarray(colunas[0], dtype=np.int32)
+        mes = np.asarray(colunas[1], dtype=np.int32)
+        dia = np.asarray(colunas[2], dtype=np.int32)
+
+        natureza = pd.Series(colunas[3], dtype=object).map({'D': 0, 'C': 1, 'A': 2}).fillna(-1).to_numpy(np.int8)
+
+        codigos, categorias = {}, {}
+        for i, dim in enumerate(DIMENSOES_CATEGORICAS, start=5):
+            codes, uniques = pd.factorize(pd.Series(colunas[i], dtype=object), sort=True)
+            codigos[dim] = codes.astype(np.int32)
+            categorias[dim] = np.asarray(uniques.tolist(), dtype=np.int64 if dim == 'unidade' else object)
+
+        return SnapshotMovimentos(
+            data=ano * 10000 + mes * 100 + dia,
+            natureza=natureza,
+            valor=np.asarray(colunas[4], dtype=np.int64),
+            codigos=codigos,
+            categorias=categorias,
+        )
+
+    @classmethod
+    def snapshot_periodo(cls, periodo: str) -> SnapshotMovimentos:
+        return relatorio_cacheado(
+            cls.NAMESPACE, {'periodo': periodo}, [periodo],
+            lambda: cls.carregar_periodo(periodo),
+        )
+
+    @classmethod
+    def snapshot(cls, periodo_inicio: str, periodo_fim: str) -> SnapshotMovimentos:
+        """Snapshot de um intervalo de períodos (cada período vem do cache quando possível)"""
+        return SnapshotMovimentos.concatenar([
+            cls.snapshot_periodo(periodo) for periodo in periodos_intervalo(periodo_inicio, periodo_fim)
+        ])
+
+    @classmethod
+    def chaves_filtro(cls, dim: str, codigos: Sequence[str]) -> List:
+        """
+        Chaves do snapshot para os códigos recebidos num filtro. Unidades são
+        guardadas pelo id (o código pode mudar sem invalidar o snapshot), então
+        o código vira id aqui; as demais dimensões já usam o código.
+        """
+        if dim != 'unidade' or not codigos:
+            return list(codigos or [])
+
+        ids = dict(Unidade.objects.filter(codigo__in=codigos).values_list('codigo', 'id'))
+        faltando = [codigo for codigo in codigos if codigo not in ids]
+        if faltando:
+            raise ValueError(f'Unidade não encontrada: {", ".join(faltando)}')
+        return [ids[codigo] for codigo in codigos]
+
+    @classmethod
+    def nomes(cls, dim: str, chaves: Sequence) -> Dict:
+        """Nome de exibição das chaves de uma dimensão categórica (uma consulta)"""
+        if dim not in cls.MODELOS_DIMENSAO:
+            return {}
+        model, campo_chave, campo_nome = cls.MODELOS_DIMENSAO[dim]
+        chaves = [chave for chave in chaves if chave is not None]
+        return dict(
+            model.objects.filter(**{f'{campo_chave}__in': chaves}).values_list(campo_chave, campo_nome)
+        )
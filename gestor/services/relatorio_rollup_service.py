@@ -0,0 +1,357 @@
+# gestor/services/relatorio_rollup_service.py
+# Motor de roll-up hierárquico dos relatórios de despesa (DRE)
+# Unidade x Centro de Custo x Conta Contábil
+
+import re
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from django.db.models import Sum
+
+from core.models import Unidade, CentroCusto, ContaContabil, MovimentoResumoMensal
+
+logger = logging.getLogger('synchrobi')
+
+
+@dataclass
+class IndiceHierarquia:
+    """
+    Hierarquia achatada em pré-ordem.
+
+    Cada subárvore ocupa o intervalo contíguo [posição, fim[ , então o total
+    de um nó sintético é a diferença de duas somas acumuladas. A matriz
+    ancestrais guarda, para cada posição, o caminho raiz -> nó (posições),
+    preenchido com -1 após a profundidade do nó.
+    """
+    dimensao: str
+    codigos: List[str]
+    nomes: List[str]
+    tipos: List[str]
+    profundidades: np.ndarray
+    fim: np.ndarray
+    ancestrais: np.ndarray
+    posicao_por_chave: Dict
+
+    @property
+    def tamanho(self) -> int:
+        return len(self.codigos)
+
+    def posicoes(self, chaves: Sequence) -> np.ndarray:
+        """Posições em pré-ordem para as chaves do FK (-1 quando fora da árvore)"""
+        obter = self.posicao_por_chave.get
+        return np.fromiter((obter(chave, -1) for chave in chaves), dtype=np.int64, count=len(chaves))
+
+    def chaves_subarvore(self, codigo: str) -> List:
+        """Chaves do FK do nó e de todos os seus descendentes (vazio se o código não existe)"""
+        try:
+            inicio = self.codigos.index(codigo)
+        except ValueError:
+            return []
+        fim = int(self.fim[inicio])
+        return [chave for chave, posicao in self.posicao_por_chave.items() if inicio <= posicao < fim]
+
+    @classmethod
+    def construir(cls, dimensao: str, model) -> 'IndiceHierarquia':
+        """Monta o índice com uma única leitura da tabela"""
+        campo_chave = model._meta.pk.attname
+        campos = ['codigo', 'codigo_pai', 'nome', 'tipo']
+        if campo_chave != 'codigo':
+            campos.append(campo_chave)
+
+        linhas = list(model.objects.order_by('codigo').values(*campos))
+        por_codigo = {linha['codigo']: linha for linha in linhas}
+
+        filhos: Dict[str, List[str]] = {}
+        raizes = []
+        for linha in linhas:
+            pai = linha['codigo_pai']
+            if pai and pai in por_codigo and pai != linha['codigo']:
+                filhos.setdefault(pai, []).append(linha['codigo'])
+            else:
+                raizes.append(linha['codigo'])
+
+        # DFS iterativa (filhos já em ordem de código); nós presos em ciclos
+        # de codigo_pai nunca são alcançados e ficam fora do índice
+        ordem: List[str] = []
+        pais_pos: List[int] = []
+        profundidades: List[int] = []
+        pilha = [(codigo, -1, 0) for codigo in reversed(raizes)]
+        while pilha:
+            codigo, pai_pos, profundidade = pilha.pop()
+            posicao = len(ordem)
+            ordem.append(codigo)
+            pais_pos.append(pai_pos)
+            profundidades.append(profundidade)
+            for filho in reversed(filhos.get(codigo, [])):
+                pilha.append((filho, posicao, profundidade + 1))
+
+        n = len(ordem)
+        if n < len(linhas):
+            logger.warning(
+                f'Roll-up {dimensao}: {len(linhas) - n} nós fora da hierarquia (ciclo em codigo_pai)'
+            )
+
+        profundidades_arr = np.asarray(profundidades, dtype=np.int64)
+        pais_arr = np.asarray(pais_pos, dtype=np.int64)
+
+        # Tamanho das subárvores: filhos sempre aparecem depois dos pais
+        tamanhos = np.ones(n, dtype=np.int64)
+        for posicao in range(n - 1, 0, -1):
+            pai_pos = pais_arr[posicao]
+            if pai_pos >= 0:
+                tamanhos[pai_pos] += tamanhos[posicao]
+        fim = np.arange(n, dtype=np.int64) + tamanhos
+
+        largura = int(profundidades_arr.max()) + 1 if n else 1
+        ancestrais = np.full((n, largura), -1, dtype=np.int64)
+        for posicao in range(n):
+            pai_pos = pais_arr[posicao]
+            if pai_pos >= 0:
+                ancestrais[posicao] = ancestrais[pai_pos]
+            ancestrais[posicao, profundidades_arr[posicao]] = posicao
+
+        posicao_por_chave = {
+            por_codigo[codigo][campo_chave]: posicao for posicao, codigo in enumerate(ordem)
+        }
+
+        return cls(
+            dimensao=dimensao,
+            codigos=ordem,
+            nomes=[por_codigo[codigo]['nome'] for codigo in ordem],
+            tipos=[por_codigo[codigo]['tipo'] for codigo in ordem],
+            profundidades=profundidades_arr,
+            fim=fim,
+            ancestrais=ancestrais,
+            posicao_por_chave=posicao_por_chave,
+        )
+
+
+class RelatorioRollupService:
+    """
+    Roll-up de despesas sobre as três hierarquias a partir do resumo mensal.
+
+    As folhas vêm agregadas do banco (GROUP BY nas dimensões pedidas) e os
+    subtotais de todos os níveis são propagados de uma vez com NumPy: cada
+    linha é expandida para o produto cartesiano dos seus ancestrais em cada
+    dimensão e as combinações iguais são somadas. Valores trafegam em
+    centavos (int64) para não acumular erro de ponto flutuante.
+    """
+
+    DIMENSOES = {
+        'unidade': ('unidade_id', Unidade),
+        'centro_custo': ('centro_custo_id', CentroCusto),
+        'conta_contabil': ('conta_contabil_id', ContaContabil),
+    }
+
+    CAMPOS_VALOR = {
+        'valor': 'soma_valor',
+        'absoluto': 'soma_valor_absoluto',
+    }
+
+    PADRAO_PERIODO = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+
+    # Linhas de folha expandidas por vez (limita a memória do produto cartesiano)
+    TAMANHO_BLOCO = 5000
+
+    @classmethod
+    def validar_periodo(cls, periodo: str) -> str:
+        periodo = (periodo or '').strip()
+        if not cls.PADRAO_PERIODO.match(periodo):
+            raise ValueError(f'Período inválido: "{periodo}" (formato esperado YYYY-MM)')
+        return periodo
+
+    @staticmethod
+    def _centavos(valores) -> np.ndarray:
+        return np.fromiter(
+            (int((valor * 100).to_integral_value()) if valor is not None else 0 for valor in valores),
+            dtype=np.int64,
+            count=len(valores),
+        )
+
+    @staticmethod
+    def _reduzir(chaves: np.ndarray, *valores: np.ndarray):
+        """Soma os valores de chaves iguais (ordenação + reduceat, exato em int64)"""
+        if not len(chaves):
+            return chaves, tuple(v[:0] for v in valores)
+
+        ordem = np.argsort(chaves, kind='stable')
+        chaves = chaves[ordem]
+        inicios = np.flatnonzero(np.concatenate(([True], chaves[1:] != chaves[:-1])))
+        somas = tuple(np.add.reduceat(v[ordem], inicios) for v in valores)
+        return chaves[inicios], somas
+
+    @staticmethod
+    def _totais_por_no(indice: IndiceHierarquia, posicoes: np.ndarray, *valores: np.ndarray):
+        """Subtotal de cada nó = soma acumulada em pré-ordem no intervalo da subárvore"""
+        n = indice.tamanho
+        inicio = np.arange(n, dtype=np.int64)
+        resultado = []
+        for v in valores:
+            proprio = np.zeros(n, dtype=np.int64)
+            np.add.at(proprio, posicoes, v)
+            acumulado = np.concatenate(([0], np.cumsum(proprio)))
+            resultado.append(acumulado[indice.fim] - acumulado[inicio])
+        return resultado
+
+    @classmethod
+    def _cubo(cls, indices: List[IndiceHierarquia], posicoes: List[np.ndarray],
+              valores: np.ndarray, quantidades: np.ndarray, niveis_max: Dict[str, int]):
+        """Soma de todas as combinações de ancestrais (subtotais em todos os níveis)"""
+        dims = [indice.tamanho for indice in indices]
+        k = len(indices)
+        chaves_blocos, valores_blocos, quantidades_blocos = [], [], []
+
+        for inicio in range(0, len(valores), cls.TAMANHO_BLOCO):
+            bloco = slice(inicio, inicio + cls.TAMANHO_BLOCO)
+            eixos = []
+            for d, (indice, pos) in enumerate(zip(indices, posicoes)):
+                ancestrais = indice.ancestrais[pos[bloco]]
+                limite = niveis_max.get(indice.dimensao)
+                if limite:
+                    ancestrais = ancestrais[:, :limite]
+                forma = [ancestrais.shape[0]] + [1] * k
+                forma[d + 1] = ancestrais.shape[1]
+                eixos.append(ancestrais.reshape(forma))
+
+            eixos = np.broadcast_arrays(*eixos)
+            validos = np.logical_and.reduce([eixo >= 0 for eixo in eixos])
+            chaves = np.ravel_multi_index(
+                tuple(np.where(validos, eixo, 0) for eixo in eixos), dims
+            )[validos]
+
+            forma_linha = [len(valores[bloco])] + [1] * k
+            v = np.broadcast_to(valores[bloco].reshape(forma_linha), validos.shape)[validos]
+            q = np.broadcast_to(quantidades[bloco].reshape(forma_linha), validos.shape)[validos]
+
+            chaves, (v, q) = cls._reduzir(chaves, v, q)
+            chaves_blocos.append(chaves)
+            valores_blocos.append(v)
+            quantidades_blocos.append(q)
+
+        if not chaves_blocos:
+            return [], np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        chaves, (v, q) = cls._reduzir(
+            np.concatenate(chaves_blocos), np.concatenate(valores_blocos), np.concatenate(quantidades_blocos)
+        )
+        return list(np.unravel_index(chaves, dims)), v, q
+
+    @classmethod
+    def gerar(cls, periodo_inicio: str, periodo_fim: str,
+              dimensoes: Sequence[str] = ('unidade', 'centro_custo', 'conta_contabil'),
+              natureza: Optional[str] = None,
+              campo_valor: str = 'valor',
+              niveis_max: Optional[Dict[str, int]] = None,
+              incluir_cubo: bool = True) -> dict:
+        """
+        Gera o roll-up de despesas (contas com relatorio_despesa=True) no intervalo
+        de períodos informado.
+
+        Retorna totais por nó de cada dimensão (pré-ordem, só nós com movimento)
+        e, se incluir_cubo, o cruzamento entre as dimensões com subtotais em
+        todos os níveis. niveis_max limita a profundidade por dimensão.
+        """
+        periodo_inicio = cls.validar_periodo(periodo_inicio)
+        periodo_fim = cls.validar_periodo(periodo_fim)
+        if periodo_inicio > periodo_fim:
+            raise ValueError('Período inicial maior que o período final')
+
+        dimensoes = list(dict.fromkeys(dimensoes))
+        desconhecidas = [d for d in dimensoes if d not in cls.DIMENSOES]
+        if not dimensoes or desconhecidas:
+            raise ValueError(f'Dimensões inválidas: {", ".join(desconhecidas) or "nenhuma informada"}')
+
+        if campo_valor not in cls.CAMPOS_VALOR:
+            raise ValueError(f'Campo de valor inválido: {campo_valor}')
+
+        niveis_max = {d: int(n) for d, n in (niveis_max or {}).items() if n}
+
+        # 1. Folhas agregadas no banco (milhares de linhas do resumo, não movimentos)
+        campos_fk = [cls.DIMENSOES[d][0] for d in dimensoes]
+        resumo = MovimentoResumoMensal.objects.filter(
+            periodo_mes_ano__gte=periodo_inicio,
+            periodo_mes_ano__lte=periodo_fim,
+            conta_contabil__relatorio_despesa=True,
+        )
+        if natureza:
+            resumo = resumo.filter(natureza=natureza)
+
+        folhas = list(
+            resumo.order_by()
+            .values_list(*campos_fk)
+            .annotate(total=Sum(cls.CAMPOS_VALOR[campo_valor]), qtd=Sum('quantidade'))
+        )
+
+        valores = cls._centavos([linha[-2] for linha in folhas])
+        quantidades = np.fromiter((linha[-1] or 0 for linha in folhas), dtype=np.int64, count=len(folhas))
+
+        # 2. Índices em pré-ordem e posição de cada folha em cada dimensão
+        indices = [IndiceHierarquia.construir(d, cls.DIMENSOES[d][1]) for d in dimensoes]
+        posicoes = [indice.posicoes([linha[i] for linha in folhas]) for i, indice in enumerate(indices)]
+
+        fora = np.logical_or.reduce([pos < 0 for pos in posicoes]) if folhas else np.zeros(0, dtype=bool)
+        if fora.any():
+            logger.warning(f'Roll-up: {int(fora.sum())} linhas do resumo fora das hierarquias')
+            dentro = ~fora
+            posicoes = [pos[dentro] for pos in posicoes]
+            valores_dentro, quantidades_dentro = valores[dentro], quantidades[dentro]
+        else:
+            valores_dentro, quantidades_dentro = valores, quantidades
+
+        # 3. Subtotais por dimensão (somas acumuladas em pré-ordem)
+        por_dimensao = {}
+        for indice, pos in zip(indices, posicoes):
+            totais, qtds = cls._totais_por_no(indice, pos, valores_dentro, quantidades_dentro)
+            limite = niveis_max.get(indice.dimensao)
+            nos = []
+            for p in np.flatnonzero(qtds > 0):
+                nivel = int(indice.profundidades[p]) + 1
+                if limite and nivel > limite:
+                    continue
+                nos.append({
+                    'codigo': indice.codigos[p],
+                    'nome': indice.nomes[p],
+                    'tipo': indice.tipos[p],
+                    'nivel': nivel,
+                    'total': int(totais[p]) / 100,
+                    'quantidade': int(qtds[p]),
+                })
+            por_dimensao[indice.dimensao] = nos
+
+        resultado = {
+            'periodo_inicio': periodo_inicio,
+            'periodo_fim': periodo_fim,
+            'natureza': natureza or '',
+            'campo_valor': campo_valor,
+            'dimensoes': dimensoes,
+            'total_geral': int(valores_dentro.sum()) / 100,
+            'quantidade_movimentos': int(quantidades_dentro.sum()),
+            'fora_hierarquia': {
+                'linhas': int(fora.sum()),
+                'total': int(valores[fora].sum()) / 100 if len(fora) else 0.0,
+            },
+            'por_dimensao': por_dimensao,
+        }
+
+        # 4. Cruzamento entre dimensões com subtotais em todos os níveis
+        if incluir_cubo and len(dimensoes) > 1:
+            coordenadas, totais, qtds = cls._cubo(indices, posicoes, valores_dentro, quantidades_dentro, niveis_max)
+            cubo = []
+            for linha in range(len(totais)):
+                item = {}
+                for indice, coord in zip(indices, coordenadas):
+                    p = int(coord[linha])
+                    item[indice.dimensao] = indice.codigos[p]
+                    item[f'nivel_{indice.dimensao}'] = int(indice.profundidades[p]) + 1
+                item['total'] = int(totais[linha]) / 100
+                item['quantidade'] = int(qtds[linha])
+                cubo.append(item)
+            resultado['cubo'] = cubo
+
+        logger.info(
+            f'Roll-up de despesas {periodo_inicio}..{periodo_fim} ({", ".join(dimensoes)}): '
+            f'{len(folhas)} folhas, {len(resultado.get("cubo", []))} combinações'
+        )
+        return resultado
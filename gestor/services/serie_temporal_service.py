@@ -0,0 +1,151 @@
+# gestor/services/serie_temporal_service.py
+# Séries mensais por Unidade / Centro de Custo / Conta Contábil com
+# variação mês a mês (MoM) e ano contra ano (YoY)
+
+import logging
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from django.db.models import Sum
+
+from core.models import MovimentoResumoMensal
+from core.utils.relatorio_cache import relatorio_por_periodo, periodos_intervalo, deslocar_periodo
+from gestor.services.relatorio_rollup_service import IndiceHierarquia, RelatorioRollupService
+
+logger = logging.getLogger('synchrobi')
+
+
+class SerieTemporalService:
+    """
+    Matriz entidades x meses a partir do resumo mensal.
+
+    Cada mês é um vetor {chave do FK: centavos} da dimensão inteira, guardado
+    no cache por período (meses fechados sem expiração); os meses que faltam
+    saem de uma única consulta agrupada por (FK, periodo_mes_ano). Entidades
+    sintéticas somam a própria subárvore, então a série de qualquer nó sai do
+    mesmo cache. Meses sem movimento viram zero e as variações são calculadas
+    sobre a matriz inteira (a janela lida tem 12 meses a mais para o YoY).
+    """
+
+    DIMENSOES = RelatorioRollupService.DIMENSOES
+    CAMPOS_VALOR = RelatorioRollupService.CAMPOS_VALOR
+
+    MESES_PADRAO = 24
+    MESES_MAXIMO = 120
+
+    @classmethod
+    def _vetores_mensais(cls, dimensao: str, periodos: List[str], natureza: Optional[str],
+                         campo_valor: str) -> Dict[str, Dict]:
+        campo_chave = cls.DIMENSOES[dimensao][0]
+        campo_soma = cls.CAMPOS_VALOR[campo_valor]
+
+        def construir(faltantes):
+            filtros = {'periodo_mes_ano__in': faltantes}
+            if natureza:
+                filtros['natureza'] = natureza
+
+            linhas = list(
+                MovimentoResumoMensal.objects
+                .filter(**filtros)
+                .values_list(campo_chave, 'periodo_mes_ano')
+                .annotate(total=Sum(campo_soma))
+                .order_by()
+            )
+            centavos = RelatorioRollupService._centavos([linha[2] for linha in linhas])
+
+            vetores = {periodo: {} for periodo in faltantes}
+            for (chave, periodo, _), valor in zip(linhas, centavos):
+                vetores[periodo][chave] = int(valor)
+            return vetores
+
+        return relatorio_por_periodo(
+            'serie_mensal',
+            {'dimensao': dimensao, 'natureza': natureza, 'campo_valor': campo_valor},
+            periodos,
+            construir,
+        )
+
+    @staticmethod
+    def _variacao_percentual(atual: np.ndarray, base: np.ndarray) -> List[List]:
+        """(atual - base) / |base| em %, None onde a base é zero"""
+        percentual = np.full(atual.shape, np.nan)
+        np.divide((atual - base) * 100.0, np.abs(base), out=percentual, where=base != 0)
+        return [
+            [None if np.isnan(valor) else round(float(valor), 2) for valor in linha]
+            for linha in percentual
+        ]
+
+    @classmethod
+    def gerar(cls, dimensao: str, periodo_fim: str, meses: int = MESES_PADRAO,
+              codigos: Optional[Sequence[str]] = None, natureza: Optional[str] = None,
+              campo_valor: str = 'valor') -> Dict:
+        """
+        Série dos últimos `meses` meses até periodo_fim para os códigos pedidos
+        (padrão: raízes da hierarquia), com MoM e YoY absolutos e percentuais.
+        """
+        if dimensao not in cls.DIMENSOES:
+            raise ValueError(f'Dimensão inválida: {dimensao}')
+        if campo_valor not in cls.CAMPOS_VALOR:
+            raise ValueError(f'Campo de valor inválido: {campo_valor}')
+        if not 1 <= meses <= cls.MESES_MAXIMO:
+            raise ValueError(f'Número de meses deve estar entre 1 e {cls.MESES_MAXIMO}')
+        periodo_fim = RelatorioRollupService.validar_periodo(periodo_fim)
+
+        indice = IndiceHierarquia.construir(dimensao, cls.DIMENSOES[dimensao][1])
+        if codigos:
+            posicoes = []
+            for codigo in codigos:
+                try:
+                    posicoes.append(indice.codigos.index(codigo))
+                except ValueError:
+                    raise ValueError(f'Código não encontrado em {dimensao}: {codigo}')
+        else:
+            posicoes = [int(p) for p in np.flatnonzero(indice.profundidades == 0)]
+
+        # 12 meses extras antes do primeiro ponto alimentam o YoY (e o MoM do primeiro mês)
+        periodos_janela = periodos_intervalo(deslocar_periodo(periodo_fim, -(meses + 11)), periodo_fim)
+        vetores = cls._vetores_mensais(dimensao, periodos_janela, natureza, campo_valor)
+
+        # Matriz nós (pré-ordem) x meses; subtotais por somas acumuladas nas subárvores
+        folhas = np.zeros((indice.tamanho + 1, len(periodos_janela)), dtype=np.int64)
+        for coluna, periodo in enumerate(periodos_janela):
+            vetor = vetores.get(periodo) or {}
+            if vetor:
+                chaves = list(vetor)
+                linhas = indice.posicoes(chaves)
+                valores = np.fromiter(vetor.values(), dtype=np.int64, count=len(chaves))
+                dentro = linhas >= 0
+                np.add.at(folhas[:, coluna], linhas[dentro] + 1, valores[dentro])
+
+        acumulado = np.cumsum(folhas, axis=0)
+        inicio = np.asarray(posicoes, dtype=np.int64)
+        matriz = acumulado[indice.fim[inicio]] - acumulado[inicio]
+
+        atual = matriz[:, 12:]
+        mes_anterior = matriz[:, 11:-1]
+        ano_anterior = matriz[:, :-12]
+
+        variacao_mensal_pct = cls._variacao_percentual(atual, mes_anterior)
+        variacao_anual_pct = cls._variacao_percentual(atual, ano_anterior)
+
+        series = []
+        for i, posicao in enumerate(posicoes):
+            series.append({
+                'codigo': indice.codigos[posicao],
+                'nome': indice.nomes[posicao],
+                'tipo': indice.tipos[posicao],
+                'valores': (atual[i] / 100).tolist(),
+                'variacao_mensal': ((atual[i] - mes_anterior[i]) / 100).tolist(),
+                'variacao_mensal_percentual': variacao_mensal_pct[i],
+                'variacao_anual': ((atual[i] - ano_anterior[i]) / 100).tolist(),
+                'variacao_anual_percentual': variacao_anual_pct[i],
+                'total': int(atual[i].sum()) / 100,
+            })
+
+        return {
+            'dimensao': dimensao,
+            'periodos': periodos_janela[12:],
+            'natureza': natureza,
+            'campo_valor': campo_valor,
+            'series': series,
+        }
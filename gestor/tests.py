@@ -1,3 +1,348 @@
-from django.test import TestCase
+# gestor/tests.py - Testes do app gestor
 
-# Create your tests here.
+import json
+import subprocess
+import sys
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.models import CentroCusto, ContaContabil, Fornecedor, Movimento, MovimentoResumoMensal, Unidade
+from core.utils.paginacao import paginar_por_cursor
+from gestor.management.commands.medir_inicializacao import MODULOS_PESADOS, SCRIPT_BOOT
+from gestor.management.commands.verificar_orcamentos import ENDPOINTS_QUENTES
+from gestor.services.hierarquia_service import HierarquiaService
+from gestor.services.movimento_busca_service import MovimentoBuscaService
+from gestor.services.relatorio_rollup_service import RelatorioRollupService
+from synchrobi.instrumentacao import orcamento_consultas, orcamento_da_view
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class OrcamentoEndpointsQuentesTest(TestCase):
+    """
+    Cada endpoint de ENDPOINTS_QUENTES fica dentro do orçamento de
+    SYNCHROBI_ORCAMENTOS_VIEWS com cache frio e quente. Há nós e movimentos
+    suficientes para que uma consulta por item (N+1) estoure o orçamento.
+    """
+
+    @classmethod
+    def _arvore(cls, model, **extras):
+        for raiz in range(1, 4):
+            model.objects.create(codigo=f'{raiz}', nome=f'{model.__name__} {raiz}', tipo='S', nivel=1, **extras)
+            for filho in range(1, 5):
+                codigo_filho = f'{raiz}.{filho}'
+                model.objects.create(codigo=codigo_filho, nome=f'{model.__name__} {codigo_filho}', tipo='S', nivel=2, **extras)
+                for neto in range(1, 4):
+                    codigo_neto = f'{codigo_filho}.{neto}'
+                    model.objects.create(codigo=codigo_neto, nome=f'{model.__name__} {codigo_neto}', tipo='A', nivel=3, **extras)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_superuser('orcamento', 'orcamento@example.com', 'senha')
+
+        cls._arvore(Unidade)
+        cls._arvore(CentroCusto)
+        cls._arvore(ContaContabil)
+
+        fornecedores = [
+            Fornecedor.objects.create(codigo=f'F{indice:03d}', razao_social=f'Fornecedor {indice}')
+            for indice in range(5)
+        ]
+        unidades = list(Unidade.objects.filter(tipo='A'))
+        centros = list(CentroCusto.objects.filter(tipo='A'))
+        contas = list(ContaContabil.objects.filter(tipo='A'))
+        for indice in range(30):
+            Movimento.objects.create(
+                data=date(2025, 1 + indice % 3, 1 + indice % 28),
+                unidade=unidades[indice % len(unidades)],
+                centro_custo=centros[indice % len(centros)],
+                conta_contabil=contas[indice % len(contas)],
+                fornecedor=fornecedores[indice % len(fornecedores)],
+                natureza='D',
+                valor=Decimal(f'{100 + indice}.50'),
+                historico=f'Movimento de teste {indice}',
+            )
+        MovimentoResumoMensal.reconstruir_periodos(['2025-01', '2025-02', '2025-03'])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def test_endpoints_quentes_dentro_do_orcamento(self):
+        for nome_url, parametros in ENDPOINTS_QUENTES:
+            maximo = orcamento_da_view(nome_url)['consultas']
+            for rodada in ('frio', 'quente'):
+                with self.subTest(endpoint=nome_url, parametros=parametros, rodada=rodada):
+                    with orcamento_consultas(maximo, f'{nome_url} {parametros} [{rodada}]'):
+                        response = self.client.get(reverse(nome_url), parametros)
+                    self.assertLess(response.status_code, 400)
+
+
+class PaginacaoBuscaEmpatesTest(TestCase):
+    """
+    Paginação por cursor da busca textual com relevâncias empatadas: nenhuma
+    linha pode sumir ou repetir entre páginas, indo ou voltando. No PostgreSQL
+    os históricos repetidos geram o mesmo ts_rank_cd; nos demais bancos a
+    relevância é constante e todas as linhas empatam.
+    """
+
+    TAMANHO = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        unidade = Unidade.objects.create(codigo='1', nome='Unidade', tipo='A', nivel=1)
+        centro = CentroCusto.objects.create(codigo='1', nome='Centro', tipo='A', nivel=1)
+        conta = ContaContabil.objects.create(codigo='1', nome='Conta', tipo='A', nivel=1)
+        fornecedor = Fornecedor.objects.create(codigo='F001', razao_social='Fornecedor')
+
+        historicos = ['Servico predial', 'Servico predial predial reparo']
+        for indice in range(22):
+            Movimento.objects.create(
+                # Poucas datas distintas: empates também em (relevancia, data)
+                data=date(2025, 1, 1 + indice % 3),
+                unidade=unidade,
+                centro_custo=centro,
+                conta_contabil=conta,
+                fornecedor=fornecedor,
+                natureza='D',
+                valor=Decimal('10.00'),
+                historico=historicos[indice % 2],
+            )
+
+    def _busca(self):
+        return MovimentoBuscaService.aplicar(Movimento.objects.all(), 'predial')
+
+    def test_paginas_cobrem_todos_os_empates(self):
+        queryset = self._busca()
+        ordenacao = queryset.query.order_by
+        esperado = list(queryset.values_list('id', flat=True))
+        self.assertEqual(len(esperado), 22)
+
+        vistos, paginas = [], []
+        pagina = paginar_por_cursor(queryset, None, self.TAMANHO, ordenacao)
+        while True:
+            paginas.append([mov.id for mov in pagina])
+            vistos.extend(paginas[-1])
+            if not pagina.has_next:
+                break
+            pagina = paginar_por_cursor(self._busca(), pagina.cursor_proximo, self.TAMANHO, ordenacao)
+
+        self.assertEqual(vistos, esperado)
+
+        # Voltando a partir da última página, as mesmas páginas na ordem inversa
+        for anterior in reversed(paginas[:-1]):
+            pagina = paginar_por_cursor(self._busca(), pagina.cursor_anterior, self.TAMANHO, ordenacao)
+            self.assertEqual([mov.id for mov in pagina], anterior)
+        self.assertFalse(pagina.has_previous)
+
+
+class RelatorioRollupServiceTest(TestCase):
+    """
+    Subtotais do roll-up (por dimensão e no cubo) batem com um Sum simples
+    sobre os movimentos de cada subárvore, numa árvore de três níveis.
+    """
+
+    ARVORE = (('1', 'S'), ('1.1', 'S'), ('1.1.1', 'A'), ('1.1.2', 'A'), ('1.2', 'S'), ('1.2.1', 'A'),
+              ('2', 'S'), ('2.1', 'S'), ('2.1.1', 'A'))
+    FOLHAS = ('1.1.1', '1.1.2', '1.2.1', '2.1.1')
+
+    @classmethod
+    def setUpTestData(cls):
+        folhas = {}
+        for model in (Unidade, CentroCusto, ContaContabil):
+            for codigo, tipo in cls.ARVORE:
+                model.objects.create(codigo=codigo, nome=f'{model.__name__} {codigo}', tipo=tipo, nivel=1)
+            folhas[model] = [model.objects.get(codigo=codigo) for codigo in cls.FOLHAS]
+
+        # Conta fora do relatório de despesas: não entra em nenhum total
+        fora_relatorio = ContaContabil.objects.create(
+            codigo='2.1.2', nome='Fora', tipo='A', nivel=1, relatorio_despesa=False
+        )
+
+        for indice in range(24):
+            for mes, conta in ((1, folhas[ContaContabil][indice % 4]), (2, folhas[ContaContabil][(indice + 1) % 4]),
+                               (3, fora_relatorio)):
+                Movimento.objects.create(
+                    data=date(2025, mes, 1 + indice),
+                    unidade=folhas[Unidade][indice % 4],
+                    centro_custo=folhas[CentroCusto][indice // 2 % 4],
+                    conta_contabil=conta,
+                    natureza='D' if indice % 3 else 'C',
+                    valor=Decimal(f'{(indice + 1) * 13}.{indice:02d}'),
+                    historico='Roll-up',
+                )
+        # Fora do intervalo pedido
+        Movimento.objects.create(
+            data=date(2025, 4, 1), unidade=folhas[Unidade][0], centro_custo=folhas[CentroCusto][0],
+            conta_contabil=folhas[ContaContabil][0], natureza='D', valor=Decimal('999.99'), historico='Abril',
+        )
+        MovimentoResumoMensal.reconstruir_periodos(['2025-01', '2025-02', '2025-03', '2025-04'])
+
+    @staticmethod
+    def _subarvore(campo, codigo):
+        return Q(**{f'{campo}__codigo': codigo}) | Q(**{f'{campo}__codigo__startswith': f'{codigo}.'})
+
+    def _esperado(self, **codigos):
+        movimentos = Movimento.objects.filter(
+            periodo_mes_ano__gte='2025-01', periodo_mes_ano__lte='2025-03',
+            conta_contabil__relatorio_despesa=True,
+        )
+        for campo, codigo in codigos.items():
+            movimentos = movimentos.filter(self._subarvore(campo, codigo))
+        dados = movimentos.aggregate(total=Sum('valor'), quantidade=Count('id'))
+        return dados['total'] or Decimal('0.00'), dados['quantidade']
+
+    def test_subtotais_por_no_e_cubo(self):
+        resultado = RelatorioRollupService.gerar('2025-01', '2025-03')
+
+        total, quantidade = self._esperado()
+        self.assertEqual(Decimal(str(resultado['total_geral'])), total)
+        self.assertEqual(resultado['quantidade_movimentos'], quantidade)
+
+        for dimensao, nos in resultado['por_dimensao'].items():
+            self.assertEqual({no['codigo'] for no in nos}, {codigo for codigo, _ in self.ARVORE})
+            for no in nos:
+                with self.subTest(dimensao=dimensao, codigo=no['codigo']):
+                    total, quantidade = self._esperado(**{dimensao: no['codigo']})
+                    self.assertEqual(Decimal(str(no['total'])), total)
+                    self.assertEqual(no['quantidade'], quantidade)
+                    self.assertEqual(no['nivel'], no['codigo'].count('.') + 1)
+
+        combinacoes = 0
+        for item in resultado['cubo']:
+            codigos = {dimensao: item[dimensao] for dimensao in resultado['dimensoes']}
+            with self.subTest(**codigos):
+                total, quantidade = self._esperado(**codigos)
+                self.assertEqual(Decimal(str(item['total'])), total)
+                self.assertEqual(item['quantidade'], quantidade)
+            combinacoes += 1
+
+        # Toda combinação de nós com movimento aparece no cubo
+        esperadas = sum(
+            1
+            for unidade, _ in self.ARVORE for centro, _ in self.ARVORE for conta, _ in self.ARVORE
+            if self._esperado(unidade=unidade, centro_custo=centro, conta_contabil=conta)[1]
+        )
+        self.assertEqual(combinacoes, esperadas)
+
+    def test_niveis_max_corta_profundidade(self):
+        resultado = RelatorioRollupService.gerar(
+            '2025-01', '2025-03', dimensoes=('unidade', 'conta_contabil'), niveis_max={'unidade': 2}
+        )
+        self.assertEqual(max(no['nivel'] for no in resultado['por_dimensao']['unidade']), 2)
+        self.assertEqual(max(item['nivel_unidade'] for item in resultado['cubo']), 2)
+        for item in resultado['cubo']:
+            with self.subTest(unidade=item['unidade'], conta=item['conta_contabil']):
+                total, _ = self._esperado(unidade=item['unidade'], conta_contabil=item['conta_contabil'])
+                self.assertEqual(Decimal(str(item['total'])), total)
+
+
+class UpsertHierarquiaEmLoteTest(TestCase):
+    """HierarquiaService.upsert_em_lote contra o estado gravado da tabela"""
+
+    def setUp(self):
+        ContaContabil.objects.create(codigo='1', nome='Ativo', tipo='S', nivel=1)
+        ContaContabil.objects.create(codigo='1.1.01', nome='Caixa', tipo='A', nivel=2, codigo_pai='1')
+        ContaContabil.objects.create(codigo='3', nome='Receitas', tipo='A', nivel=1)
+
+    def _conta(self, codigo):
+        return ContaContabil.objects.get(codigo=codigo)
+
+    def _erros(self, resultado):
+        return {erro['codigo']: erro['erro'] for erro in resultado.erros}
+
+    def test_pai_deduzido_pelo_maior_prefixo(self):
+        resultado = HierarquiaService.upsert_em_lote(ContaContabil, [
+            {'codigo': '1.2.01.001', 'nome': 'Clientes', 'tipo': 'A'},
+            {'codigo': '1.2', 'nome': 'Realizável', 'tipo': 'S'},
+            {'codigo': '1.3.05', 'nome': 'Estoques', 'tipo': 'A'},
+            {'codigo': '4', 'nome': 'Despesas', 'tipo': 'S'},
+        ])
+
+        self.assertEqual(resultado.erros, [])
+        self.assertEqual(resultado.criados, 4)
+        # Pai do próprio lote, mesmo listado depois do filho
+        self.assertEqual((self._conta('1.2.01.001').codigo_pai, self._conta('1.2.01.001').nivel), ('1.2', 3))
+        # Sem prefixo intermediário: sobe até o nó já gravado
+        self.assertEqual((self._conta('1.3.05').codigo_pai, self._conta('1.3.05').nivel), ('1', 2))
+        self.assertEqual((self._conta('4').codigo_pai, self._conta('4').nivel), (None, 1))
+
+    def test_ciclo_rejeitado_com_descendentes(self):
+        resultado = HierarquiaService.upsert_em_lote(ContaContabil, [
+            {'codigo': '7', 'nome': 'Sete', 'tipo': 'S', 'codigo_pai': '8'},
+            {'codigo': '8', 'nome': 'Oito', 'tipo': 'S', 'codigo_pai': '7'},
+            {'codigo': '7.1', 'nome': 'Sete um', 'tipo': 'A'},
+            {'codigo': '9', 'nome': 'Nove', 'tipo': 'S'},
+        ])
+
+        erros = self._erros(resultado)
+        self.assertEqual(erros['7'], 'Referência circular na hierarquia')
+        self.assertEqual(erros['8'], 'Referência circular na hierarquia')
+        self.assertIn('Pai "7" é inválido', erros['7.1'])
+        self.assertEqual(resultado.criados, 1)
+        self.assertFalse(ContaContabil.objects.filter(codigo__in=['7', '8', '7.1']).exists())
+        self.assertTrue(ContaContabil.objects.filter(codigo='9').exists())
+
+    def test_pai_analitico_rejeitado(self):
+        resultado = HierarquiaService.upsert_em_lote(ContaContabil, [
+            {'codigo': '3.1', 'nome': 'Vendas', 'tipo': 'A'},
+            {'codigo': '5', 'nome': 'Cinco', 'tipo': 'A'},
+            {'codigo': '5.1', 'nome': 'Cinco um', 'tipo': 'A', 'codigo_pai': '5'},
+        ])
+
+        erros = self._erros(resultado)
+        self.assertEqual(erros['3.1'], 'O pai "3" é analítico e não pode ter filhos')
+        self.assertEqual(erros['5.1'], 'O pai "5" é analítico e não pode ter filhos')
+        self.assertEqual(resultado.criados, 1)
+        self.assertFalse(ContaContabil.objects.filter(codigo__in=['3.1', '5.1']).exists())
+
+    def test_no_intermediario_adota_existentes(self):
+        resultado = HierarquiaService.upsert_em_lote(ContaContabil, [
+            {'codigo': '1.1', 'nome': 'Circulante', 'tipo': 'S'},
+        ])
+
+        self.assertEqual(resultado.erros, [])
+        self.assertEqual(resultado.criados, 1)
+        self.assertEqual((self._conta('1.1').codigo_pai, self._conta('1.1').nivel), ('1', 2))
+        self.assertEqual((self._conta('1.1.01').codigo_pai, self._conta('1.1.01').nivel), ('1.1', 3))
+
+    def test_sem_atualizar_existentes_ignora_gravados(self):
+        resultado = HierarquiaService.upsert_em_lote(ContaContabil, [
+            {'codigo': '1', 'nome': 'Ativo renomeado', 'tipo': 'S'},
+            {'codigo': '1.4', 'nome': 'Imobilizado', 'tipo': 'A'},
+        ], atualizar_existentes=False)
+
+        self.assertEqual((resultado.criados, resultado.atualizados, resultado.ignorados), (1, 0, 1))
+        self.assertEqual(self._conta('1').nome, 'Ativo')
+        self.assertEqual(self._conta('1.4').codigo_pai, '1')
+
+        resultado = HierarquiaService.upsert_em_lote(ContaContabil, [
+            {'codigo': '1', 'nome': 'Ativo renomeado', 'tipo': 'S'},
+        ])
+        self.assertEqual((resultado.criados, resultado.atualizados, resultado.ignorados), (0, 1, 0))
+        conta = self._conta('1')
+        self.assertEqual(conta.nome, 'Ativo renomeado')
+        # Campos omitidos no lote preservam o valor gravado
+        self.assertTrue(conta.ativa)
+        self.assertEqual(conta.nivel, 1)
+
+
+class InicializacaoSemModulosPesadosTest(SimpleTestCase):
+    """Boot de um worker em interpretador novo não carrega as bibliotecas de dados"""
+
+    def test_boot_nao_importa_modulos_pesados(self):
+        # manage.py test já definiu DJANGO_SETTINGS_MODULE no ambiente herdado
+        resultado = subprocess.run(
+            [sys.executable, '-c', SCRIPT_BOOT % (MODULOS_PESADOS,)],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        self.assertEqual(resultado.returncode, 0, resultado.stderr[-2000:])
+
+        boot = json.loads(resultado.stdout.strip().splitlines()[-1])
+        self.assertEqual(boot['pesados'], [])
@@ -167,6 +167,12 @@ urlpatterns = [
     path('movimentos/<int:pk>/editar/', views.movimento_update, name='movimento_update'),
     path('movimentos/<int:pk>/excluir/', views.movimento_delete, name='movimento_delete'),
     path('movimentos/export-excel/', views.movimento_export_excel, name='movimento_export_excel'),
+    path('movimentos/export-csv/', views.movimento_export_csv, name='movimento_export_csv'),
+    path('movimentos/export-parquet/', views.movimento_export_parquet, name='movimento_export_parquet'),
+    path('movimentos/exportar-background/', views.movimento_exportar_background, name='movimento_exportar_background'),
+    path('exportacoes/', views.exportacao_list, name='exportacao_list'),
+    path('exportacoes/<int:pk>/download/', views.exportacao_download, name='exportacao_download'),
+    path('api/exportacoes/<int:pk>/status/', views.api_exportacao_status, name='api_exportacao_status'),
     
     # ===== MOVIMENTOS - IMPORTAÇÃO COM SERVIÇO OTIMIZADO =====
     path('movimentos/importar/', views.movimento_importar, name='movimento_importar'),
@@ -179,6 +185,17 @@ urlpatterns = [
     path('api/movimento/importar-simples/', views.api_importar_movimentos_simples, name='api_importar_movimentos_simples'),
     path('api/movimento/criticar-arquivo/', views.api_criticar_arquivo_importacao, name='api_criticar_arquivo_importacao'),
 
+    # ===== RELATÓRIOS =====
+    path('api/relatorios/despesa/rollup/', views.api_relatorio_despesa_rollup, name='api_relatorio_despesa_rollup'),
+    path('api/relatorios/movimentos/analise/', views.api_movimentos_analise, name='api_movimentos_analise'),
+    path('api/relatorios/serie-temporal/', views.api_relatorio_serie_temporal, name='api_relatorio_serie_temporal'),
+    path('relatorios/fornecedores/ranking/', views.fornecedor_ranking, name='fornecedor_ranking'),
+    path('relatorios/fornecedores/ranking/csv/', views.fornecedor_ranking_csv, name='fornecedor_ranking_csv'),
+    path('api/relatorios/fornecedores/ranking/', views.api_fornecedor_ranking, name='api_fornecedor_ranking'),
+
+    # ===== INSTRUMENTAÇÃO =====
+    path('api/instrumentacao/views/', views.api_instrumentacao_views, name='api_instrumentacao_views'),
+
     # APIs gerais
     path('api/parametro/<str:codigo>/valor/', views.api_parametro_valor, name='api_parametro_valor'),
 ]
\ No newline at end of file
@@ -147,6 +147,16 @@ from .movimento import (
     
     # Exportação
     movimento_export_excel,              # Exportar para Excel
+    movimento_export_csv,                # Exportar CSV (streaming)
+    movimento_export_parquet,            # Exportar Parquet
+)
+
+# Exportações em segundo plano
+from .exportacao import (
+    exportacao_list,                     # Exportações do usuário (status/download)
+    movimento_exportar_background,       # Enfileirar exportação
+    api_exportacao_status,               # Progresso da exportação
+    exportacao_download,                 # Download do arquivo gerado
 )
 
 # Movimento Import - Funções de importação separadas com SERVIÇO
@@ -188,4 +198,17 @@ from .fornecedor import (
     api_fornecedor_info,                 # Informações do fornecedor
     api_extrair_fornecedor_historico,    # Extração do histórico
     api_sugerir_fornecedores,            # Sugestões de fornecedores similares
-)
\ No newline at end of file
+)
+# Relatórios - Roll-up hierárquico de despesas
+from .relatorio import (
+    api_relatorio_despesa_rollup,        # Roll-up Unidade x Centro x Conta
+    api_movimentos_analise,              # Agrupamentos/pivots sobre snapshot colunar
+    api_relatorio_serie_temporal,        # Séries mensais com MoM/YoY
+    fornecedor_ranking,                  # Ranking de gastos por fornecedor/grupo
+    fornecedor_ranking_csv,              # Ranking completo em CSV (streaming)
+    api_fornecedor_ranking,              # Top-N fornecedores/grupos em JSON
+)
+# Instrumentação - percentis por view
+from .instrumentacao import (
+    api_instrumentacao_views,            # p50/p90/p99 de duração e consultas por view
+)
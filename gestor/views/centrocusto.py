@@ -5,18 +5,19 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.db.models import Q
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.utils import timezone
 import logging
 import json
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
-import io
 
 from core.models import CentroCusto
 from core.forms import CentroCustoForm
+from core.utils.tree_cache import (
+    resposta_condicional_arvore, resposta_arvore_cacheada, snapshot_arvore_cacheado
+)
+from core.utils.tree_utils import calcular_estatisticas_arvore
+from gestor.services.hierarquia_exportacao_service import HierarquiaExportacaoService
 
 logger = logging.getLogger('synchrobi')
 
@@ -27,14 +28,20 @@ def centrocusto_tree_view(request):
     """Visualização hierárquica de centros de custo - HIERARQUIA DECLARADA"""
     
     try:
-        # Query única otimizada - incluindo inativos
-        centros_queryset = CentroCusto.objects.all().order_by('codigo')
-
-        # Construir árvore usando hierarquia declarada
-        tree_data = construir_arvore_declarada(centros_queryset)
+        def construir_snapshot():
+            # Query única otimizada - incluindo inativos
+            centros_queryset = CentroCusto.objects.all().order_by('codigo')
+            
+            # Construir árvore usando hierarquia declarada + stats
+            return {
+                'tree_data': construir_arvore_declarada(centros_queryset),
+                'stats': calcular_stats_centros(centros_queryset),
+            }
         
-        # Calcular stats
-        stats = calcular_stats_centros(centros_queryset)
+        # Árvore e estatísticas cacheadas juntas, por versão da tabela
+        snapshot = snapshot_arvore_cacheado('centros_custo', (CentroCusto,), construir_snapshot)
+        tree_data = snapshot['tree_data']
+        stats = snapshot['stats']
         
         context = {
             'tree_data_json': json.dumps(tree_data, ensure_ascii=False, indent=2),
@@ -338,6 +345,7 @@ def centrocusto_delete_ajax(request, codigo):
 # ===== APIs =====
 
 @login_required
+@resposta_condicional_arvore(CentroCusto)
 def api_centrocusto_tree_data(request):
     """API para dados da árvore - HIERARQUIA DECLARADA"""
     
@@ -367,24 +375,27 @@ def api_centrocusto_tree_data(request):
         if tipo:
             queryset = queryset.filter(tipo=tipo)
         
-        # Construir árvore
-        tree_data = construir_arvore_declarada(queryset)
-        
-        # Stats
-        stats = calcular_stats_centros(queryset)
-        stats['filtros_aplicados'] = {
-            'search': search,
-            'nivel': nivel,
-            'tipo': tipo,
-            'ativo': ativo
-        }
+        def construir_payload():
+            # Construir árvore
+            tree_data = construir_arvore_declarada(queryset)
+            
+            # Stats
+            stats = calcular_stats_centros(queryset)
+            stats['filtros_aplicados'] = {
+                'search': search,
+                'nivel': nivel,
+                'tipo': tipo,
+                'ativo': ativo
+            }
+            
+            return {
+                'success': True,
+                'tree_data': tree_data,
+                'stats': stats,
+                'total_sem_filtro': CentroCusto.objects.count()
+            }
         
-        return JsonResponse({
-            'success': True,
-            'tree_data': tree_data,
-            'stats': stats,
-            'total_sem_filtro': CentroCusto.objects.count()
-        })
+        return resposta_arvore_cacheada(request, 'centros_custo', construir_payload)
         
     except Exception as e:
         logger.error(f'Erro na API de dados da árvore: {str(e)}')
@@ -471,42 +482,8 @@ def construir_arvore_declarada(queryset):
 
 def calcular_stats_centros(queryset):
     """Calcula estatísticas dos centros de custo"""
-    centros_list = list(queryset)
-    total = len(centros_list)
-    
-    if total == 0:
-        return {
-            'total': 0,
-            'tipo_s': 0,
-            'tipo_a': 0,
-            'nivel_max': 0,
-            'contas_por_nivel': {}
-        }
-    
-    # Contadores
-    tipo_s = sum(1 for c in centros_list if c.tipo == 'S')
-    tipo_a = sum(1 for c in centros_list if c.tipo == 'A')
-    
-    # Níveis
-    niveis = [c.nivel for c in centros_list]
-    nivel_max = max(niveis)
-    nivel_min = min(niveis)
-    
-    # Contar por nível
-    contas_por_nivel = {}
-    for nivel in range(nivel_min, nivel_max + 1):
-        count = sum(1 for n in niveis if n == nivel)
-        contas_por_nivel[str(nivel)] = count
-    
-    return {
-        'total': total,
-        'tipo_s': tipo_s,
-        'tipo_a': tipo_a,
-        'nivel_max': nivel_max,
-        'nivel_min': nivel_min,
-        'contas_por_nivel': contas_por_nivel,
-        'niveis_existentes': sorted(list(set(niveis)))
-    }
+    # Agregado no banco (níveis/tipos + existência de filhos), sem materializar o queryset
+    return calcular_estatisticas_arvore(queryset)
 
 # ===== VIEWS MANTIDAS PARA COMPATIBILIDADE =====
 
@@ -561,96 +538,10 @@ def api_centro_custo_detalhes(request, codigo):
 
 @login_required
 def export_centros_custo_excel(request):
-    """Exporta centros de custo para Excel com hierarquia"""
+    """Exporta centros de custo para Excel com hierarquia (streaming, nome do pai e caminho)"""
     try:
-        # Criar workbook
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Centros de Custo"
-
-        # Estilos
-        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=12)
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-
-        # Cabeçalhos
-        headers = ['Nível', 'Código', 'Nome', 'Tipo', 'Código Pai', 'Descrição', 'Ativo', 'Data Criação', 'Data Alteração']
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num)
-            cell.value = header
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-            cell.border = border
-
-        # Buscar centros de custo ordenados
-        centros = CentroCusto.objects.all().order_by('nivel', 'codigo')
-
-        # Preencher dados
-        row_num = 2
-        for centro in centros:
-            # Indentação baseada no nível
-            indentation = "  " * (centro.nivel - 1)
-
-            ws.cell(row=row_num, column=1, value=centro.nivel).border = border
-            ws.cell(row=row_num, column=2, value=centro.codigo).border = border
-            ws.cell(row=row_num, column=3, value=f"{indentation}{centro.nome}").border = border
-            ws.cell(row=row_num, column=4, value=centro.get_tipo_display()).border = border
-            ws.cell(row=row_num, column=5, value=centro.codigo_pai or '').border = border
-            ws.cell(row=row_num, column=6, value=centro.descricao or '').border = border
-            ws.cell(row=row_num, column=7, value='Sim' if centro.ativo else 'Não').border = border
-            ws.cell(row=row_num, column=8, value=centro.data_criacao.strftime('%d/%m/%Y %H:%M') if centro.data_criacao else '').border = border
-            ws.cell(row=row_num, column=9, value=centro.data_alteracao.strftime('%d/%m/%Y %H:%M') if centro.data_alteracao else '').border = border
-
-            # Colorir por tipo
-            if centro.tipo == 'S':
-                # Sintético - amarelo claro
-                tipo_fill = PatternFill(start_color="FFF3CD", end_color="FFF3CD", fill_type="solid")
-            else:
-                # Analítico - verde claro
-                tipo_fill = PatternFill(start_color="E8F5E8", end_color="E8F5E8", fill_type="solid")
-
-            for col in range(1, 10):
-                ws.cell(row=row_num, column=col).fill = tipo_fill
-
-            row_num += 1
-
-        # Ajustar largura das colunas
-        column_widths = {
-            'A': 8,   # Nível
-            'B': 15,  # Código
-            'C': 50,  # Nome (mais largo para hierarquia)
-            'D': 12,  # Tipo
-            'E': 15,  # Código Pai
-            'F': 40,  # Descrição
-            'G': 8,   # Ativo
-            'H': 18,  # Data Criação
-            'I': 18,  # Data Alteração
-        }
-
-        for col, width in column_widths.items():
-            ws.column_dimensions[col].width = width
-
-        # Congelar primeira linha
-        ws.freeze_panes = 'A2'
-
-        # Salvar em memória
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-
-        # Preparar resposta
-        response = HttpResponse(
-            output.read(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="centros_custo_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx"'
+        exportador = HierarquiaExportacaoService.exportar('centro_custo')
+        response = exportador.resposta(f'centros_custo_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx')
 
         logger.info(f'Exportação de centros de custo realizada por {request.user}')
 
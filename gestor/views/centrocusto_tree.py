@@ -3,6 +3,8 @@ from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from core.models import CentroCusto
+from core.utils.tree_cache import resposta_condicional_arvore, resposta_arvore_cacheada
+from core.utils.tree_utils import calcular_estatisticas_arvore
 import json
 
 @login_required
@@ -52,6 +54,7 @@ def centrocusto_tree_view(request):
         return render(request, 'gestor/centrocusto_tree_main.html', context)
 
 @login_required
+@resposta_condicional_arvore(CentroCusto)
 def centrocusto_tree_data(request):
     """API para dados da árvore - HIERARQUIA DECLARADA"""
     
@@ -85,24 +88,27 @@ def centrocusto_tree_data(request):
         if tipo:
             queryset = queryset.filter(tipo=tipo)
         
-        # Construir árvore
-        tree_data = construir_arvore_declarada(queryset)
-        
-        # Calcular stats
-        stats = calcular_stats_centros(queryset)
-        stats['filtros_aplicados'] = {
-            'search': search,
-            'nivel': nivel,
-            'tipo': tipo,
-            'ativo': ativo
-        }
-        
-        return JsonResponse({
-            'success': True,
-            'tree_data': tree_data,
-            'stats': stats,
-            'total_sem_filtro': CentroCusto.objects.filter(ativo=True).count()
-        })
+        def construir_payload():
+            # Construir árvore
+            tree_data = construir_arvore_declarada(queryset)
+            
+            # Calcular stats
+            stats = calcular_stats_centros(queryset)
+            stats['filtros_aplicados'] = {
+                'search': search,
+                'nivel': nivel,
+                'tipo': tipo,
+                'ativo': ativo
+            }
+            
+            return {
+                'success': True,
+                'tree_data': tree_data,
+                'stats': stats,
+                'total_sem_filtro': CentroCusto.objects.filter(ativo=True).count()
+            }
+        
+        return resposta_arvore_cacheada(request, 'centros_custo_ativos', construir_payload)
         
     except Exception as e:
         import logging
@@ -162,39 +168,5 @@ def construir_arvore_declarada(queryset):
 
 def calcular_stats_centros(queryset):
     """Calcula estatísticas dos centros de custo"""
-    centros_list = list(queryset)
-    total = len(centros_list)
-    
-    if total == 0:
-        return {
-            'total': 0,
-            'tipo_s': 0,
-            'tipo_a': 0,
-            'nivel_max': 0,
-            'contas_por_nivel': {}
-        }
-    
-    # Contadores
-    tipo_s = sum(1 for c in centros_list if c.tipo == 'S')
-    tipo_a = sum(1 for c in centros_list if c.tipo == 'A')
-    
-    # Níveis
-    niveis = [c.nivel for c in centros_list]
-    nivel_max = max(niveis)
-    nivel_min = min(niveis)
-    
-    # Contar por nível
-    contas_por_nivel = {}
-    for nivel in range(nivel_min, nivel_max + 1):
-        count = sum(1 for n in niveis if n == nivel)
-        contas_por_nivel[str(nivel)] = count
-    
-    return {
-        'total': total,
-        'tipo_s': tipo_s,
-        'tipo_a': tipo_a,
-        'nivel_max': nivel_max,
-        'nivel_min': nivel_min,
-        'contas_por_nivel': contas_por_nivel,
-        'niveis_existentes': sorted(list(set(niveis)))
-    }
\ No newline at end of file
+    # Agregado no banco (níveis/tipos + existência de filhos), sem materializar o queryset
+    return calcular_estatisticas_arvore(queryset)
@@ -5,13 +5,16 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.db.models import Q
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 import logging
 import json
 
 from core.models import ContaContabil
 from core.forms import ContaContabilForm
+from core.utils.tree_cache import (
+    resposta_condicional_arvore, resposta_arvore_cacheada, snapshot_arvore_cacheado
+)
 
 logger = logging.getLogger('synchrobi')
 
@@ -22,13 +25,21 @@ def contacontabil_tree_view(request):
     """Visualização hierárquica de contas contábeis - HIERARQUIA DECLARADA"""
     
     try:
-        # Query única otimizada - incluindo inativas
-        contas_queryset = ContaContabil.objects.all().order_by('codigo')
-
-        # Construir árvore usando hierarquia declarada (importar de contacontabil_tree.py)
-        from .contacontabil_tree import construir_arvore_declarada, calcular_stats_contas
-        tree_data = construir_arvore_declarada(contas_queryset)
-        stats = calcular_stats_contas(contas_queryset)
+        def construir_snapshot():
+            # Query única otimizada - incluindo inativas
+            contas_queryset = ContaContabil.objects.all().order_by('codigo')
+            
+            # Construir árvore usando hierarquia declarada (importar de contacontabil_tree.py)
+            from .contacontabil_tree import construir_arvore_declarada, calcular_stats_contas
+            return {
+                'tree_data': construir_arvore_declarada(contas_queryset),
+                'stats': calcular_stats_contas(contas_queryset),
+            }
+        
+        # Árvore e estatísticas cacheadas juntas, por versão da tabela
+        snapshot = snapshot_arvore_cacheado('contas_contabeis', (ContaContabil,), construir_snapshot)
+        tree_data = snapshot['tree_data']
+        stats = snapshot['stats']
         
         context = {
             'tree_data_json': json.dumps(tree_data, ensure_ascii=False, indent=2),
@@ -277,6 +288,7 @@ def contacontabil_delete_ajax(request, codigo):
 # ===== APIs =====
 
 @login_required
+@resposta_condicional_arvore(ContaContabil)
 def api_contacontabil_tree_data(request):
     """API para dados da árvore - HIERARQUIA DECLARADA"""
     
@@ -306,24 +318,27 @@ def api_contacontabil_tree_data(request):
         if tipo:
             queryset = queryset.filter(tipo=tipo)
         
-        # Construir árvore
-        from .contacontabil_tree import construir_arvore_declarada, calcular_stats_contas
-        tree_data = construir_arvore_declarada(queryset)
-        stats = calcular_stats_contas(queryset)
+        def construir_payload():
+            # Construir árvore
+            from .contacontabil_tree import construir_arvore_declarada, calcular_stats_contas
+            tree_data = construir_arvore_declarada(queryset)
+            stats = calcular_stats_contas(queryset)
+            
+            stats['filtros_aplicados'] = {
+                'search': search,
+                'nivel': nivel,
+                'tipo': tipo,
+                'ativa': ativa
+            }
+            
+            return {
+                'success': True,
+                'tree_data': tree_data,
+                'stats': stats,
+                'total_sem_filtro': ContaContabil.objects.filter(ativa=True).count()
+            }
         
-        stats['filtros_aplicados'] = {
-            'search': search,
-            'nivel': nivel,
-            'tipo': tipo,
-            'ativa': ativa
-        }
-        
-        return JsonResponse({
-            'success': True,
-            'tree_data': tree_data,
-            'stats': stats,
-            'total_sem_filtro': ContaContabil.objects.filter(ativa=True).count()
-        })
+        return resposta_arvore_cacheada(request, 'contas_contabeis', construir_payload)
         
     except Exception as e:
         logger.error(f'Erro na API de dados da árvore: {str(e)}')
@@ -406,101 +421,13 @@ def contacontabil_delete(request, codigo):
 
 @login_required
 def export_contas_contabeis_excel(request):
-    """Exporta contas contábeis para Excel com hierarquia"""
+    """Exporta contas contábeis para Excel com hierarquia (streaming, nome do pai e caminho)"""
     try:
-        import openpyxl
-        from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
         from django.utils import timezone
-        import io
-
-        # Criar workbook
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Contas Contábeis"
-
-        # Estilos
-        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=12)
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-
-        # Cabeçalhos
-        headers = ['Nível', 'Código', 'Nome', 'Tipo', 'Código Pai', 'Descrição', 'Ativa', 'Data Criação', 'Data Alteração']
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num)
-            cell.value = header
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-            cell.border = border
-
-        # Buscar contas contábeis ordenadas
-        contas = ContaContabil.objects.all().order_by('nivel', 'codigo')
-
-        # Preencher dados
-        row_num = 2
-        for conta in contas:
-            # Indentação baseada no nível
-            indentation = "  " * (conta.nivel - 1)
-
-            ws.cell(row=row_num, column=1, value=conta.nivel).border = border
-            ws.cell(row=row_num, column=2, value=conta.codigo).border = border
-            ws.cell(row=row_num, column=3, value=f"{indentation}{conta.nome}").border = border
-            ws.cell(row=row_num, column=4, value=conta.get_tipo_display()).border = border
-            ws.cell(row=row_num, column=5, value=conta.codigo_pai or '').border = border
-            ws.cell(row=row_num, column=6, value=conta.descricao or '').border = border
-            ws.cell(row=row_num, column=7, value='Sim' if conta.ativa else 'Não').border = border
-            ws.cell(row=row_num, column=8, value=conta.data_criacao.strftime('%d/%m/%Y %H:%M') if conta.data_criacao else '').border = border
-            ws.cell(row=row_num, column=9, value=conta.data_alteracao.strftime('%d/%m/%Y %H:%M') if conta.data_alteracao else '').border = border
-
-            # Colorir por tipo
-            if conta.tipo == 'S':
-                # Sintético - verde claro
-                tipo_fill = PatternFill(start_color="D4EDDA", end_color="D4EDDA", fill_type="solid")
-            else:
-                # Analítico - azul claro
-                tipo_fill = PatternFill(start_color="D1ECF1", end_color="D1ECF1", fill_type="solid")
-
-            for col in range(1, 10):
-                ws.cell(row=row_num, column=col).fill = tipo_fill
-
-            row_num += 1
-
-        # Ajustar largura das colunas
-        column_widths = {
-            'A': 8,   # Nível
-            'B': 15,  # Código
-            'C': 50,  # Nome (mais largo para hierarquia)
-            'D': 12,  # Tipo
-            'E': 15,  # Código Pai
-            'F': 40,  # Descrição
-            'G': 8,   # Ativa
-            'H': 18,  # Data Criação
-            'I': 18,  # Data Alteração
-        }
-
-        for col, width in column_widths.items():
-            ws.column_dimensions[col].width = width
-
-        # Congelar primeira linha
-        ws.freeze_panes = 'A2'
-
-        # Salvar em memória
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
+        from gestor.services.hierarquia_exportacao_service import HierarquiaExportacaoService
 
-        # Preparar resposta
-        response = HttpResponse(
-            output.read(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="contas_contabeis_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx"'
+        exportador = HierarquiaExportacaoService.exportar('conta_contabil')
+        response = exportador.resposta(f'contas_contabeis_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx')
 
         logger.info(f'Exportação de contas contábeis realizada por {request.user}')
 
@@ -3,6 +3,7 @@ from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from core.models import ContaContabil
+from core.utils.tree_utils import calcular_estatisticas_arvore
 import json
 import logging
 
@@ -161,39 +162,5 @@ def construir_arvore_declarada(queryset):
 
 def calcular_stats_contas(queryset):
     """Calcula estatísticas das contas contábeis"""
-    contas_list = list(queryset)
-    total = len(contas_list)
-    
-    if total == 0:
-        return {
-            'total': 0,
-            'tipo_s': 0,
-            'tipo_a': 0,
-            'nivel_max': 0,
-            'contas_por_nivel': {}
-        }
-    
-    # Contadores
-    tipo_s = sum(1 for c in contas_list if c.tipo == 'S')
-    tipo_a = sum(1 for c in contas_list if c.tipo == 'A')
-    
-    # Níveis
-    niveis = [c.nivel for c in contas_list]
-    nivel_max = max(niveis)
-    nivel_min = min(niveis)
-    
-    # Contar por nível
-    contas_por_nivel = {}
-    for nivel in range(nivel_min, nivel_max + 1):
-        count = sum(1 for n in niveis if n == nivel)
-        contas_por_nivel[str(nivel)] = count
-    
-    return {
-        'total': total,
-        'tipo_s': tipo_s,
-        'tipo_a': tipo_a,
-        'nivel_max': nivel_max,
-        'nivel_min': nivel_min,
-        'contas_por_nivel': contas_por_nivel,
-        'niveis_existentes': sorted(list(set(niveis)))
-    }
\ No newline at end of file
+    # Agregado no banco (níveis/tipos + existência de filhos), sem materializar o queryset
+    return calcular_estatisticas_arvore(queryset)
@@ -0,0 +1,106 @@
+# gestor/views/exportacao.py - Exportações de movimentos em segundo plano
+
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.http import JsonResponse, FileResponse, HttpResponseRedirect, Http404
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+import logging
+import os
+
+from core.models import ExportacaoJob
+from gestor.services.exportacao_job_service import ExportacaoJobService
+
+logger = logging.getLogger('synchrobi')
+
+
+def _status_json(job):
+    return {
+        'id': job.pk,
+        'formato': job.formato,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'progresso': job.progresso,
+        'total_estimado': job.total_estimado,
+        'percentual': job.percentual,
+        'finalizado': job.finalizado,
+        'erro': job.mensagem_erro or None,
+        'download_url': (
+            reverse('gestor:exportacao_download', args=[job.pk])
+            if job.status == ExportacaoJob.STATUS_CONCLUIDO else None
+        ),
+    }
+
+
+@login_required
+def exportacao_list(request):
+    """Exportações do usuário com status/progresso e links de download"""
+    exportacoes = ExportacaoJob.objects.filter(usuario=request.user)[:50]
+    context = {
+        'exportacoes': exportacoes,
+        'em_andamento': any(not job.finalizado for job in exportacoes),
+    }
+    return render(request, 'gestor/exportacao_list.html', context)
+
+
+@login_required
+@require_POST
+def movimento_exportar_background(request):
+    """
+    Enfileira a exportação dos movimentos filtrados (POST: formato + filtros da listagem).
+
+    Pedido igual já exportado, sem importação dos períodos desde então,
+    reaproveita o arquivo existente.
+    """
+    ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    try:
+        job, reaproveitado = ExportacaoJobService.solicitar(
+            request.user, request.POST.get('formato', 'xlsx'), request.POST
+        )
+    except ValueError as e:
+        if ajax:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+        messages.error(request, f'Erro na exportação: {str(e)}')
+        return redirect('gestor:movimento_list')
+
+    logger.info(f'Exportação {job.pk} ({job.formato}) solicitada por {request.user}')
+
+    if ajax:
+        return JsonResponse({'success': True, 'reaproveitado': reaproveitado, **_status_json(job)})
+
+    if reaproveitado:
+        messages.success(request, 'Exportação idêntica já disponível: arquivo pronto para download.')
+    else:
+        messages.info(request, 'Exportação iniciada. Acompanhe o progresso abaixo.')
+    return redirect('gestor:exportacao_list')
+
+
+@login_required
+def api_exportacao_status(request, pk):
+    """Status/progresso de uma exportação do usuário"""
+    job = get_object_or_404(ExportacaoJob, pk=pk, usuario=request.user)
+    return JsonResponse({'success': True, **_status_json(job)})
+
+
+@login_required
+def exportacao_download(request, pk):
+    """Arquivo da exportação: redireciona para a URL assinada do bucket ou serve do storage local"""
+    job = get_object_or_404(ExportacaoJob, pk=pk, usuario=request.user)
+    if job.status != ExportacaoJob.STATUS_CONCLUIDO or not job.arquivo:
+        raise Http404('Exportação não disponível')
+
+    storage = job.arquivo.storage
+    nome_arquivo = os.path.basename(job.arquivo.name)
+    if getattr(storage, 'querystring_auth', False):
+        return HttpResponseRedirect(storage.url(
+            job.arquivo.name,
+            parameters={'ResponseContentDisposition': f'attachment; filename="{nome_arquivo}"'},
+        ))
+
+    try:
+        arquivo = storage.open(job.arquivo.name, 'rb')
+    except FileNotFoundError:
+        raise Http404('Arquivo da exportação não encontrado')
+
+    return FileResponse(arquivo, as_attachment=True, filename=nome_arquivo)
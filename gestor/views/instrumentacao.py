@@ -0,0 +1,38 @@
+# gestor/views/instrumentacao.py - Percentis de latência/consultas por view
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+import logging
+
+from synchrobi.instrumentacao import orcamento_da_view, percentis_por_view
+from synchrobi.metrics import JANELA_OBSERVACOES
+
+logger = logging.getLogger('synchrobi')
+
+
+@login_required
+def api_instrumentacao_views(request):
+    """
+    Percentis móveis (p50/p90/p99/max) de duração, consultas e tempo de banco
+    por view, com o orçamento configurado. Valores do worker que atendeu.
+
+    GET ?ordenar=duracao_ms|consultas|db_ms (p90 decrescente; padrão duracao_ms)
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Acesso restrito'}, status=403)
+
+    ordenar = request.GET.get('ordenar', 'duracao_ms')
+    if ordenar not in ('duracao_ms', 'consultas', 'db_ms'):
+        return JsonResponse({'success': False, 'error': f'Ordenação inválida: {ordenar}'}, status=400)
+
+    views = [
+        {'view': view, 'orcamento': orcamento_da_view(view), **estatisticas}
+        for view, estatisticas in percentis_por_view().items()
+    ]
+    views.sort(key=lambda item: item.get(ordenar, {}).get('p90', 0), reverse=True)
+
+    return JsonResponse({
+        'success': True,
+        'janela': JANELA_OBSERVACOES,
+        'views': views,
+    })
@@ -3,18 +3,22 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
-from django.core.paginator import Paginator
-from django.db.models import Q, Sum, Count
+from django.http import JsonResponse, FileResponse
+from django.db import transaction
+from django.db.models import Sum, Count
 from django.utils import timezone
 from datetime import datetime, date, timedelta
 import logging
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-import io
 
-from core.models import Movimento, Unidade, CentroCusto, ContaContabil, ContaExterna, Fornecedor
+from core.models import (
+    Movimento, MovimentoResumoMensal, Unidade, CentroCusto, ContaContabil, ContaExterna, Fornecedor
+)
 from core.forms import MovimentoForm
+from core.utils.csv_streaming import resposta_csv
+from core.utils.paginacao import paginar_por_cursor
+from core.utils.relatorio_cache import relatorio_cacheado, TAG_QUALQUER_PERIODO
+from gestor.services.movimento_busca_service import MovimentoBuscaService
+from gestor.services.movimento_exportacao_service import MovimentoExportacaoService
 
 logger = logging.getLogger('synchrobi')
 
@@ -34,12 +38,7 @@ def movimento_list(request):
     ).order_by('-data', '-id')
     
     if search:
-        movimentos = movimentos.filter(
-            Q(historico__icontains=search) |
-            Q(documento__icontains=search) |
-            Q(fornecedor__razao_social__icontains=search) |
-            Q(fornecedor__codigo__icontains=search)
-        )
+        movimentos = MovimentoBuscaService.aplicar(movimentos, search)
     
     if ano:
         movimentos = movimentos.filter(ano=int(ano))
@@ -53,17 +52,15 @@ def movimento_list(request):
     if centro_custo:
         movimentos = movimentos.filter(centro_custo__codigo__icontains=centro_custo)
     
-    # Calcular totais
-    total_movimentos = movimentos.count()
-    total_valor = movimentos.aggregate(total=Sum('valor'))['total'] or 0
+    # Totais (resumo mensal quando os filtros permitem; senão cacheados por filtro)
+    total_movimentos, total_valor = _totais_movimentos(movimentos, search, ano, mes, unidade, centro_custo)
     
-    # Paginação
-    paginator = Paginator(movimentos, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Paginação por cursor sobre (data, id) - com busca, a relevância vem antes
+    ordenacao = movimentos.query.order_by or ('-data', '-id')
+    page_obj = paginar_por_cursor(movimentos, request.GET.get('cursor'), 20, ordenacao)
     
     # Preparar dados para os dropdowns
-    anos_disponiveis = list(Movimento.objects.values_list('ano', flat=True).distinct().order_by('-ano'))
+    anos_disponiveis = _anos_disponiveis()
     unidades_disponiveis = Unidade.objects.filter(ativa=True).order_by('codigo')
     
     meses = [
@@ -91,6 +88,52 @@ def movimento_list(request):
     
     return render(request, 'gestor/movimento_list.html', context)
 
+def _totais_movimentos(movimentos, search, ano, mes, unidade, centro_custo):
+    """
+    (quantidade, soma de valor) do filtro da listagem.
+
+    Sem busca textual, todos os filtros existem no resumo mensal e os totais
+    saem de lá. Com busca, conta-se uma vez sobre movimentos e o resultado fica
+    no cache de relatórios, invalidado quando os períodos envolvidos mudam.
+    """
+    if not search:
+        resumo = MovimentoResumoMensal.objects.all()
+        if ano:
+            resumo = resumo.filter(ano=int(ano))
+        if mes:
+            resumo = resumo.filter(mes=int(mes))
+        if unidade:
+            resumo = resumo.filter(unidade_id=unidade)
+        if centro_custo:
+            resumo = resumo.filter(centro_custo__codigo__icontains=centro_custo)
+        totais = resumo.aggregate(quantidade=Sum('quantidade'), total=Sum('soma_valor'))
+        return totais['quantidade'] or 0, totais['total'] or 0
+    
+    if ano and mes:
+        periodos = [f"{int(ano)}-{int(mes):02d}"]
+    elif ano:
+        periodos = [f"{int(ano)}-{m:02d}" for m in range(1, 13)]
+    else:
+        periodos = [TAG_QUALQUER_PERIODO]
+    
+    def calcular():
+        totais = movimentos.order_by().aggregate(quantidade=Count('id'), total=Sum('valor'))
+        return totais['quantidade'] or 0, totais['total'] or 0
+    
+    filtros = {
+        'search': search, 'ano': ano, 'mes': mes, 'unidade': unidade, 'centro_custo': centro_custo
+    }
+    return relatorio_cacheado('movimento_list_totais', filtros, periodos, calcular)
+
+def _anos_disponiveis():
+    """Anos com movimentos (do resumo mensal, cacheado até a próxima alteração)"""
+    return relatorio_cacheado(
+        'movimento_anos', {}, [TAG_QUALQUER_PERIODO],
+        lambda: list(
+            MovimentoResumoMensal.objects.order_by('-ano').values_list('ano', flat=True).distinct()
+        )
+    )
+
 @login_required
 def movimento_create(request):
     """Criar novo movimento"""
@@ -98,7 +141,9 @@ def movimento_create(request):
         form = MovimentoForm(request.POST)
         if form.is_valid():
             try:
-                movimento = form.save()
+                with transaction.atomic():
+                    movimento = form.save()
+                    MovimentoResumoMensal.registrar_inclusao(movimento)
                 messages.success(request, f'Movimento criado com sucesso! Valor: {movimento.valor_formatado}')
                 logger.info(f'Movimento criado: {movimento.id} - {movimento.valor_formatado} por {request.user}')
                 return redirect('gestor:movimento_list')
@@ -130,6 +175,9 @@ def movimento_update(request, pk):
     """Editar movimento"""
     movimento = get_object_or_404(Movimento, pk=pk)
     
+    # Chave/valores atuais para atualizar o resumo mensal
+    snapshot_resumo = MovimentoResumoMensal.snapshot(movimento)
+    
     # Guardar valores originais para log
     valores_originais = {
         'valor': movimento.valor,
@@ -142,7 +190,9 @@ def movimento_update(request, pk):
         form = MovimentoForm(request.POST, instance=movimento)
         if form.is_valid():
             try:
-                movimento_atualizado = form.save()
+                with transaction.atomic():
+                    movimento_atualizado = form.save()
+                    MovimentoResumoMensal.registrar_alteracao(snapshot_resumo, movimento_atualizado)
                 
                 # Log de alterações
                 alteracoes = []
@@ -182,9 +232,12 @@ def movimento_delete(request, pk):
         valor_formatado = movimento.valor_formatado
         historico_resumido = movimento.historico[:50]
         movimento_id = movimento.id
+        snapshot_resumo = MovimentoResumoMensal.snapshot(movimento)
         
         try:
-            movimento.delete()
+            with transaction.atomic():
+                movimento.delete()
+                MovimentoResumoMensal.registrar_exclusao(snapshot_resumo)
             messages.success(
                 request, 
                 f'Movimento excluído com sucesso! '
@@ -202,212 +255,83 @@ def movimento_delete(request, pk):
     }
     return render(request, 'gestor/movimento_delete.html', context)
 
+def _movimentos_exportacao(request):
+    """Movimentos com os mesmos filtros da listagem, para as exportações"""
+    return MovimentoExportacaoService.filtrar(request.GET)
+
+
+def _nome_arquivo_exportacao(request, extensao):
+    """Nome do arquivo baseado nos filtros"""
+    ano = request.GET.get('ano', '')
+    mes = request.GET.get('mes', '')
+
+    filename_parts = ['movimentos']
+    if ano:
+        filename_parts.append(str(ano))
+    if mes:
+        filename_parts.append(f"mes_{int(mes):02d}")
+
+    return '_'.join(filename_parts) + '_' + timezone.now().strftime('%Y%m%d_%H%M%S') + f'.{extensao}'
+
+
 @login_required
 def movimento_export_excel(request):
     """Exportar movimentos para Excel"""
     
     try:
-        # Aplicar os mesmos filtros da listagem
-        search = request.GET.get('search', '')
-        ano = request.GET.get('ano', '')
-        mes = request.GET.get('mes', '')
-        unidade = request.GET.get('unidade', '')
-        centro_custo = request.GET.get('centro_custo', '')
-        
-        movimentos = Movimento.objects.select_related(
-            'unidade', 'unidade__empresa', 'centro_custo', 'conta_contabil', 'fornecedor'
-        ).prefetch_related(
-            'conta_contabil__contas_externas'
-        ).order_by('-data', '-id')
-        
-        # Aplicar filtros
-        if search:
-            movimentos = movimentos.filter(
-                Q(historico__icontains=search) |
-                Q(documento__icontains=search) |
-                Q(fornecedor__razao_social__icontains=search) |
-                Q(fornecedor__codigo__icontains=search)
-            )
-        
-        if ano:
-            movimentos = movimentos.filter(ano=int(ano))
-        
-        if mes:
-            movimentos = movimentos.filter(mes=int(mes))
-        
-        if unidade:
-            movimentos = movimentos.filter(unidade_id=unidade)
-        
-        if centro_custo:
-            movimentos = movimentos.filter(centro_custo__codigo__icontains=centro_custo)
-        
-        # Limitar exportação para evitar problemas de memória
-        total_movimentos = movimentos.count()
-        if total_movimentos > 50000:
-            messages.warning(
-                request, 
-                f'Muitos registros para exportar ({total_movimentos:,}). '
-                f'Use filtros para reduzir o volume ou exporte por partes.'
-            )
-            return redirect('gestor:movimento_list')
-        
-        # Criar workbook Excel
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Movimentos"
-        
-        # Definir estilos
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        
-        border_thin = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        
-        # Cabeçalhos
-        headers = [
-            'Data', 'Mês', 'Ano', 'Período', 'Empresa',
-            'Cod Unidade', 'Nome Unidade',
-            'Cod C.Custo', 'Nome Centro Custo',
-            'Cod Linha DRE', 'Nome Linha DRE',
-            'Cod C.Contabil', 'Nome C.Contabil',
-            'Código Fornecedor', 'Razão Social Fornecedor',
-            'Documento', 'Natureza', 'Valor', 'Histórico',
-            'Código Projeto', 'Gerador', 'Rateio',
-            'Data Importação', 'Arquivo Origem', 'Linha Origem'
-        ]
-        
-        # Escrever cabeçalhos
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = border_thin
-        
-        # Escrever dados
-        for row, movimento in enumerate(movimentos, 2):
-            # Obter sigla da empresa
-            empresa_sigla = ''
-            if movimento.unidade and movimento.unidade.empresa:
-                empresa_sigla = movimento.unidade.empresa.sigla
-
-            # Obter código ERP (primeiro código ativo da conta contábil)
-            codigo_erp = ''
-            nome_erp = ''
-            if movimento.conta_contabil:
-                conta_externa = movimento.conta_contabil.contas_externas.filter(ativa=True).first()
-                if conta_externa:
-                    codigo_erp = conta_externa.codigo_externo
-                    nome_erp = conta_externa.nome_externo
-
-            data_row = [
-                movimento.data.strftime('%d/%m/%Y') if movimento.data else '',
-                movimento.mes,
-                movimento.ano,
-                movimento.periodo_display,
-                empresa_sigla,
-                movimento.unidade.codigo_allstrategy if movimento.unidade else '',
-                movimento.unidade.nome if movimento.unidade else '',
-                movimento.centro_custo.codigo if movimento.centro_custo else '',
-                movimento.centro_custo.nome if movimento.centro_custo else '',
-                movimento.conta_contabil.codigo if movimento.conta_contabil else '',
-                movimento.conta_contabil.nome if movimento.conta_contabil else '',
-                codigo_erp,
-                nome_erp,
-                movimento.fornecedor.codigo if movimento.fornecedor else '',
-                movimento.fornecedor.razao_social if movimento.fornecedor else '',
-                movimento.documento,
-                movimento.natureza,
-                float(movimento.valor) if movimento.valor else 0,
-                movimento.historico,
-                movimento.codigo_projeto,
-                movimento.gerador,
-                movimento.rateio,
-                movimento.data_importacao.strftime('%d/%m/%Y %H:%M') if movimento.data_importacao else '',
-                movimento.arquivo_origem,
-                movimento.linha_origem
-            ]
-            
-            for col, value in enumerate(data_row, 1):
-                cell = ws.cell(row=row, column=col, value=value)
-                cell.border = border_thin
-                
-                # Formatação especial para valores monetários
-                if col == 18:  # Coluna Valor (agora na posição 18)
-                    cell.number_format = '#,##0.00'
-                    if value < 0:
-                        cell.font = Font(color="FF0000")  # Vermelho para negativos
+        movimentos = _movimentos_exportacao(request)
+        exportador, total_movimentos = MovimentoExportacaoService.exportar_excel(movimentos, request.user)
+        response = exportador.resposta(_nome_arquivo_exportacao(request, 'xlsx'))
 
-        # Ajustar largura das colunas
-        column_widths = [
-            12, 8, 8, 10,  # Data, Mês, Ano, Período
-            25,            # Empresa
-            15, 30,        # Unidade (All Strategy, Nome)
-            15, 30,        # Centro Custo
-            15, 30,        # Conta Contábil
-            15, 30,        # Código ERP, Nome ERP
-            15, 40,        # Fornecedor
-            15, 8, 15,     # Documento, Natureza, Valor
-            50,            # Histórico
-            15, 15, 8,     # Projeto, Gerador, Rateio
-            20, 25, 8      # Importação info
-        ]
-        
-        for col, width in enumerate(column_widths, 1):
-            ws.column_dimensions[openpyxl.utils.get_column_letter(col)].width = width
-        
-        # Adicionar aba de resumo
-        ws_resumo = wb.create_sheet(title="Resumo")
-        
-        # Estatísticas para resumo
-        stats = {
-            'Total de Movimentos': total_movimentos,
-            'Soma de Valores': float(movimentos.aggregate(Sum('valor'))['valor__sum'] or 0),
-            'Movimentos Débito': movimentos.filter(natureza='D').count(),
-            'Movimentos Crédito': movimentos.filter(natureza='C').count(),
-            'Fornecedores Únicos': movimentos.exclude(fornecedor__isnull=True).values('fornecedor').distinct().count(),
-            'Unidades Únicas': movimentos.values('unidade').distinct().count(),
-            'Data de Exportação': timezone.now().strftime('%d/%m/%Y %H:%M:%S'),
-            'Exportado por': request.user.get_full_name() or request.user.username
-        }
-        
-        # Escrever resumo
-        for row, (label, value) in enumerate(stats.items(), 1):
-            ws_resumo.cell(row=row, column=1, value=label).font = Font(bold=True)
-            ws_resumo.cell(row=row, column=2, value=value)
-        
-        # Salvar em memory
-        excel_file = io.BytesIO()
-        wb.save(excel_file)
-        excel_file.seek(0)
-        
-        # Criar resposta HTTP
-        response = HttpResponse(
-            excel_file.read(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        
-        # Nome do arquivo baseado nos filtros
-        filename_parts = ['movimentos']
-        if ano:
-            filename_parts.append(str(ano))
-        if mes:
-            filename_parts.append(f"mes_{int(mes):02d}")
-        
-        filename = '_'.join(filename_parts) + '_' + timezone.now().strftime('%Y%m%d_%H%M%S') + '.xlsx'
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
         logger.info(f'Exportação Excel realizada por {request.user}: {total_movimentos} movimentos')
         messages.success(request, f'Exportação concluída! {total_movimentos:,} movimentos exportados.')
-        
+
         return response
-        
+
     except Exception as e:
         logger.error(f'Erro na exportação Excel: {str(e)}')
         messages.error(request, f'Erro na exportação: {str(e)}')
-        return redirect('gestor:movimento_list')
\ No newline at end of file
+        return redirect('gestor:movimento_list')
+
+
+@login_required
+def movimento_export_csv(request):
+    """
+    Exportar movimentos em CSV (mesmas colunas e filtros do Excel).
+
+    Gerado linha a linha a partir de lotes do banco, sem limite de registros;
+    datas em ISO e valor com ponto decimal, para ferramentas de BI.
+    """
+    try:
+        movimentos = _movimentos_exportacao(request)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    logger.info(f'Exportação CSV iniciada por {request.user}')
+    return resposta_csv(
+        MovimentoExportacaoService.linhas_csv(movimentos),
+        _nome_arquivo_exportacao(request, 'csv'),
+    )
+
+
+@login_required
+def movimento_export_parquet(request):
+    """Exportar movimentos em Parquet (mesmas colunas e filtros do Excel, row groups em arquivo temporário)"""
+    try:
+        movimentos = _movimentos_exportacao(request)
+        arquivo, total_movimentos = MovimentoExportacaoService.exportar_parquet(movimentos)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except ImportError:
+        return JsonResponse({'success': False, 'error': 'Exportação Parquet requer o pacote pyarrow'}, status=501)
+    except Exception as e:
+        logger.error(f'Erro na exportação Parquet: {str(e)}')
+        return JsonResponse({'success': False, 'error': 'Erro na exportação'}, status=500)
+
+    logger.info(f'Exportação Parquet realizada por {request.user}: {total_movimentos} movimentos')
+    return FileResponse(
+        arquivo,
+        as_attachment=True,
+        filename=_nome_arquivo_exportacao(request, 'parquet'),
+        content_type='application/vnd.apache.parquet',
+    )
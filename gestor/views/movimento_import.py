@@ -8,19 +8,36 @@ from django.views.decorators.http import require_POST
 from django.utils import timezone
 from datetime import datetime, date, timedelta
 import logging
-import pandas as pd
+import time
 import decimal
 from decimal import Decimal, ROUND_HALF_UP
 
-from core.models import Movimento, Unidade, CentroCusto, ContaContabil, ContaExterna, Fornecedor
+from core.models import (
+    Movimento, MovimentoResumoMensal, Unidade, CentroCusto, ContaContabil, ContaExterna, Fornecedor
+)
+from core.utils.indices import carga_em_massa
 from gestor.services.fornecedor_extractor_service import (
     extrair_fornecedor_do_historico,
     extrair_numero_documento_do_historico
 )
+from synchrobi.instrumentacao import registrar_job
+
+# pandas (com numpy/pyarrow) é importado dentro das funções de importação:
+# este módulo é carregado com as URLs e os workers não devem pagá-lo no boot.
 
 logger = logging.getLogger('synchrobi')
 
 
+def _reconstruir_resumo_apos_falha(periodos):
+    """Mantém o resumo mensal coerente quando a importação é interrompida no meio"""
+    if not periodos:
+        return
+    try:
+        MovimentoResumoMensal.reconstruir_periodos(periodos)
+    except Exception as e:
+        logger.error(f'Erro ao reconstruir resumo mensal de {periodos}: {str(e)}')
+
+
 # === FUNÇÕES DE CRÍTICA E ANÁLISE ===
 
 def analisar_arquivo_pre_importacao(df, data_inicio, data_fim):
@@ -30,6 +47,8 @@ def analisar_arquivo_pre_importacao(df, data_inicio, data_fim):
     Returns:
         dict com estatísticas e problemas encontrados
     """
+    import pandas as pd
+
     criticas = {
         'total_linhas': len(df),
         'linhas_no_periodo': 0,
@@ -105,9 +124,7 @@ def analisar_arquivo_pre_importacao(df, data_inicio, data_fim):
 
             # Validar centro de custo
             if codigo_centro:
-                try:
-                    CentroCusto.objects.get(codigo=codigo_centro, ativo=True)
-                except CentroCusto.DoesNotExist:
+                if CentroCusto.buscar_ativo(codigo_centro) is None:
                     if codigo_centro not in criticas['centros_nao_encontrados']:
                         criticas['centros_nao_encontrados'][codigo_centro] = {
                             'quantidade': 0,
@@ -121,8 +138,8 @@ def analisar_arquivo_pre_importacao(df, data_inicio, data_fim):
 
             # Validar conta contábil e filtro de relatório de despesas
             if codigo_conta:
-                try:
-                    conta_externa = ContaExterna.objects.get(codigo_externo=codigo_conta, ativa=True)
+                conta_externa = ContaExterna.buscar_ativa_por_codigo(codigo_conta)
+                if conta_externa is not None:
                     conta_contabil = conta_externa.conta_contabil
 
                     # === FILTRO PRINCIPAL: RELATÓRIO DE DESPESAS ===
@@ -143,7 +160,7 @@ def analisar_arquivo_pre_importacao(df, data_inicio, data_fim):
                         criticas['contas_sem_relatorio_despesa'][codigo_conta]['valor_total'] += valor_decimal
                         linha_valida = False
 
-                except ContaExterna.DoesNotExist:
+                else:
                     if codigo_conta not in criticas['contas_nao_encontradas']:
                         criticas['contas_nao_encontradas'][codigo_conta] = {
                             'quantidade': 0,
@@ -171,10 +188,15 @@ def analisar_arquivo_pre_importacao(df, data_inicio, data_fim):
 
 # === FUNÇÕES DE PROCESSAMENTO DE MOVIMENTOS ===
 
-def processar_linha_excel_otimizada(linha_dados, numero_linha, nome_arquivo, data_inicio, data_fim):
+def processar_linha_excel_otimizada(linha_dados, numero_linha, nome_arquivo, data_inicio, data_fim, carga=None):
     """
     Processamento otimizado da linha Excel usando serviço de extração
+
+    Com carga (CargaEmMassa), o movimento é gravado por carga.salvar(), que
+    escreve direto na partição destacada do mês quando houver.
     """
+    import pandas as pd
+
     try:
         # Função auxiliar para limpar campos
         def limpar_campo_seguro(campo):
@@ -250,16 +272,15 @@ def processar_linha_excel_otimizada(linha_dados, numero_linha, nome_arquivo, dat
         if not unidade:
             raise ValueError(f'Unidade não encontrada: {codigo_unidade}')
         
-        try:
-            centro_custo = CentroCusto.objects.get(codigo=codigo_centro_custo, ativo=True)
-        except CentroCusto.DoesNotExist:
+        # Lookups via cache compartilhado (mesmos códigos se repetem em milhares de linhas)
+        centro_custo = CentroCusto.buscar_ativo(codigo_centro_custo)
+        if centro_custo is None:
             return None, f'Centro de custo não encontrado: {codigo_centro_custo} - linha ignorada'
         
-        try:
-            conta_externa = ContaExterna.objects.get(codigo_externo=codigo_conta_contabil, ativa=True)
-            conta_contabil = conta_externa.conta_contabil
-        except ContaExterna.DoesNotExist:
+        conta_externa = ContaExterna.buscar_ativa_por_codigo(codigo_conta_contabil)
+        if conta_externa is None:
             return None, f'Conta contábil não encontrada: {codigo_conta_contabil} - linha ignorada'
+        conta_contabil = conta_externa.conta_contabil
 
         # === FILTRO: NÃO IMPORTAR SE CONTA NÃO É PARA RELATÓRIO DE DESPESAS ===
         # Retorna None, None para pular silenciosamente (não é um erro de validação)
@@ -275,7 +296,7 @@ def processar_linha_excel_otimizada(linha_dados, numero_linha, nome_arquivo, dat
             fornecedor = extrair_fornecedor_do_historico(historico)
         
         # Criar movimento
-        movimento = Movimento.objects.create(
+        movimento = Movimento(
             mes=mes,
             ano=ano,
             data=data,
@@ -293,6 +314,10 @@ def processar_linha_excel_otimizada(linha_dados, numero_linha, nome_arquivo, dat
             arquivo_origem=nome_arquivo,
             linha_origem=numero_linha
         )
+        if carga is not None:
+            carga.salvar(movimento)
+        else:
+            movimento.save()
         
         return movimento, None
         
@@ -304,6 +329,8 @@ def processar_linha_excel_otimizada(linha_dados, numero_linha, nome_arquivo, dat
 
 def corrigir_estrutura_excel(arquivo):
     """Corrige problemas na estrutura do Excel"""
+    import pandas as pd
+
     try:
         df = pd.read_excel(arquivo, engine='openpyxl', header=0)
         
@@ -634,6 +661,9 @@ def api_preview_movimentos_excel(request):
 def api_importar_movimentos_excel(request):
     """API para importação real dos movimentos usando serviço otimizado com chunks"""
 
+    periodos_afetados = []
+    inicio = time.perf_counter()
+
     try:
         data_inicio_str = request.POST.get('data_inicio')
         data_fim_str = request.POST.get('data_fim')
@@ -651,18 +681,11 @@ def api_importar_movimentos_excel(request):
             return JsonResponse({'success': False, 'error': 'Arquivo não encontrado'})
 
         arquivo = request.FILES['arquivo']
+        periodos_afetados = MovimentoResumoMensal.periodos_entre_datas(data_inicio, data_fim)
 
         # Limpar período
         logger.info(f'Limpando período {data_inicio} a {data_fim}')
-        movimentos_removidos = Movimento.objects.filter(
-            data__gte=data_inicio,
-            data__lte=data_fim
-        ).count()
-
-        Movimento.objects.filter(
-            data__gte=data_inicio,
-            data__lte=data_fim
-        ).delete()
+        movimentos_removidos = Movimento.substituir_periodo_datas(data_inicio, data_fim)
 
         # Processar arquivo
         try:
@@ -685,76 +708,77 @@ def api_importar_movimentos_excel(request):
 
         # Processar em chunks
         CHUNK_SIZE = 100
-        for chunk_start in range(0, total_linhas, CHUNK_SIZE):
-            chunk_end = min(chunk_start + CHUNK_SIZE, total_linhas)
-            chunk_df = df.iloc[chunk_start:chunk_end]
-
-            if chunk_start % 500 == 0:  # Log a cada 500 linhas
-                logger.info(f'Processando linhas {chunk_start+1} a {chunk_end} de {total_linhas}')
+        with carga_em_massa(Movimento, linhas=total_linhas, data_inicio=data_inicio, data_fim=data_fim) as carga:
+            for chunk_start in range(0, total_linhas, CHUNK_SIZE):
+                chunk_end = min(chunk_start + CHUNK_SIZE, total_linhas)
+                chunk_df = df.iloc[chunk_start:chunk_end]
 
-            for idx, linha in chunk_df.iterrows():
-                try:
-                    linha_dict = linha.to_dict()
+                if chunk_start % 500 == 0:  # Log a cada 500 linhas
+                    logger.info(f'Processando linhas {chunk_start+1} a {chunk_end} de {total_linhas}')
 
-                    movimento, erro = processar_linha_excel_otimizada(
-                        linha_dict, idx + 2, arquivo.name, data_inicio, data_fim
-                    )
-
-                    if movimento:
-                        movimentos_criados += 1
-
-                        if movimento.fornecedor:
-                            if movimento.fornecedor.criado_automaticamente:
-                                if movimento.fornecedor.codigo not in fornecedores_novos:
-                                    fornecedores_novos.add(movimento.fornecedor.codigo)
-                                    fornecedores_criados += 1
+                for idx, linha in chunk_df.iterrows():
+                    try:
+                        linha_dict = linha.to_dict()
+
+                        movimento, erro = processar_linha_excel_otimizada(
+                            linha_dict, idx + 2, arquivo.name, data_inicio, data_fim, carga
+                        )
+
+                        if movimento:
+                            movimentos_criados += 1
+
+                            if movimento.fornecedor:
+                                if movimento.fornecedor.criado_automaticamente:
+                                    if movimento.fornecedor.codigo not in fornecedores_novos:
+                                        fornecedores_novos.add(movimento.fornecedor.codigo)
+                                        fornecedores_criados += 1
+                                else:
+                                    fornecedores_encontrados += 1
+
+                        elif erro:
+                            # Ignorar erros de período (sem contar como erro)
+                            if 'fora do período' in erro:
+                                continue
+
+                            # Agrupar erros similares
+                            if 'Conta contábil não encontrada:' in erro:
+                                tipo_base = 'Conta contábil não encontrada'
+                                codigo = erro.split(':')[1].strip().split(' ')[0]
+                                chave_erro = f"{tipo_base}:{codigo}"
+                            elif 'Centro de custo não encontrado:' in erro:
+                                tipo_base = 'Centro de custo não encontrado'
+                                codigo = erro.split(':')[1].strip().split(' ')[0]
+                                chave_erro = f"{tipo_base}:{codigo}"
+                            elif 'Unidade não encontrada:' in erro:
+                                tipo_base = 'Unidade não encontrada'
+                                codigo = erro.split(':')[1].strip().split(' ')[0]
+                                chave_erro = f"{tipo_base}:{codigo}"
                             else:
-                                fornecedores_encontrados += 1
-
-                    elif erro:
-                        # Ignorar erros de período (sem contar como erro)
-                        if 'fora do período' in erro:
-                            continue
-
-                        # Agrupar erros similares
-                        if 'Conta contábil não encontrada:' in erro:
-                            tipo_base = 'Conta contábil não encontrada'
-                            codigo = erro.split(':')[1].strip().split(' ')[0]
-                            chave_erro = f"{tipo_base}:{codigo}"
-                        elif 'Centro de custo não encontrado:' in erro:
-                            tipo_base = 'Centro de custo não encontrado'
-                            codigo = erro.split(':')[1].strip().split(' ')[0]
-                            chave_erro = f"{tipo_base}:{codigo}"
-                        elif 'Unidade não encontrada:' in erro:
-                            tipo_base = 'Unidade não encontrada'
-                            codigo = erro.split(':')[1].strip().split(' ')[0]
-                            chave_erro = f"{tipo_base}:{codigo}"
-                        else:
-                            tipo_base = erro.split(' - linha')[0] if ' - linha' in erro else erro.split(':')[0] if ':' in erro else erro
-                            chave_erro = tipo_base
+                                tipo_base = erro.split(' - linha')[0] if ' - linha' in erro else erro.split(':')[0] if ':' in erro else erro
+                                chave_erro = tipo_base
+
+                            if chave_erro not in erros_tipos:
+                                erros_tipos[chave_erro] = {
+                                    'count': 1,
+                                    'exemplo': erro,
+                                    'tipo': tipo_base
+                                }
+                            else:
+                                erros_tipos[chave_erro]['count'] += 1
+
+                    except Exception as e:
+                        erro_msg = f'Linha {idx + 2}: Erro inesperado - {str(e)}'
+                        tipo_erro = 'Erro inesperado'
 
-                        if chave_erro not in erros_tipos:
-                            erros_tipos[chave_erro] = {
+                        if tipo_erro not in erros_tipos:
+                            erros_tipos[tipo_erro] = {
                                 'count': 1,
-                                'exemplo': erro,
-                                'tipo': tipo_base
+                                'exemplo': erro_msg,
+                                'tipo': tipo_erro
                             }
+                            logger.error(erro_msg)
                         else:
-                            erros_tipos[chave_erro]['count'] += 1
-
-                except Exception as e:
-                    erro_msg = f'Linha {idx + 2}: Erro inesperado - {str(e)}'
-                    tipo_erro = 'Erro inesperado'
-
-                    if tipo_erro not in erros_tipos:
-                        erros_tipos[tipo_erro] = {
-                            'count': 1,
-                            'exemplo': erro_msg,
-                            'tipo': tipo_erro
-                        }
-                        logger.error(erro_msg)
-                    else:
-                        erros_tipos[tipo_erro]['count'] += 1
+                            erros_tipos[tipo_erro]['count'] += 1
 
         # Converter erros agrupados para lista final
         erros = []
@@ -779,6 +803,10 @@ def api_importar_movimentos_excel(request):
             f'{fornecedores_criados} fornecedores novos, {fornecedores_encontrados} existentes'
         )
 
+        # Reconstruir o resumo mensal exatamente dos períodos importados
+        MovimentoResumoMensal.reconstruir_periodos(periodos_afetados)
+        registrar_job('importacao', 'excel', total_linhas, time.perf_counter() - inicio)
+
         return JsonResponse({
             'success': True,
             'resultado': {
@@ -797,6 +825,8 @@ def api_importar_movimentos_excel(request):
 
     except Exception as e:
         logger.error(f'Erro crítico na importação: {str(e)}', exc_info=True)
+        _reconstruir_resumo_apos_falha(periodos_afetados)
+        registrar_job('importacao', 'excel', 0, time.perf_counter() - inicio, status='erro')
         return JsonResponse({
             'success': False,
             'error': f'Erro na importação: {str(e)}'
@@ -998,6 +1028,11 @@ def api_criticar_arquivo_importacao(request):
 @require_POST
 def api_importar_movimentos_simples(request):
     """API simplificada com serviço otimizado e processamento em chunks"""
+    import pandas as pd
+
+    periodos_afetados = []
+    inicio = time.perf_counter()
+
     try:
         # Validar entrada
         if 'arquivo' not in request.FILES:
@@ -1042,12 +1077,9 @@ def api_importar_movimentos_simples(request):
             })
 
         # Limpar período existente
+        periodos_afetados = MovimentoResumoMensal.periodos_entre_datas(data_inicio, data_fim)
         logger.info("Limpando período existente...")
-        movimentos_removidos = Movimento.objects.filter(
-            data__gte=data_inicio, data__lte=data_fim
-        ).count()
-
-        Movimento.objects.filter(data__gte=data_inicio, data__lte=data_fim).delete()
+        movimentos_removidos = Movimento.substituir_periodo_datas(data_inicio, data_fim)
         logger.info(f"Removidos {movimentos_removidos} movimentos do período")
 
         # Processar linhas em chunks para melhor performance
@@ -1063,55 +1095,59 @@ def api_importar_movimentos_simples(request):
         outros_erros = []
 
         # Processar em chunks
-        for chunk_start in range(0, total_linhas, CHUNK_SIZE):
-            chunk_end = min(chunk_start + CHUNK_SIZE, total_linhas)
-            chunk_df = df.iloc[chunk_start:chunk_end]
+        with carga_em_massa(Movimento, linhas=total_linhas, data_inicio=data_inicio, data_fim=data_fim) as carga:
+            for chunk_start in range(0, total_linhas, CHUNK_SIZE):
+                chunk_end = min(chunk_start + CHUNK_SIZE, total_linhas)
+                chunk_df = df.iloc[chunk_start:chunk_end]
 
-            logger.info(f"Processando linhas {chunk_start+1} a {chunk_end} de {total_linhas}")
+                logger.info(f"Processando linhas {chunk_start+1} a {chunk_end} de {total_linhas}")
 
-            movimentos_chunk = []
+                movimentos_chunk = []
 
-            for idx, linha in chunk_df.iterrows():
-                try:
-                    linha_dict = linha.to_dict()
-
-                    movimento, erro = processar_linha_excel_otimizada(
-                        linha_dict, idx + 2, arquivo.name, data_inicio, data_fim
-                    )
-
-                    if movimento:
-                        movimentos_criados += 1
-                        if movimento.fornecedor:
-                            if movimento.fornecedor.criado_automaticamente:
-                                if movimento.fornecedor.codigo not in fornecedores_novos_codigos:
-                                    fornecedores_novos_codigos.add(movimento.fornecedor.codigo)
-                                    fornecedores_criados += 1
-                    elif erro:
-                        # Ignorar erros de período e filtros silenciosos (sem contar como erro)
-                        if 'fora do período' in erro:
-                            continue
-
-                        # Extrair código específico do erro
-                        if 'Conta contábil não encontrada:' in erro:
-                            codigo = erro.split(':')[1].strip().split(' ')[0]
-                            contas_nao_encontradas.add(codigo)
-                        elif 'Centro de custo não encontrado:' in erro:
-                            codigo = erro.split(':')[1].strip().split(' ')[0]
-                            centros_nao_encontrados.add(codigo)
-                        elif 'Unidade não encontrada:' in erro:
-                            codigo = erro.split(':')[1].strip().split(' ')[0]
-                            unidades_nao_encontradas.add(codigo)
-                        else:
-                            if len(outros_erros) < 100:  # Limitar erros coletados
-                                outros_erros.append(erro)
+                for idx, linha in chunk_df.iterrows():
+                    try:
+                        linha_dict = linha.to_dict()
+
+                        movimento, erro = processar_linha_excel_otimizada(
+                            linha_dict, idx + 2, arquivo.name, data_inicio, data_fim, carga
+                        )
+
+                        if movimento:
+                            movimentos_criados += 1
+                            if movimento.fornecedor:
+                                if movimento.fornecedor.criado_automaticamente:
+                                    if movimento.fornecedor.codigo not in fornecedores_novos_codigos:
+                                        fornecedores_novos_codigos.add(movimento.fornecedor.codigo)
+                                        fornecedores_criados += 1
+                        elif erro:
+                            # Ignorar erros de período e filtros silenciosos (sem contar como erro)
+                            if 'fora do período' in erro:
+                                continue
+
+                            # Extrair código específico do erro
+                            if 'Conta contábil não encontrada:' in erro:
+                                codigo = erro.split(':')[1].strip().split(' ')[0]
+                                contas_nao_encontradas.add(codigo)
+                            elif 'Centro de custo não encontrado:' in erro:
+                                codigo = erro.split(':')[1].strip().split(' ')[0]
+                                centros_nao_encontrados.add(codigo)
+                            elif 'Unidade não encontrada:' in erro:
+                                codigo = erro.split(':')[1].strip().split(' ')[0]
+                                unidades_nao_encontradas.add(codigo)
+                            else:
+                                if len(outros_erros) < 100:  # Limitar erros coletados
+                                    outros_erros.append(erro)
 
-                except Exception as e:
-                    if len(outros_erros) < 100:
-                        outros_erros.append(f"Linha {idx + 2}: {str(e)}")
-                    logger.error(f"Erro na linha {idx + 2}: {str(e)}")
+                    except Exception as e:
+                        if len(outros_erros) < 100:
+                            outros_erros.append(f"Linha {idx + 2}: {str(e)}")
+                        logger.error(f"Erro na linha {idx + 2}: {str(e)}")
 
         logger.info(f"Processamento concluído: {movimentos_criados} movimentos criados")
 
+        # Reconstruir o resumo mensal exatamente dos períodos importados
+        MovimentoResumoMensal.reconstruir_periodos(periodos_afetados)
+
         # Montar lista de erros com todos os códigos
         erros_resumo = []
 
@@ -1154,11 +1190,14 @@ def api_importar_movimentos_simples(request):
         }
 
         logger.info(f"Importação concluída: {movimentos_criados} movimentos, {fornecedores_criados} fornecedores novos, {total_erros_estimado} erros")
+        registrar_job('importacao', 'simples', total_linhas, time.perf_counter() - inicio)
 
         return JsonResponse(resultado)
 
     except Exception as e:
         logger.error(f"Erro crítico na importação: {str(e)}", exc_info=True)
+        _reconstruir_resumo_apos_falha(periodos_afetados)
+        registrar_job('importacao', 'simples', 0, time.perf_counter() - inicio, status='erro')
         return JsonResponse({
             'success': False,
             'error': f'Erro durante importação: {str(e)}'
@@ -0,0 +1,271 @@
+# gestor/views/relatorio.py - Relatórios gerenciais (roll-up de despesas e análises)
+
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.utils import timezone
+import itertools
+import logging
+
+from core.models import Unidade, CentroCusto, ContaContabil
+from core.utils.csv_streaming import resposta_csv
+from core.utils.relatorio_cache import relatorio_cacheado, periodos_intervalo
+from core.utils.tree_cache import calcular_versao
+
+# Os serviços de relatório usam numpy/pandas: importados dentro das views para
+# não pesarem no boot dos workers (este módulo entra na carga das URLs).
+
+logger = logging.getLogger('synchrobi')
+
+
+def _parametros_rollup(request):
+    """Normaliza os filtros GET do roll-up (períodos default: ano corrente até o mês atual)"""
+    from gestor.services.relatorio_rollup_service import RelatorioRollupService
+
+    hoje = timezone.localdate()
+
+    dimensoes_param = request.GET.get('dimensoes', '')
+    dimensoes = [d.strip() for d in dimensoes_param.split(',') if d.strip()] or \
+        list(RelatorioRollupService.DIMENSOES)
+
+    niveis_max = {}
+    nivel_max_geral = request.GET.get('nivel_max', '')
+    for dimensao in RelatorioRollupService.DIMENSOES:
+        valor = request.GET.get(f'nivel_max_{dimensao}', nivel_max_geral)
+        if valor:
+            niveis_max[dimensao] = int(valor)
+
+    return {
+        'periodo_inicio': request.GET.get('periodo_inicio') or f'{hoje.year}-01',
+        'periodo_fim': request.GET.get('periodo_fim') or f'{hoje.year}-{hoje.month:02d}',
+        'dimensoes': dimensoes,
+        'natureza': request.GET.get('natureza', '') or None,
+        'campo_valor': request.GET.get('valor', 'valor'),
+        'niveis_max': niveis_max,
+        'incluir_cubo': request.GET.get('cubo', '1') not in ('0', 'false'),
+    }
+
+
+@login_required
+def api_relatorio_despesa_rollup(request):
+    """
+    Roll-up de despesas por Unidade x Centro de Custo x Conta Contábil.
+
+    GET: periodo_inicio, periodo_fim (YYYY-MM), dimensoes (lista separada por
+    vírgula), natureza (D/C/A), valor (valor|absoluto), nivel_max ou
+    nivel_max_<dimensao>, cubo (0 para só os totais por dimensão).
+    Resultados ficam em cache até algum dos períodos cobertos ser reimportado.
+    """
+    from gestor.services.relatorio_rollup_service import RelatorioRollupService
+
+    try:
+        parametros = _parametros_rollup(request)
+        periodo_inicio = RelatorioRollupService.validar_periodo(parametros['periodo_inicio'])
+        periodo_fim = RelatorioRollupService.validar_periodo(parametros['periodo_fim'])
+
+        # A versão das árvores entra na assinatura: reestruturar a hierarquia
+        # muda os subtotais sem tocar nos períodos
+        versao_arvores = calcular_versao(Unidade, CentroCusto, ContaContabil)
+
+        relatorio = relatorio_cacheado(
+            'despesa_rollup',
+            {**parametros, 'versao_arvores': versao_arvores},
+            periodos_intervalo(periodo_inicio, periodo_fim),
+            lambda: RelatorioRollupService.gerar(**parametros),
+        )
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f'Erro no roll-up de despesas: {str(e)}')
+        return JsonResponse({'success': False, 'error': 'Erro ao gerar relatório'}, status=500)
+
+    return JsonResponse({'success': True, **relatorio})
+
+
+def _lista_param(request, nome):
+    return [valor.strip() for valor in request.GET.get(nome, '').split(',') if valor.strip()]
+
+
+@login_required
+def api_movimentos_analise(request):
+    """
+    Análise ad-hoc (somente leitura) sobre o snapshot colunar dos movimentos.
+
+    GET: periodo_inicio, periodo_fim (YYYY-MM), operacao (agrupar|pivot),
+    por (dimensões do agrupamento), linhas/colunas (pivot), limite, ordenar
+    (total|chave) e filtros unidade, centro_custo, conta_contabil,
+    fornecedor (códigos) e natureza (listas separadas por vírgula).
+    Dimensões: unidade, centro_custo, conta_contabil, fornecedor, natureza,
+    data, periodo, ano, mes.
+    """
+    from gestor.services.movimento_snapshot_service import MovimentoSnapshotService, DIMENSOES_CATEGORICAS
+    from gestor.services.relatorio_rollup_service import RelatorioRollupService
+
+    hoje = timezone.localdate()
+    try:
+        periodo_inicio = RelatorioRollupService.validar_periodo(
+            request.GET.get('periodo_inicio') or f'{hoje.year}-01'
+        )
+        periodo_fim = RelatorioRollupService.validar_periodo(
+            request.GET.get('periodo_fim') or f'{hoje.year}-{hoje.month:02d}'
+        )
+        if periodo_inicio > periodo_fim:
+            raise ValueError('Período inicial maior que o período final')
+
+        snapshot = MovimentoSnapshotService.snapshot(periodo_inicio, periodo_fim).filtrar(
+            natureza=_lista_param(request, 'natureza'),
+            **{
+                dim: MovimentoSnapshotService.chaves_filtro(dim, _lista_param(request, dim))
+                for dim in DIMENSOES_CATEGORICAS
+            },
+        )
+
+        operacao = request.GET.get('operacao', 'agrupar')
+        if operacao == 'pivot':
+            linhas = request.GET.get('linhas', 'unidade')
+            colunas = request.GET.get('colunas', 'periodo')
+            resultado = snapshot.pivot(linhas, colunas)
+            dimensoes_nomeadas = {linhas: resultado['linhas'], colunas: resultado['colunas']}
+        elif operacao == 'agrupar':
+            por = _lista_param(request, 'por') or ['unidade']
+            limite = int(request.GET.get('limite') or 0) or None
+            resultado = snapshot.agrupar(por, ordenar=request.GET.get('ordenar', 'total'), limite=limite)
+            dimensoes_nomeadas = {dim: [item[dim] for item in resultado] for dim in por}
+        else:
+            raise ValueError(f'Operação inválida: {operacao}')
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f'Erro na análise de movimentos: {str(e)}')
+        return JsonResponse({'success': False, 'error': 'Erro ao analisar movimentos'}, status=500)
+
+    nomes = {
+        dim: {str(chave): nome for chave, nome in MovimentoSnapshotService.nomes(dim, chaves).items()}
+        for dim, chaves in dimensoes_nomeadas.items()
+        if dim in DIMENSOES_CATEGORICAS
+    }
+
+    return JsonResponse({
+        'success': True,
+        'periodo_inicio': periodo_inicio,
+        'periodo_fim': periodo_fim,
+        'operacao': operacao,
+        'total_movimentos': len(snapshot),
+        'total_geral': snapshot.total / 100,
+        'resultado': resultado,
+        'nomes': nomes,
+    })
+
+
+@login_required
+def api_relatorio_serie_temporal(request):
+    """
+    Séries mensais (entidades x meses) com variação mês a mês e ano contra ano.
+
+    GET: dimensao (unidade|centro_custo|conta_contabil), codigos (lista
+    separada por vírgula; padrão: raízes), periodo_fim (YYYY-MM, padrão mês
+    atual), meses (padrão 24), natureza (D/C/A), valor (valor|absoluto).
+    Códigos sintéticos trazem o total da subárvore.
+    """
+    from gestor.services.serie_temporal_service import SerieTemporalService
+
+    hoje = timezone.localdate()
+    try:
+        serie = SerieTemporalService.gerar(
+            dimensao=request.GET.get('dimensao') or 'unidade',
+            periodo_fim=request.GET.get('periodo_fim') or f'{hoje.year}-{hoje.month:02d}',
+            meses=int(request.GET.get('meses') or SerieTemporalService.MESES_PADRAO),
+            codigos=_lista_param(request, 'codigos'),
+            natureza=request.GET.get('natureza', '') or None,
+            campo_valor=request.GET.get('valor') or 'valor',
+        )
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f'Erro na série temporal: {str(e)}')
+        return JsonResponse({'success': False, 'error': 'Erro ao gerar série temporal'}, status=500)
+
+    return JsonResponse({'success': True, **serie})
+
+
+def _parametros_ranking(request):
+    """Filtros GET do ranking de fornecedores (períodos default: ano corrente até o mês atual)"""
+    hoje = timezone.localdate()
+    return {
+        'periodo_inicio': request.GET.get('periodo_inicio') or f'{hoje.year}-01',
+        'periodo_fim': request.GET.get('periodo_fim') or f'{hoje.year}-{hoje.month:02d}',
+        'agrupamento': request.GET.get('agrupamento') or 'fornecedor',
+        'unidade': request.GET.get('unidade', '').strip() or None,
+        'conta_contabil': request.GET.get('conta_contabil', '').strip() or None,
+        'natureza': request.GET.get('natureza', '') or None,
+        'campo_valor': request.GET.get('valor') or 'valor',
+    }
+
+
+@login_required
+def fornecedor_ranking(request):
+    """Ranking de gastos por fornecedor/grupo com variação contra o período anterior"""
+    from gestor.services.fornecedor_ranking_service import FornecedorRankingService
+
+    parametros = _parametros_ranking(request)
+    limite = 50
+
+    resultado = None
+    try:
+        limite = FornecedorRankingService.validar_limite(request.GET.get('limite'), padrao=50)
+        resultado = FornecedorRankingService.ranking(limite=limite, **parametros)
+    except ValueError as e:
+        messages.error(request, str(e))
+    except Exception as e:
+        logger.error(f'Erro no ranking de fornecedores: {str(e)}')
+        messages.error(request, 'Erro ao gerar ranking de fornecedores')
+
+    context = {
+        **parametros,
+        'limite': limite,
+        'resultado': resultado,
+    }
+    return render(request, 'gestor/fornecedor_ranking.html', context)
+
+
+@login_required
+def api_fornecedor_ranking(request):
+    """
+    Top-N fornecedores (ou grupos) por gasto, a partir do resumo mensal.
+
+    GET: periodo_inicio, periodo_fim (YYYY-MM), agrupamento (fornecedor|grupo),
+    unidade e conta_contabil (código; inclui a subárvore), natureza (D/C/A),
+    valor (valor|absoluto), limite (padrão 20; 0 = ranking completo).
+    """
+    from gestor.services.fornecedor_ranking_service import FornecedorRankingService
+
+    try:
+        limite = FornecedorRankingService.validar_limite(request.GET.get('limite'), padrao=20)
+        resultado = FornecedorRankingService.ranking(limite=limite, **_parametros_ranking(request))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f'Erro no ranking de fornecedores: {str(e)}')
+        return JsonResponse({'success': False, 'error': 'Erro ao gerar ranking'}, status=500)
+
+    return JsonResponse({'success': True, **resultado})
+
+
+@login_required
+def fornecedor_ranking_csv(request):
+    """Ranking completo em CSV, gerado linha a linha (mesmos filtros da API)"""
+    from gestor.services.fornecedor_ranking_service import FornecedorRankingService
+
+    parametros = _parametros_ranking(request)
+    try:
+        linhas = FornecedorRankingService.linhas_csv(**parametros)
+        # Primeira linha já valida os filtros antes de abrir a resposta
+        cabecalho = next(linhas)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    nome_arquivo = (
+        f"ranking_{parametros['agrupamento']}_{parametros['periodo_inicio']}_{parametros['periodo_fim']}.csv"
+    )
+    return resposta_csv(itertools.chain([cabecalho], linhas), nome_arquivo, delimitador=';', bom=True)
@@ -8,8 +8,9 @@ from django.views.decorators.http import require_POST
 import logging
 import json
 
-from core.models import Unidade
+from core.models import Unidade, Empresa
 from core.forms import UnidadeForm
+from core.utils.tree_cache import resposta_condicional_arvore, resposta_arvore_cacheada
 
 logger = logging.getLogger('synchrobi')
 
@@ -219,44 +220,11 @@ def unidade_delete_ajax(request, pk):
 # ===== API ENDPOINTS BÁSICAS =====
 
 @login_required
+@resposta_condicional_arvore(Unidade, Empresa)
 def api_unidade_tree_data(request):
     """API básica para dados atualizados da árvore"""
     try:
-        unidades = Unidade.objects.filter(ativa=True).select_related('empresa').order_by('codigo')
-        
-        def construir_no(unidade):
-            filhos_diretos = unidade.get_filhos_diretos()
-            return {
-                'id': unidade.id,
-                'codigo': unidade.codigo,
-                'codigo_allstrategy': unidade.codigo_allstrategy,
-                'nome': unidade.nome,
-                'tipo': unidade.tipo,
-                'nivel': unidade.nivel,
-                'ativa': unidade.ativa,
-                'empresa_sigla': unidade.empresa.sigla if unidade.empresa else '',
-                'descricao': unidade.descricao,
-                'tem_filhos': unidade.tem_filhos,
-                'filhos': [construir_no(filho) for filho in filhos_diretos.order_by('codigo')]
-            }
-        
-        raizes = [u for u in unidades if u.nivel == 1]
-        arvore_data = [construir_no(raiz) for raiz in raizes]
-        
-        # Estatísticas
-        total_unidades = len(list(unidades))
-        unidades_sinteticas = sum(1 for u in unidades if u.tem_filhos)
-        unidades_analiticas = total_unidades - unidades_sinteticas
-        
-        return JsonResponse({
-            'success': True,
-            'tree_data': arvore_data,
-            'stats': {
-                'total': total_unidades,
-                'tipo_s': unidades_sinteticas,
-                'tipo_a': unidades_analiticas,
-            }
-        })
+        return resposta_arvore_cacheada(request, 'unidades_basica', _construir_payload_arvore_basica)
         
     except Exception as e:
         logger.error(f'Erro na API básica de dados da árvore: {str(e)}')
@@ -265,6 +233,50 @@ def api_unidade_tree_data(request):
             'error': 'Erro interno'
         })
 
+def _construir_payload_arvore_basica():
+    """Monta o payload da API básica da árvore de unidades"""
+    unidades = list(Unidade.objects.filter(ativa=True).select_related('empresa').order_by('codigo'))
+    
+    # Filhos ativos de cada código a partir da mesma query (sem consulta por nó)
+    filhos_por_pai = {}
+    for unidade in unidades:
+        if unidade.codigo_pai:
+            filhos_por_pai.setdefault(unidade.codigo_pai, []).append(unidade)
+    
+    def construir_no(unidade):
+        filhos_diretos = filhos_por_pai.get(unidade.codigo, [])
+        return {
+            'id': unidade.id,
+            'codigo': unidade.codigo,
+            'codigo_allstrategy': unidade.codigo_allstrategy,
+            'nome': unidade.nome,
+            'tipo': unidade.tipo,
+            'nivel': unidade.nivel,
+            'ativa': unidade.ativa,
+            'empresa_sigla': unidade.empresa.sigla if unidade.empresa else '',
+            'descricao': unidade.descricao,
+            'tem_filhos': bool(filhos_diretos),
+            'filhos': [construir_no(filho) for filho in filhos_diretos]
+        }
+    
+    raizes = [u for u in unidades if u.nivel == 1]
+    arvore_data = [construir_no(raiz) for raiz in raizes]
+    
+    # Estatísticas
+    total_unidades = len(unidades)
+    unidades_sinteticas = sum(1 for u in unidades if u.codigo in filhos_por_pai)
+    unidades_analiticas = total_unidades - unidades_sinteticas
+    
+    return {
+        'success': True,
+        'tree_data': arvore_data,
+        'stats': {
+            'total': total_unidades,
+            'tipo_s': unidades_sinteticas,
+            'tipo_a': unidades_analiticas,
+        }
+    }
+
 @login_required
 def api_validar_codigo(request):
     """API para validar código de unidade em tempo real - HIERARQUIA DECLARADA"""
@@ -338,11 +350,15 @@ def api_buscar_unidade_multiplos_criterios(request):
             Q(descricao__icontains=search_term)
         )
         
-        unidades = queryset.filter(filtros).order_by('nivel', 'codigo')[:limit]
+        unidades = list(queryset.filter(filtros).order_by('nivel', 'codigo')[:limit])
+        
+        # Caminhos e filhos resolvidos em lote (sem query por resultado)
+        caminhos = Unidade.resolver_caminhos(unidades)
+        com_filhos = Unidade.codigos_com_filhos([u.codigo for u in unidades])
         
         results = []
         for unidade in unidades:
-            caminho = unidade.get_caminho_completo()  # ✓ CORRIGIDO
+            caminho = caminhos[unidade.codigo]
             caminho_texto = ' > '.join([f"{u.codigo_display}" for u in caminho])
             
             results.append({
@@ -355,7 +371,7 @@ def api_buscar_unidade_multiplos_criterios(request):
                 'nivel': unidade.nivel,
                 'empresa_sigla': unidade.empresa.sigla if unidade.empresa else '',
                 'caminho_hierarquico': caminho_texto,
-                'tem_filhos': unidade.tem_filhos
+                'tem_filhos': unidade.codigo in com_filhos
             })
         
         return JsonResponse({
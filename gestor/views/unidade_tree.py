@@ -3,7 +3,11 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
-from core.models import Unidade
+from core.models import Unidade, Empresa
+from core.utils.tree_cache import (
+    resposta_condicional_arvore, resposta_arvore_cacheada, snapshot_arvore_cacheado
+)
+from core.utils.tree_utils import calcular_estatisticas_arvore
 import json
 import logging
 from django.utils import timezone
@@ -14,14 +18,21 @@ logger = logging.getLogger('synchrobi')
 def unidade_tree_view(request):
     """Visualização hierárquica principal de unidades organizacionais - HIERARQUIA DECLARADA"""
     
-    # Buscar todas as unidades ativas
-    unidades = Unidade.objects.filter(ativa=True).select_related('empresa').order_by('codigo')
-    
-    # Construir estrutura de árvore usando hierarquia declarada
-    tree_data = construir_arvore_declarada(unidades)
+    def construir_snapshot():
+        # Buscar todas as unidades ativas
+        unidades = Unidade.objects.filter(ativa=True).select_related('empresa').order_by('codigo')
+        
+        # Construir estrutura de árvore usando hierarquia declarada
+        # e calcular estatísticas detalhadas
+        return {
+            'tree_data': construir_arvore_declarada(unidades),
+            'stats': calcular_stats_unidades(unidades),
+        }
     
-    # Calcular estatísticas detalhadas
-    stats = calcular_stats_unidades(unidades)
+    # Árvore e estatísticas cacheadas juntas, por versão das tabelas
+    snapshot = snapshot_arvore_cacheado('unidades', (Unidade, Empresa), construir_snapshot)
+    tree_data = snapshot['tree_data']
+    stats = snapshot['stats']
     
     context = {
         'tree_data_json': json.dumps(tree_data, ensure_ascii=False, indent=2),
@@ -40,6 +51,7 @@ def unidade_tree_view(request):
     return render(request, 'gestor/unidade_tree_main.html', context)
 
 @login_required
+@resposta_condicional_arvore(Unidade, Empresa)
 def unidade_tree_data(request):
     """API para dados da árvore de unidades com filtros avançados - HIERARQUIA DECLARADA"""
     
@@ -78,25 +90,29 @@ def unidade_tree_data(request):
         if empresa:
             queryset = queryset.filter(empresa__sigla=empresa)
         
-        # Construir árvore filtrada usando hierarquia declarada
-        tree_data = construir_arvore_declarada(queryset)
-        
-        # Calcular estatísticas dos dados filtrados
-        stats = calcular_stats_unidades(queryset)
-        stats['filtros_aplicados'] = {
-            'search': search,
-            'nivel': nivel,
-            'tipo': tipo,
-            'empresa': empresa,
-            'ativa': ativa
-        }
+        def construir_payload():
+            # Construir árvore filtrada usando hierarquia declarada
+            tree_data = construir_arvore_declarada(queryset)
+            
+            # Calcular estatísticas dos dados filtrados
+            stats = calcular_stats_unidades(queryset)
+            stats['filtros_aplicados'] = {
+                'search': search,
+                'nivel': nivel,
+                'tipo': tipo,
+                'empresa': empresa,
+                'ativa': ativa
+            }
+            
+            return {
+                'success': True,
+                'tree_data': tree_data,
+                'stats': stats,
+                'total_sem_filtro': Unidade.objects.filter(ativa=True).count()
+            }
         
-        return JsonResponse({
-            'success': True,
-            'tree_data': tree_data,
-            'stats': stats,
-            'total_sem_filtro': Unidade.objects.filter(ativa=True).count()
-        })
+        # Payload reaproveitado do cache enquanto a versão das tabelas não mudar
+        return resposta_arvore_cacheada(request, 'unidades', construir_payload)
         
     except Exception as e:
         logger.error(f'Erro na API de dados da árvore: {str(e)}')
@@ -158,52 +174,8 @@ def construir_arvore_declarada(queryset):
 
 def calcular_stats_unidades(queryset):
     """Calcula estatísticas das unidades"""
-    unidades_list = list(queryset)
-    total = len(unidades_list)
-    
-    if total == 0:
-        return {
-            'total': 0,
-            'tipo_s': 0,
-            'tipo_a': 0,
-            'nivel_max': 0,
-            'contas_por_nivel': {}
-        }
-    
-    # Contadores
-    tipo_s = sum(1 for u in unidades_list if u.tem_filhos)
-    tipo_a = total - tipo_s
-    
-    # Níveis
-    niveis = [u.nivel for u in unidades_list]
-    nivel_max = max(niveis)
-    nivel_min = min(niveis)
-    
-    # Contar por nível
-    contas_por_nivel = {}
-    for nivel in range(nivel_min, nivel_max + 1):
-        count = sum(1 for n in niveis if n == nivel)
-        contas_por_nivel[str(nivel)] = count
-    
-    # Contar por empresa
-    empresas_stats = {}
-    for unidade in unidades_list:
-        if unidade.empresa:
-            sigla = unidade.empresa.sigla
-            if sigla not in empresas_stats:
-                empresas_stats[sigla] = 0
-            empresas_stats[sigla] += 1
-    
-    return {
-        'total': total,
-        'tipo_s': tipo_s,
-        'tipo_a': tipo_a,
-        'nivel_max': nivel_max,
-        'nivel_min': nivel_min,
-        'contas_por_nivel': contas_por_nivel,
-        'empresas_stats': empresas_stats,
-        'niveis_existentes': sorted(list(set(niveis)))
-    }
+    # Agregado no banco (níveis/tipos + existência de filhos), sem materializar o queryset
+    return calcular_estatisticas_arvore(queryset, tipo_por_filhos=True, por_empresa=True)
 
 # Manter outras funções existentes para compatibilidade
 @login_required
@@ -229,11 +201,16 @@ def unidade_tree_search(request):
             Q(nome__icontains=search_term),
             ativa=True
         ).select_related('empresa').order_by('codigo')[:limit]
+        unidades = list(unidades)
+        
+        # Caminhos e filhos resolvidos em lote (sem query por resultado)
+        caminhos = Unidade.resolver_caminhos(unidades)
+        com_filhos = Unidade.codigos_com_filhos([u.codigo for u in unidades])
         
         results = []
         for unidade in unidades:
             # Construir caminho hierárquico para contexto
-            caminho = unidade.get_caminho_completo()
+            caminho = caminhos[unidade.codigo]
             caminho_texto = ' > '.join([f"{u.codigo} {u.nome}" for u in caminho])
             
             results.append({
@@ -246,7 +223,7 @@ def unidade_tree_search(request):
                 'nivel': unidade.nivel,
                 'empresa_sigla': unidade.empresa.sigla if unidade.empresa else '',
                 'caminho': caminho_texto,
-                'tem_filhos': unidade.tem_filhos,
+                'tem_filhos': unidade.codigo in com_filhos,
                 'descricao': unidade.descricao[:100] + '...' if unidade.descricao and len(unidade.descricao) > 100 else unidade.descricao
             })
         
@@ -327,11 +304,18 @@ def unidade_tree_export(request):
             
             return response
         
+        elif formato in ('excel', 'xlsx'):
+            # Planilha em streaming, com nome do pai e caminho completo
+            from gestor.services.hierarquia_exportacao_service import HierarquiaExportacaoService
+
+            exportador = HierarquiaExportacaoService.exportar_unidades(apenas_ativas)
+            return exportador.resposta('unidades_hierarquia.xlsx')
+        
         else:
             return JsonResponse({
                 'success': False,
                 'error': 'Formato não suportado',
-                'formatos_disponiveis': ['json', 'csv']
+                'formatos_disponiveis': ['json', 'csv', 'excel']
             })
     
     except Exception as e:
@@ -1,6 +1,7 @@
 # gunicorn.conf.py - Configurações do Gunicorn para SynchroBI
 
 import multiprocessing
+import os
 
 # Bind
 bind = "0.0.0.0:8000"
@@ -26,6 +27,19 @@ accesslog = "-"  # stdout
 errorlog = "-"   # stderr
 loglevel = "info"
 
+# Preload (GUNICORN_PRELOAD=True): a aplicação é carregada uma vez no master e
+# os workers herdam as páginas por copy-on-write (menos memória e boot mais
+# rápido a cada reciclo de max_requests). Módulos pesados usados sob demanda
+# (ex.: GUNICORN_PRELOAD_MODULOS=pandas,openpyxl) podem ser carregados no
+# master também, para serem compartilhados em vez de importados por worker.
+# Com preload, HUP não recarrega o código: o deploy precisa reiniciar o master.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'False') == 'True'
+
+# Métricas (/api/metrics): cada worker grava um snapshot neste diretório e
+# qualquer worker soma todos na coleta. Fora do gunicorn (runserver, comandos)
+# a variável fica vazia e as métricas são só do próprio processo.
+os.environ.setdefault('SYNCHROBI_METRICS_DIR', '/tmp/synchrobi_metrics')
+
 # Process naming
 proc_name = "synchrobi"
 
@@ -40,3 +54,49 @@ tmp_upload_dir = None
 # SSL (descomente se necessário)
 # keyfile = None
 # certfile = None
+
+
+# Hooks
+def on_starting(server):
+    # Snapshots de uma execução anterior não entram na soma
+    from synchrobi import metrics
+    metrics.limpar_diretorio()
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+
+    import gc
+    import importlib
+
+    for modulo in filter(None, (m.strip() for m in os.getenv('GUNICORN_PRELOAD_MODULOS', '').split(','))):
+        importlib.import_module(modulo)
+
+    # Nenhuma conexão aberta no master pode ser herdada pelos workers
+    from django.db import connections
+    connections.close_all()
+
+    # As coletas do GC nos workers não percorrem (e não copiam) os objetos herdados do master
+    gc.freeze()
+    server.log.info('Aplicação pré-carregada no master (preload_app)')
+
+
+def child_exit(server, worker):
+    # Worker reciclado (max_requests) ou morto: contadores vão para o acumulado
+    from synchrobi import metrics
+    metrics.marcar_processo_encerrado(worker.pid)
+
+
+def post_worker_init(worker):
+    # Exportações deixadas por um worker reciclado (ou sem sinal de vida)
+    # voltam a rodar; o claim atômico em executar() evita execução dupla
+    from gestor.services.exportacao_job_service import ExportacaoJobService
+    ExportacaoJobService.retomar_em_thread()
+
+
+def worker_exit(server, worker):
+    # As threads de exportação são daemon e morrem com o worker: os jobs
+    # delas voltam para pendente em vez de ficarem presos em "processando"
+    from gestor.services.exportacao_job_service import ExportacaoJobService
+    ExportacaoJobService.reenfileirar_do_processo()
@@ -18,6 +18,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'synchrobi.settings')
 django.setup()
 
 from core.models import CentroCusto
+from gestor.services.hierarquia_service import HierarquiaService
 
 def main():
     """Função principal de importação"""
@@ -246,50 +247,33 @@ def main():
             codigo_pai = '.'.join(partes[:i])
             codigos_pais.add(codigo_pai)
     
-    # Criar códigos pais primeiro
-    sucessos = 0
-    erros = 0
+    # Montar registros: pais sintéticos + centros principais analíticos.
+    # A carga em lote resolve pais e níveis em memória e grava tudo em uma transação.
+    registros = [
+        {
+            'codigo': codigo_pai,
+            'nome': f'Grupo {codigo_pai}',
+            'tipo': 'S',
+            'ativo': True,
+            'descricao': 'Centro sintético criado automaticamente'
+        }
+        for codigo_pai in sorted(codigos_pais)
+    ]
+    registros += [
+        {'codigo': codigo, 'nome': nome, 'tipo': 'A', 'ativo': True}
+        for codigo, nome in centros_dados
+    ]
     
-    print("Criando centros pais...")
-    for codigo_pai in sorted(codigos_pais):
-        try:
-            centro_pai, created = CentroCusto.objects.get_or_create(
-                codigo=codigo_pai,
-                defaults={
-                    'nome': f'Grupo {codigo_pai}',
-                    'ativo': True,
-                    'descricao': 'Centro sintético criado automaticamente'
-                }
-            )
-            if created:
-                print(f"  ✓ {codigo_pai} - {centro_pai.nome}")
-                sucessos += 1
-        except Exception as e:
-            print(f"  ✗ Erro em {codigo_pai}: {e}")
-            erros += 1
+    resultado = HierarquiaService.upsert_em_lote(
+        CentroCusto, registros, atualizar_existentes=False
+    )
     
-    print(f"\nCriando centros principais...")
+    for erro in resultado.erros:
+        print(f"  ✗ Erro em {erro['codigo']}: {erro['erro']}")
     
-    # Criar centros principais
-    for codigo, nome in centros_dados:
-        try:
-            centro, created = CentroCusto.objects.get_or_create(
-                codigo=codigo,
-                defaults={
-                    'nome': nome,
-                    'ativo': True
-                }
-            )
-            
-            if created:
-                print(f"  ✓ {codigo} - {nome}")
-                sucessos += 1
-            else:
-                print(f"  ○ {codigo} - {nome} (já existe)")
-                
-        except Exception as e:
-            print(f"  ✗ Erro em {codigo}: {e}")
-            erros += 1
+    sucessos = resultado.criados
+    erros = len(resultado.erros)
+    print(f"  ○ {resultado.ignorados} centros já existiam e foram mantidos")
     
     # Relatório final
     print(f"\n=== RESULTADO ===")
@@ -18,6 +18,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'synchrobi.settings')
 django.setup()
 
 from core.models import ContaContabil
+from gestor.services.hierarquia_service import HierarquiaService
 
 def main():
     """Função principal de limpeza e reimportação"""
@@ -219,31 +220,32 @@ def main():
     
     print(f"2. Importando {len(contas_grupo_130)} contas do grupo 130...")
     
-    sucessos = 0
-    erros = 0
+    # Tipo: se tem filhos na lista é sintético, senão analítico
+    codigos_com_filhos = set()
+    for codigo, _ in contas_grupo_130:
+        partes = codigo.split('.')
+        for i in range(1, len(partes)):
+            codigos_com_filhos.add('.'.join(partes[:i]))
     
-    # Importar em ordem hierárquica (pais primeiro)
-    for codigo, nome in contas_grupo_130:
-        try:
-            # Determinar tipo baseado na estrutura
-            # Se não tem filhos na lista, é analítico
-            tem_filhos = any(c[0].startswith(codigo + '.') for c in contas_grupo_130)
-            tipo = 'S' if tem_filhos else 'A'
-            
-            conta = ContaContabil.objects.create(
-                codigo=codigo,
-                nome=nome,
-                tipo=tipo,
-                ativa=True,
-                descricao=f"Conta do grupo 130 - {nome}"
-            )
-            
-            print(f"   ✅ {codigo} - {nome} ({tipo})")
-            sucessos += 1
-            
-        except Exception as e:
-            print(f"   ❌ Erro em {codigo}: {e}")
-            erros += 1
+    registros = [
+        {
+            'codigo': codigo,
+            'nome': nome,
+            'tipo': 'S' if codigo in codigos_com_filhos else 'A',
+            'ativa': True,
+            'descricao': f"Conta do grupo 130 - {nome}"
+        }
+        for codigo, nome in contas_grupo_130
+    ]
+    
+    # Carga em lote: pais e níveis resolvidos em memória, gravação em uma transação
+    resultado = HierarquiaService.upsert_em_lote(ContaContabil, registros)
+    
+    for erro in resultado.erros:
+        print(f"   ❌ Erro em {erro['codigo']}: {erro['erro']}")
+    
+    sucessos = resultado.total_gravados
+    erros = len(resultado.erros)
     
     # 3. VERIFICAÇÃO FINAL
     print(f"\n=== RESULTADO ===")
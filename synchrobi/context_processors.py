@@ -0,0 +1,12 @@
+# synchrobi/context_processors.py
+
+from synchrobi.middleware import AppContextMiddleware
+
+
+def app_context(request):
+    """app_context / app_name da requisição (definidos pelo AppContextMiddleware)"""
+    contexto = getattr(request, 'app_context', None)
+    nome = getattr(request, 'app_name', None)
+    if contexto is None:
+        contexto, nome = AppContextMiddleware.detectar(request.path)
+    return {'app_context': contexto, 'app_name': nome}
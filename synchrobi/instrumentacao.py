@@ -0,0 +1,131 @@
+# synchrobi/instrumentacao.py
+# Medição de consultas ao banco por requisição e orçamentos por view
+
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+from synchrobi import metrics
+
+REQUISICAO_DURACAO = 'synchrobi_requisicao_duracao_ms'
+REQUISICAO_CONSULTAS = 'synchrobi_requisicao_consultas'
+REQUISICAO_DB_DURACAO = 'synchrobi_requisicao_db_ms'
+REQUISICOES = 'synchrobi_requisicoes_total'
+ORCAMENTO_EXCEDIDO = 'synchrobi_orcamento_excedido_total'
+
+# Histogramas exportados em /api/metrics (agregáveis entre workers, ao contrário dos percentis)
+REQUISICAO_SEGUNDOS = 'synchrobi_requisicao_duracao_segundos'
+REQUISICAO_DB_SEGUNDOS = 'synchrobi_requisicao_db_segundos'
+REQUISICAO_CONSULTAS_HISTOGRAMA = 'synchrobi_requisicao_consultas_db'
+CONSULTAS_DB = 'synchrobi_consultas_db_total'
+JOBS = 'synchrobi_jobs_total'
+JOB_LINHAS = 'synchrobi_job_linhas_total'
+JOB_SEGUNDOS = 'synchrobi_job_duracao_segundos'
+JOB_LINHAS_POR_SEGUNDO = 'synchrobi_job_linhas_por_segundo'
+
+LIMITES_SEGUNDOS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LIMITES_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 250, 1000)
+LIMITES_JOB_SEGUNDOS = (1, 5, 15, 30, 60, 120, 300, 600, 1800)
+LIMITES_LINHAS_POR_SEGUNDO = (10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+
+
+class MedidorConsultas:
+    """execute_wrapper que conta as consultas e soma o tempo gasto no banco"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_db = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.tempo_db += time.perf_counter() - inicio
+
+    @property
+    def tempo_db_ms(self):
+        return self.tempo_db * 1000
+
+
+def orcamento_da_view(view_name):
+    """Orçamento {'consultas': n, 'ms': n} da view (padrão + sobrescritas em SYNCHROBI_ORCAMENTOS_VIEWS)"""
+    orcamento = dict(getattr(settings, 'SYNCHROBI_ORCAMENTO_PADRAO', {'consultas': 50, 'ms': 2000}))
+    orcamento.update(getattr(settings, 'SYNCHROBI_ORCAMENTOS_VIEWS', {}).get(view_name, {}))
+    return orcamento
+
+
+def excessos(orcamento, consultas, duracao_ms):
+    """Lista dos limites estourados ('consultas', 'ms')"""
+    estourados = []
+    if orcamento.get('consultas') is not None and consultas > orcamento['consultas']:
+        estourados.append('consultas')
+    if orcamento.get('ms') is not None and duracao_ms > orcamento['ms']:
+        estourados.append('ms')
+    return estourados
+
+
+def registrar_requisicao(view, consultas, tempo_db_ms, duracao_ms):
+    """Alimenta os contadores, histogramas e janelas de percentis da view"""
+    metrics.incrementar(REQUISICOES, view=view)
+    metrics.incrementar(CONSULTAS_DB, consultas, view=view)
+    metrics.observar(REQUISICAO_DURACAO, duracao_ms, view=view)
+    metrics.observar(REQUISICAO_CONSULTAS, consultas, view=view)
+    metrics.observar(REQUISICAO_DB_DURACAO, tempo_db_ms, view=view)
+    metrics.histograma(REQUISICAO_SEGUNDOS, duracao_ms / 1000, LIMITES_SEGUNDOS, view=view)
+    metrics.histograma(REQUISICAO_DB_SEGUNDOS, tempo_db_ms / 1000, LIMITES_SEGUNDOS, view=view)
+    metrics.histograma(REQUISICAO_CONSULTAS_HISTOGRAMA, consultas, LIMITES_CONSULTAS, view=view)
+    metrics.persistir()
+
+
+def registrar_job(tipo, formato, linhas, duracao_segundos, status='sucesso'):
+    """
+    Importação/exportação concluída: duração, linhas e vazão (linhas/s).
+
+    tipo: 'importacao' ou 'exportacao'; formato: extensão ou variante do job.
+    """
+    metrics.incrementar(JOBS, tipo=tipo, formato=formato, status=status)
+    metrics.histograma(JOB_SEGUNDOS, duracao_segundos, LIMITES_JOB_SEGUNDOS, tipo=tipo, formato=formato)
+    if status == 'sucesso' and linhas:
+        metrics.incrementar(JOB_LINHAS, linhas, tipo=tipo, formato=formato)
+        metrics.histograma(
+            JOB_LINHAS_POR_SEGUNDO, linhas / max(duracao_segundos, 0.001), LIMITES_LINHAS_POR_SEGUNDO,
+            tipo=tipo, formato=formato,
+        )
+    metrics.persistir(forcar=True)
+
+
+def percentis_por_view():
+    """{view: {'duracao_ms': {...}, 'consultas': {...}, 'db_ms': {...}}} das janelas móveis"""
+    resultado = {}
+    for nome, campo in (
+        (REQUISICAO_DURACAO, 'duracao_ms'),
+        (REQUISICAO_CONSULTAS, 'consultas'),
+        (REQUISICAO_DB_DURACAO, 'db_ms'),
+    ):
+        for rotulos, estatisticas in metrics.percentis(nome).items():
+            resultado.setdefault(dict(rotulos)['view'], {})[campo] = {
+                chave: round(valor, 2) for chave, valor in estatisticas.items()
+            }
+    return resultado
+
+
+@contextmanager
+def orcamento_consultas(maximo, descricao=''):
+    """
+    Falha (AssertionError) se o bloco fizer mais de maximo consultas.
+
+    Para testes e verificações dos endpoints quentes:
+        with orcamento_consultas(10, 'árvore de unidades'):
+            client.get(url)
+    """
+    medidor = MedidorConsultas()
+    with connection.execute_wrapper(medidor):
+        yield medidor
+    if medidor.consultas > maximo:
+        raise AssertionError(
+            f'{descricao or "Bloco"} fez {medidor.consultas} consultas (orçamento: {maximo})'
+        )
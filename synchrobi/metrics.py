@@ -0,0 +1,416 @@
+# synchrobi/metrics.py
+# Contadores, histogramas e percentis móveis de instrumentação
+#
+# Tudo fica em memória no processo. Com SYNCHROBI_METRICS_DIR definido, cada
+# processo grava periodicamente um snapshot (<pid>-<início>.json) no diretório
+# e agregar() soma os snapshots de todos os workers do gunicorn, então uma
+# única leitura de /api/metrics cobre a instância inteira. Quando um worker
+# termina (child_exit no gunicorn.conf.py), os contadores dele são somados em
+# acumulado.json para não sumirem nos reciclos de max_requests.
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict, deque
+
+SESSAO_ESCRITAS = 'synchrobi_sessao_escritas_total'
+
+# Observações guardadas por série para os percentis móveis
+JANELA_OBSERVACOES = 500
+
+# Intervalo mínimo entre dois snapshots do mesmo processo
+INTERVALO_PERSISTENCIA = 1.0
+
+ARQUIVO_ACUMULADO = 'acumulado.json'
+
+_lock = threading.Lock()
+# Serializa snapshot + gravação: thread da requisição, do Timer e de exportações
+_lock_persistencia = threading.Lock()
+_contadores = defaultdict(float)
+_observacoes = defaultdict(lambda: deque(maxlen=JANELA_OBSERVACOES))
+_histogramas = {}
+_processo = {'id': None, 'persistido_em': 0.0, 'agendado': False}
+
+
+def diretorio():
+    """Diretório compartilhado dos snapshots (None = métricas só deste processo)"""
+    return os.environ.get('SYNCHROBI_METRICS_DIR') or None
+
+
+def _id_processo():
+    # pid + instante de início: um pid reaproveitado não herda o snapshot antigo
+    if _processo['id'] is None:
+        _processo['id'] = f'{os.getpid()}-{int(time.time() * 1000)}'
+    return _processo['id']
+
+
+def _chave(nome, rotulos):
+    return nome, tuple(sorted((chave, str(valor)) for chave, valor in rotulos.items()))
+
+
+def incrementar(nome, valor=1, **rotulos):
+    """Soma valor ao contador nome{rotulos}"""
+    with _lock:
+        _contadores[_chave(nome, rotulos)] += valor
+
+
+def valor(nome, **rotulos):
+    """Valor atual de nome{rotulos}; sem rótulos, soma todas as séries do contador"""
+    with _lock:
+        if rotulos:
+            return _contadores.get(_chave(nome, rotulos), 0)
+        return sum(total for (serie, _), total in _contadores.items() if serie == nome)
+
+
+def contadores():
+    """Cópia de todos os contadores: {(nome, ((rotulo, valor), ...)): total}"""
+    with _lock:
+        return dict(_contadores)
+
+
+def observar(nome, valor, **rotulos):
+    """Registra uma medição (ex.: duração da requisição) na janela móvel de nome{rotulos}"""
+    with _lock:
+        _observacoes[_chave(nome, rotulos)].append(valor)
+
+
+def histograma(nome, valor, limites, **rotulos):
+    """Conta valor no balde de nome{rotulos} (limites crescentes, +Inf implícito)"""
+    chave = _chave(nome, rotulos)
+    with _lock:
+        serie = _histogramas.get(chave)
+        if serie is None:
+            serie = _histogramas[chave] = {
+                'limites': tuple(limites), 'baldes': [0] * (len(limites) + 1), 'soma': 0.0, 'contagem': 0,
+            }
+        serie['baldes'][bisect_left(serie['limites'], valor)] += 1
+        serie['soma'] += valor
+        serie['contagem'] += 1
+
+
+def histogramas():
+    """Cópia de todos os histogramas: {(nome, rotulos): {'limites', 'baldes', 'soma', 'contagem'}}"""
+    with _lock:
+        return {chave: dict(serie, baldes=list(serie['baldes'])) for chave, serie in _histogramas.items()}
+
+
+def _percentil(ordenados, quantil):
+    """Percentil por interpolação linear (ordenados não vazio)"""
+    posicao = (len(ordenados) - 1) * quantil / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicao - inferior)
+
+
+def percentis(nome, quantis=(50, 90, 99)):
+    """
+    Percentis das últimas JANELA_OBSERVACOES medições de cada série de nome.
+
+    Retorna {rotulos: {'amostras': n, 'p50': ..., 'p90': ..., 'max': ...}}.
+    """
+    with _lock:
+        series = {rotulos: sorted(valores) for (serie, rotulos), valores in _observacoes.items() if serie == nome and valores}
+
+    resultado = {}
+    for rotulos, ordenados in series.items():
+        estatisticas = {'amostras': len(ordenados), 'max': ordenados[-1]}
+        for quantil in quantis:
+            estatisticas[f'p{quantil}'] = _percentil(ordenados, quantil)
+        resultado[rotulos] = estatisticas
+    return resultado
+
+
+def zerar():
+    with _lock:
+        _contadores.clear()
+        _observacoes.clear()
+        _histogramas.clear()
+
+
+def _depois_do_fork():
+    # Com preload_app o worker nasce com a memória do master: começa do zero e com id próprio.
+    # Locks novos: uma thread do master podia estar com eles no momento do fork
+    global _lock, _lock_persistencia
+    _lock = threading.Lock()
+    _lock_persistencia = threading.Lock()
+    zerar()
+    _processo['id'] = None
+    _processo['persistido_em'] = 0.0
+    _processo['agendado'] = False
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_depois_do_fork)
+
+
+# ===== MEMÓRIA =====
+
+def rss_bytes():
+    """Memória residente atual do processo (pico, se /proc não existir)"""
+    try:
+        with open('/proc/self/statm') as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# ===== SNAPSHOTS ENTRE PROCESSOS =====
+
+def _serializar_rotulos(rotulos):
+    return [list(par) for par in rotulos]
+
+
+def snapshot():
+    """Estado deste processo em formato JSON"""
+    with _lock:
+        contadores_atuais = [
+            [nome, _serializar_rotulos(rotulos), total] for (nome, rotulos), total in _contadores.items()
+        ]
+        histogramas_atuais = [
+            [nome, _serializar_rotulos(rotulos), list(serie['limites']), list(serie['baldes']), serie['soma'], serie['contagem']]
+            for (nome, rotulos), serie in _histogramas.items()
+        ]
+    return {
+        'id': _id_processo(),
+        'pid': os.getpid(),
+        'rss_bytes': rss_bytes(),
+        'atualizado_em': time.time(),
+        'contadores': contadores_atuais,
+        'histogramas': histogramas_atuais,
+    }
+
+
+def _gravar_json(caminho, dados):
+    # Temporário exclusivo + os.replace: leitores nunca veem arquivo pela metade
+    descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'w') as arquivo:
+            json.dump(dados, arquivo)
+        os.replace(temporario, caminho)
+    except BaseException:
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+        raise
+
+def _ler_json(caminho):
+    try:
+        with open(caminho) as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+def persistir(forcar=False):
+    """Grava o snapshot deste processo no diretório compartilhado (no máximo 1x por INTERVALO_PERSISTENCIA; o resto é adiado)"""
+    pasta = diretorio()
+    if not pasta:
+        return
+    with _lock_persistencia:
+        agora = time.monotonic()
+        espera = INTERVALO_PERSISTENCIA - (agora - _processo['persistido_em'])
+        if not forcar and espera > 0:
+            # Worker que fica ocioso logo depois também publica o último intervalo
+            if not _processo['agendado']:
+                _processo['agendado'] = True
+                temporizador = threading.Timer(espera, _persistir_agendado)
+                temporizador.daemon = True
+                temporizador.start()
+            return
+        _processo['persistido_em'] = agora
+        try:
+            os.makedirs(pasta, exist_ok=True)
+            _gravar_json(os.path.join(pasta, f'{_id_processo()}.json'), snapshot())
+        except OSError:
+            # Métrica nunca derruba requisição
+            pass
+
+
+def _persistir_agendado():
+    with _lock_persistencia:
+        _processo['agendado'] = False
+    persistir(forcar=True)
+
+atexit.register(persistir, forcar=True)
+
+
+def _somar(destino, dados):
+    """Soma um snapshot (ou o acumulado) em destino {'contadores': {}, 'histogramas': {}}"""
+    for nome, rotulos, total in dados.get('contadores', []):
+        chave = (nome, tuple(tuple(par) for par in rotulos))
+        destino['contadores'][chave] = destino['contadores'].get(chave, 0) + total
+    for nome, rotulos, limites, baldes, soma, contagem in dados.get('histogramas', []):
+        chave = (nome, tuple(tuple(par) for par in rotulos))
+        serie = destino['histogramas'].get(chave)
+        if serie is None:
+            destino['histogramas'][chave] = {'limites': tuple(limites), 'baldes': list(baldes), 'soma': soma, 'contagem': contagem}
+        elif serie['limites'] == tuple(limites):
+            serie['baldes'] = [a + b for a, b in zip(serie['baldes'], baldes)]
+            serie['soma'] += soma
+            serie['contagem'] += contagem
+
+
+def _para_arquivo(agregado):
+    return {
+        'contadores': [[nome, _serializar_rotulos(rotulos), total] for (nome, rotulos), total in agregado['contadores'].items()],
+        'histogramas': [
+            [nome, _serializar_rotulos(rotulos), list(serie['limites']), serie['baldes'], serie['soma'], serie['contagem']]
+            for (nome, rotulos), serie in agregado['histogramas'].items()
+        ],
+    }
+
+
+def marcar_processo_encerrado(pid):
+    """
+    Incorpora os snapshots do pid (worker encerrado) ao acumulado e os remove.
+
+    Chamado só pelo master do gunicorn (child_exit), então não há dois
+    escritores do acumulado. Os ids incorporados ficam listados no acumulado
+    até o arquivo do worker sumir: um leitor que chegue entre as duas etapas
+    não conta o worker duas vezes.
+    """
+    pasta = diretorio()
+    if not pasta or not os.path.isdir(pasta):
+        return
+    caminho_acumulado = os.path.join(pasta, ARQUIVO_ACUMULADO)
+    acumulado = _ler_json(caminho_acumulado) or {}
+
+    arquivos = [nome for nome in os.listdir(pasta) if nome.startswith(f'{pid}-') and nome.endswith('.json')]
+    if not arquivos:
+        return
+
+    agregado = {'contadores': {}, 'histogramas': {}}
+    _somar(agregado, acumulado)
+    incorporados = []
+    for nome in arquivos:
+        dados = _ler_json(os.path.join(pasta, nome))
+        if dados:
+            _somar(agregado, dados)
+            incorporados.append(nome[:-len('.json')])
+
+    existentes = set(os.listdir(pasta))
+    anteriores = [id_ for id_ in acumulado.get('incorporados', []) if f'{id_}.json' in existentes]
+    _gravar_json(caminho_acumulado, dict(_para_arquivo(agregado), incorporados=anteriores + incorporados))
+
+    for nome in arquivos:
+        try:
+            os.remove(os.path.join(pasta, nome))
+        except OSError:
+            pass
+
+
+def limpar_diretorio():
+    """Remove snapshots antigos (início do master do gunicorn)"""
+    pasta = diretorio()
+    if not pasta:
+        return
+    os.makedirs(pasta, exist_ok=True)
+    for nome in os.listdir(pasta):
+        if nome.endswith('.json') or nome.endswith('.tmp'):
+            try:
+                os.remove(os.path.join(pasta, nome))
+            except OSError:
+                pass
+
+
+def agregar():
+    """
+    Contadores e histogramas somados de todos os processos + memória dos vivos.
+
+    Retorna {'contadores': {...}, 'histogramas': {...}, 'processos': [{'pid', 'rss_bytes', 'atualizado_em'}]}.
+    Sem SYNCHROBI_METRICS_DIR, só o processo atual.
+    """
+    pasta = diretorio()
+    if not pasta or not os.path.isdir(pasta):
+        atual = snapshot()
+        agregado = {'contadores': {}, 'histogramas': {}}
+        _somar(agregado, atual)
+        agregado['processos'] = [{chave: atual[chave] for chave in ('pid', 'rss_bytes', 'atualizado_em')}]
+        return agregado
+
+    persistir(forcar=True)
+    agregado = {'contadores': {}, 'histogramas': {}, 'processos': []}
+    acumulado = _ler_json(os.path.join(pasta, ARQUIVO_ACUMULADO)) or {}
+    _somar(agregado, acumulado)
+    incorporados = set(acumulado.get('incorporados', []))
+
+    for nome in sorted(os.listdir(pasta)):
+        if not nome.endswith('.json') or nome == ARQUIVO_ACUMULADO or nome[:-len('.json')] in incorporados:
+            continue
+        dados = _ler_json(os.path.join(pasta, nome))
+        if not dados:
+            continue
+        _somar(agregado, dados)
+        agregado['processos'].append({chave: dados.get(chave) for chave in ('pid', 'rss_bytes', 'atualizado_em')})
+    return agregado
+
+
+# ===== FORMATO TEXTO DO PROMETHEUS =====
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_rotulos(rotulos):
+    if not rotulos:
+        return ''
+    return '{' + ','.join(f'{chave}="{_escapar(valor)}"' for chave, valor in rotulos) + '}'
+
+
+def _formatar_numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+def formatar_prometheus(agregado, medidores=None, ajuda=None):
+    """
+    Texto de exposição do Prometheus (versão 0.0.4).
+
+    medidores: {nome: {rotulos: valor}} de gauges calculados na hora da leitura.
+    ajuda: {nome: descrição} para as linhas # HELP.
+    """
+    ajuda = ajuda or {}
+    linhas = []
+
+    def cabecalho(nome, tipo):
+        if nome in ajuda:
+            linhas.append(f'# HELP {nome} {ajuda[nome]}')
+        linhas.append(f'# TYPE {nome} {tipo}')
+
+    por_nome = defaultdict(list)
+    for (nome, rotulos), total in agregado['contadores'].items():
+        por_nome[nome].append((rotulos, total))
+    for nome in sorted(por_nome):
+        cabecalho(nome, 'counter')
+        for rotulos, total in sorted(por_nome[nome]):
+            linhas.append(f'{nome}{_formatar_rotulos(rotulos)} {_formatar_numero(total)}')
+
+    por_nome = defaultdict(list)
+    for (nome, rotulos), serie in agregado['histogramas'].items():
+        por_nome[nome].append((rotulos, serie))
+    for nome in sorted(por_nome):
+        cabecalho(nome, 'histogram')
+        for rotulos, serie in sorted(por_nome[nome], key=lambda item: item[0]):
+            acumulado = 0
+            for limite, quantidade in zip(list(serie['limites']) + [float('inf')], serie['baldes']):
+                acumulado += quantidade
+                rotulos_balde = rotulos + (('le', '+Inf' if limite == float('inf') else repr(float(limite))),)
+                linhas.append(f'{nome}_bucket{_formatar_rotulos(rotulos_balde)} {acumulado}')
+            linhas.append(f'{nome}_sum{_formatar_rotulos(rotulos)} {_formatar_numero(serie["soma"])}')
+            linhas.append(f'{nome}_count{_formatar_rotulos(rotulos)} {serie["contagem"]}')
+
+    for nome in sorted(medidores or {}):
+        cabecalho(nome, 'gauge')
+        for rotulos, valor in sorted(medidores[nome].items()):
+            linhas.append(f'{nome}{_formatar_rotulos(rotulos)} {_formatar_numero(valor)}')
+
+    return '\n'.join(linhas) + '\n'
@@ -1,7 +1,13 @@
 # synchrobi/middleware.py
 
+from django.conf import settings
+from django.db import connection
 from django.db.models import Q
+import json
 import logging
+import time
+
+from synchrobi import instrumentacao, metrics
 
 logger = logging.getLogger('synchrobi')
 
@@ -24,31 +30,62 @@ class NotificacaoMiddleware:
         return response
     
 class AppContextMiddleware:
-    """Middleware para detectar contexto da aplicação baseado na URL"""
+    """
+    Middleware para detectar contexto da aplicação baseado na URL.
+
+    O contexto é derivado a cada requisição e fica em request.app_context /
+    request.app_name (templates recebem via context processor). Nada vai para
+    a sessão: gravar nela marcava a sessão como modificada e fazia o Django
+    regravar a linha de django_session em toda requisição.
+    """
+    
+    CONTEXTOS = [
+        ('/gestor/', 'gestor', 'SynchroBI - Gestão'),
+        ('/api/', 'api', 'SynchroBI - API'),
+        ('/admin/', 'admin', 'SynchroBI - Administração'),
+    ]
     
     def __init__(self, get_response):
         self.get_response = get_response
 
+    @classmethod
+    def detectar(cls, path):
+        """(app_context, app_name) do caminho da URL"""
+        for trecho, contexto, nome in cls.CONTEXTOS:
+            if trecho in path:
+                return contexto, nome
+        return 'home', 'SynchroBI'
+
     def __call__(self, request):
-        path = request.path
-        
-        # Determinar contexto baseado no caminho da URL
-        if '/gestor/' in path:
-            request.session['app_context'] = 'gestor'
-            request.session['app_name'] = 'SynchroBI - Gestão'
-        elif '/api/' in path:
-            request.session['app_context'] = 'api'
-            request.session['app_name'] = 'SynchroBI - API'
-        elif '/admin/' in path:
-            request.session['app_context'] = 'admin'
-            request.session['app_name'] = 'SynchroBI - Administração'
-        else:
-            request.session['app_context'] = 'home'
-            request.session['app_name'] = 'SynchroBI'
+        request.app_context, request.app_name = self.detectar(request.path)
         
         response = self.get_response(request)
         return response
 
+class SessaoEscritaMiddleware:
+    """
+    Conta as requisições que regravaram a sessão (métrica synchrobi_sessao_escritas_total, por view).
+
+    Deve ficar antes do SessionMiddleware: quando a resposta chega aqui, o
+    SessionMiddleware já salvou (ou não) a sessão usando as mesmas condições.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        
+        sessao = getattr(request, 'session', None)
+        if sessao is not None and response.status_code != 500:
+            if (sessao.modified or settings.SESSION_SAVE_EVERY_REQUEST) and not sessao.is_empty():
+                match = request.resolver_match
+                view = match.view_name if match else 'desconhecida'
+                metrics.incrementar(metrics.SESSAO_ESCRITAS, view=view)
+                logger.debug(f"Sessão gravada em {request.method} {request.path} ({view})")
+        
+        return response
+
 class LoggingMiddleware:
     """Middleware para logging detalhado de requisições importantes"""
     
@@ -66,4 +103,55 @@ class LoggingMiddleware:
         if response.status_code >= 400:
             logger.warning(f"Resposta com erro: {response.status_code} para {request.path}")
         
-        return response
\ No newline at end of file
+        return response
+
+class InstrumentacaoMiddleware:
+    """
+    Consultas ao banco, tempo no banco, tempo total e tamanho da resposta por requisição.
+
+    Alimenta os percentis móveis por view (synchrobi.instrumentacao) e grava
+    uma linha estruturada (JSON) quando a view passa do orçamento configurado
+    em SYNCHROBI_ORCAMENTOS_VIEWS. Conteúdo de respostas em streaming é
+    gerado depois daqui: as consultas feitas durante o streaming não entram.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @staticmethod
+    def _tamanho(response):
+        if response.streaming:
+            tamanho = response.get('Content-Length')
+            return int(tamanho) if tamanho else None
+        return len(response.content)
+
+    def __call__(self, request):
+        medidor = instrumentacao.MedidorConsultas()
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(medidor):
+            response = self.get_response(request)
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        
+        match = request.resolver_match
+        view = match.view_name if match else 'desconhecida'
+        instrumentacao.registrar_requisicao(view, medidor.consultas, medidor.tempo_db_ms, duracao_ms)
+        
+        orcamento = instrumentacao.orcamento_da_view(view)
+        estourados = instrumentacao.excessos(orcamento, medidor.consultas, duracao_ms)
+        if estourados:
+            metrics.incrementar(instrumentacao.ORCAMENTO_EXCEDIDO, view=view)
+            logger.warning('orcamento_excedido ' + json.dumps({
+                'view': view,
+                'metodo': request.method,
+                'caminho': request.path,
+                'status': response.status_code,
+                'consultas': medidor.consultas,
+                'db_ms': round(medidor.tempo_db_ms, 1),
+                'duracao_ms': round(duracao_ms, 1),
+                'bytes': self._tamanho(response),
+                'orcamento': orcamento,
+                'excedido': estourados,
+                'usuario': getattr(getattr(request, 'user', None), 'pk', None),
+            }, ensure_ascii=False))
+        
+        return response
@@ -6,24 +6,18 @@ import dj_database_url
 from dotenv import load_dotenv
 import sys
 
-# Debug para identificar problemas de logging
-print("=== INICIANDO CONFIGURAÇÃO SYNCHROBI ===")
-print(f"Diretório de execução atual: {os.getcwd()}")
-
 # Carrega variáveis do arquivo .env
 load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-print(f"BASE_DIR: {BASE_DIR}")
 
-# Criar diretório de logs
+# Criar diretório de logs (settings é importado por todo worker e comando:
+# nada é impresso aqui, só a falha vai para stderr)
 logs_dir = os.path.join(BASE_DIR, 'logs')
-print(f"Criando diretório de logs em: {logs_dir}")
 try:
     os.makedirs(logs_dir, exist_ok=True)
-    print(f"✓ Diretório de logs criado com sucesso: {logs_dir}")
 except Exception as e:
-    print(f"✗ ERRO ao criar diretório de logs: {str(e)}")
+    print(f"✗ ERRO ao criar diretório de logs {logs_dir}: {str(e)}", file=sys.stderr)
 
 # Security
 SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-here-change-in-production')
@@ -52,9 +46,37 @@ AWS_S3_SIGNATURE_VERSION = 's3v4'
 AWS_S3_REGION_NAME = 'us-east-1'
 AWS_S3_ADDRESSING_STYLE = 'path'
 
-# Storage configuration
-DEFAULT_FILE_STORAGE = 'core.storage.MinioStorage'
+# Storage configuration (Django 5.1: só STORAGES vale)
 MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Arquivos das exportações em segundo plano: bucket MinIO quando há endpoint
+# configurado, senão sistema de arquivos local (desenvolvimento/testes).
+# Links de download assinados e privados, diferente dos demais arquivos.
+if AWS_S3_ENDPOINT_URL:
+    STORAGE_EXPORTACOES = {
+        'BACKEND': 'storages.backends.s3.S3Storage',
+        'OPTIONS': {
+            'location': 'exportacoes',
+            'default_acl': 'private',
+            'querystring_auth': True,
+            'querystring_expire': 3600,
+        },
+    }
+else:
+    STORAGE_EXPORTACOES = {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {
+            'location': os.path.join(MEDIA_ROOT, 'exportacoes'),
+            'base_url': f'{MEDIA_URL}exportacoes/',
+        },
+    }
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'exportacoes': STORAGE_EXPORTACOES,
+}
 
 # Static Files
 STATIC_URL = '/static/'
@@ -90,6 +112,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'synchrobi.middleware.InstrumentacaoMiddleware',
+    'synchrobi.middleware.SessaoEscritaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -114,6 +138,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'synchrobi.context_processors.app_context',
             ],
         },
     },
@@ -130,6 +155,42 @@ DATABASES = {
     )
 }
 
+# Cache compartilhado entre os workers do gunicorn. Sem backend externo cada
+# processo teria o seu LocMem: árvores, lookups e relatórios duplicados e
+# invalidações (core/utils/cache_utils.py) valendo só no worker que as fez.
+#   REDIS_URL=redis://host:6379/1          -> Redis (produção)
+#   MEMCACHED_LOCATION=host:11211          -> memcached (pymemcache)
+#   CACHE_DIR=/var/tmp/synchrobi_cache     -> arquivos (um servidor, vários workers)
+#   nenhum                                 -> LocMem (desenvolvimento/testes)
+CACHE_TIMEOUT_PADRAO = int(os.getenv('CACHE_TIMEOUT', '1800'))
+
+if os.getenv('REDIS_URL'):
+    _cache_padrao = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    }
+elif os.getenv('MEMCACHED_LOCATION'):
+    _cache_padrao = {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': os.getenv('MEMCACHED_LOCATION').split(','),
+    }
+elif os.getenv('CACHE_DIR'):
+    _cache_padrao = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_DIR'),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '20000'))},
+    }
+else:
+    _cache_padrao = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'synchrobi',
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '20000'))},
+    }
+
+CACHES = {
+    'default': {**_cache_padrao, 'TIMEOUT': CACHE_TIMEOUT_PADRAO},
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -218,12 +279,46 @@ LOGGING = {
     },
 }
 
-print("=== CONFIGURAÇÃO SYNCHROBI CONCLUÍDA ===")
 
 # Configurações específicas do SynchroBI
 SYNCHROBI_CONFIG = {
     'EMPRESA_NOME': os.getenv('EMPRESA_NOME', 'SynchroBI'),
     'EMPRESA_LOGO': os.getenv('EMPRESA_LOGO', '/static/img/logo.png'),
     'DRE_AUTO_REFRESH': int(os.getenv('DRE_AUTO_REFRESH', '300')),  # 5 minutos
-    'CACHE_TIMEOUT': int(os.getenv('CACHE_TIMEOUT', '1800')),  # 30 minutos
-}
\ No newline at end of file
+    'CACHE_TIMEOUT': CACHE_TIMEOUT_PADRAO,  # 30 minutos
+    'CARGA_MASSA_MIN_LINHAS': int(os.getenv('CARGA_MASSA_MIN_LINHAS', '50000')),  # índices adiados acima disso
+    'CARGA_MASSA_PROPORCAO_MINIMA': float(os.getenv('CARGA_MASSA_PROPORCAO_MINIMA', '0.2')),  # e acima dessa fração da tabela/partições
+}
+# Instrumentação (synchrobi.middleware.InstrumentacaoMiddleware): requisições
+# acima do orçamento geram uma linha "orcamento_excedido" no log. Padrão para
+# todas as views + limites mais apertados para os endpoints quentes (conferidos
+# por "manage.py verificar_orcamentos").
+SYNCHROBI_ORCAMENTO_PADRAO = {
+    'consultas': int(os.getenv('ORCAMENTO_CONSULTAS', '50')),
+    'ms': int(os.getenv('ORCAMENTO_MS', '2000')),
+}
+SYNCHROBI_ORCAMENTOS_VIEWS = {
+    'gestor:unidade_tree': {'consultas': 12},
+    'gestor:api_unidade_tree_data': {'consultas': 10},
+    'gestor:centrocusto_tree': {'consultas': 10},
+    'gestor:api_centrocusto_tree_data': {'consultas': 10},
+    'gestor:contacontabil_tree': {'consultas': 10},
+    'gestor:api_contacontabil_tree_data': {'consultas': 10},
+    'gestor:movimento_list': {'consultas': 10},
+    'gestor:movimento_importar': {'consultas': 15},
+    # Importações: consultas proporcionais ao arquivo, orçamento só de tempo
+    'gestor:api_importar_movimentos_excel': {'consultas': None, 'ms': 120000},
+    'gestor:api_importar_movimentos_simples': {'consultas': None, 'ms': 120000},
+}
+# Boot de um worker (conferido por "manage.py medir_inicializacao"): pandas,
+# numpy e openpyxl só entram sob demanda, nas importações/exportações.
+SYNCHROBI_ORCAMENTO_INICIALIZACAO = {
+    'ms': int(os.getenv('ORCAMENTO_BOOT_MS', '1500')),
+    'rss_mb': int(os.getenv('ORCAMENTO_BOOT_RSS_MB', '90')),
+}
+# Métricas em /api/metrics (formato Prometheus). SYNCHROBI_METRICS_DIR (lido
+# direto do ambiente por synchrobi.metrics; o gunicorn.conf.py define um padrão)
+# é onde cada worker grava seu snapshot para a soma da instância. Com
+# METRICS_TOKEN, o coletor autentica com "Authorization: Bearer <token>";
+# sem ele, só usuários staff logados.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')